@@ -1,7 +1,10 @@
 # admin.py
 
 from django.contrib import admin
-from .models import AttendanceSession, Attendance
+from .models import AttendanceSession, Attendance, AttendanceSummary
+from .utils import revalidate_session_locations
+
+LOCATION_FIELDS = ('latitude', 'longitude', 'allowed_radius_meters')
 
 @admin.register(AttendanceSession)
 class AttendanceSessionAdmin(admin.ModelAdmin):
@@ -29,6 +32,7 @@ class AttendanceSessionAdmin(admin.ModelAdmin):
     
     search_fields = ['batch__name', 'classroom_location']
     readonly_fields = ['qr_secret', 'created_at', 'get_session_info']
+    actions = ['recheck_locations']
     
     fieldsets = (
         ('Session Details', {
@@ -57,6 +61,22 @@ class AttendanceSessionAdmin(admin.ModelAdmin):
             return f"{obj.start_time.strftime('%I:%M %p')} to {obj.end_time.strftime('%I:%M %p')} ({duration})"
         return "No timing set"
     get_session_info.short_description = 'Session Duration'
+    
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        # Classroom coordinates corrected - re-check the scans already taken
+        if change and set(LOCATION_FIELDS) & set(form.changed_data):
+            result = revalidate_session_locations(obj)
+            self.message_user(request, f"Re-checked {result['checked']} QR scans - {result['changed']} updated.")
+    
+    @admin.action(description="Re-check student locations of QR scans")
+    def recheck_locations(self, request, queryset):
+        checked = changed = 0
+        for session in queryset:
+            result = revalidate_session_locations(session)
+            checked += result['checked']
+            changed += result['changed']
+        self.message_user(request, f"Re-checked {checked} QR scans - {changed} updated.")
 
 
 @admin.register(Attendance)
@@ -113,5 +133,17 @@ class AttendanceAdmin(admin.ModelAdmin):
     get_location_info.short_description = 'Location Details'
 
 
+@admin.register(AttendanceSummary)
+class AttendanceSummaryAdmin(admin.ModelAdmin):
+    """Read-only rollup - maintained by attendance.summary (rebuild: rebuild_attendance_summaries)"""
+    list_display = ['student', 'batch', 'total', 'present', 'absent', 'late', 'updated_at']
+    list_select_related = ['student', 'batch']
+    search_fields = ['student__username', 'batch__name']
+    readonly_fields = ['student', 'batch', 'total', 'present', 'absent', 'late', 'updated_at']
+
+    def has_add_permission(self, request):
+        return False
+
+
 # BatchEnrollment is already registered in courses.admin
 # So we don't register it here
\ No newline at end of file
@@ -0,0 +1,171 @@
+# attendance/checkin.py - QR check-in fast path
+"""
+A whole class scans the QR within a minute, so a check-in must not do
+per-scan lookups:
+
+- session metadata (secret, window, coordinates, radius) and the enrolled
+  student ids are cached per session - enrollment / session edits drop it
+- duplicate scans are caught by ``cache.add`` on a per (session, student)
+  key; the ``unique_together`` of ``Attendance`` is the final guard
+- distance / present / late are computed first and the row is written
+  with ONE insert (no create-then-save)
+
+A warm check-in is one INSERT.
+"""
+
+import hmac
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from courses.models import BatchEnrollment
+from .models import Attendance, AttendanceSession
+
+logger = logging.getLogger(__name__)
+
+CACHE_TIMEOUT = getattr(settings, "ATTENDANCE_CHECKIN_CACHE_TIMEOUT", 10 * 60)
+
+SESSION_KEY = "attendance:checkin:session:{session_id}"
+MARKED_KEY = "attendance:checkin:marked:{session_id}:{student_id}"
+
+SESSION_FIELDS = (
+    'id', 'batch_id', 'qr_secret', 'start_time', 'end_time',
+    'latitude', 'longitude', 'allowed_radius_meters', 'is_active',
+)
+
+
+class CheckInError(Exception):
+    """Scan rejected - ``message`` goes back to the scanner page"""
+
+    def __init__(self, message, status=200, **extra):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+        self.extra = extra
+
+
+def get_session_meta(session_id):
+    """``{'session': AttendanceSession | None, 'students': frozenset}`` from cache"""
+    key = SESSION_KEY.format(session_id=session_id)
+    meta = cache.get(key)
+    if meta is None:
+        session = AttendanceSession.objects.only(*SESSION_FIELDS).filter(pk=session_id).first()
+        students = frozenset()
+        if session is not None:
+            students = frozenset(BatchEnrollment.objects.filter(
+                batch_id=session.batch_id, is_active=True
+            ).values_list('student_id', flat=True))
+        meta = {'session': session, 'students': students}
+        # Unknown ids are cached too - a flood of bad QR codes stays off the DB
+        cache.set(key, meta, CACHE_TIMEOUT)
+    return meta
+
+
+def invalidate_session_meta(*session_ids):
+    cache.delete_many([SESSION_KEY.format(session_id=session_id) for session_id in session_ids])
+
+
+def parse_qr(qr_data):
+    """``(session_id, qr_secret)`` from ``ATTENDANCE:<id>:<secret>``"""
+    if not isinstance(qr_data, str) or not qr_data.startswith('ATTENDANCE:'):
+        raise CheckInError('Invalid QR code!')
+    try:
+        _, session_id, qr_secret = qr_data.split(':')
+        return int(session_id), qr_secret
+    except ValueError:
+        raise CheckInError('Invalid QR code format!')
+
+
+def _coordinate(value):
+    try:
+        return round(float(value), 6)
+    except (TypeError, ValueError):
+        return None
+
+
+def check_in(student, qr_data, latitude, longitude, now=None):
+    """
+    Mark ``student`` for the scanned session. Returns the saved
+    ``Attendance`` (present or out-of-radius absent); raises ``CheckInError``.
+    """
+    now = now or timezone.now()
+    session_id, qr_secret = parse_qr(qr_data)
+
+    meta = get_session_meta(session_id)
+    session = meta['session']
+    if (
+        session is None
+        or not session.is_active
+        # bytes - compare_digest() rejects non-ASCII str (garbage QR codes)
+        or not hmac.compare_digest(session.qr_secret.encode(), qr_secret.encode())
+    ):
+        raise CheckInError('Invalid or expired QR code!')
+
+    if not session.is_open_now():
+        start = timezone.localtime(session.start_time).strftime("%I:%M %p")
+        end = timezone.localtime(session.end_time).strftime("%I:%M %p") if session.end_time else '-'
+        raise CheckInError(f'Session closed! Time: {start} - {end}')
+
+    if student.id not in meta['students']:
+        raise CheckInError('You are not enrolled in this batch!')
+
+    latitude, longitude = _coordinate(latitude), _coordinate(longitude)
+    if latitude is None or longitude is None:
+        raise CheckInError('Location permission required!')
+
+    marked_key = MARKED_KEY.format(session_id=session_id, student_id=student.id)
+    if not cache.add(marked_key, 1, CACHE_TIMEOUT):
+        raise CheckInError('Attendance already marked!')
+
+    # Outcome first, then a single insert
+    attendance = Attendance(
+        session=session,
+        student=student,
+        marking_method='qr_scan',
+        student_latitude=latitude,
+        student_longitude=longitude,
+    )
+    distance = attendance.calculate_distance()
+    attendance.distance_from_classroom = distance
+    attendance.is_within_radius = distance is not None and distance <= session.allowed_radius_meters
+    attendance.is_present = attendance.is_within_radius
+    attendance.is_late = attendance.is_present and now > session.start_time
+
+    try:
+        with transaction.atomic():
+            attendance.save(force_insert=True)
+    except IntegrityError:
+        # Marked through another path (manual / second device) - keep the guard key
+        raise CheckInError('Attendance already marked!')
+    except Exception:
+        cache.delete(marked_key)
+        raise
+
+    return attendance
+
+
+# ==================== CACHE INVALIDATION SIGNALS ====================
+
+@receiver(post_save, sender=AttendanceSession)
+@receiver(post_delete, sender=AttendanceSession)
+def session_changed(sender, instance, **kwargs):
+    invalidate_session_meta(instance.pk)
+
+
+@receiver(post_save, sender=BatchEnrollment)
+@receiver(post_delete, sender=BatchEnrollment)
+def enrollment_changed(sender, instance, **kwargs):
+    invalidate_session_meta(*AttendanceSession.objects.filter(
+        batch_id=instance.batch_id, is_active=True
+    ).values_list('id', flat=True))
+
+
+@receiver(post_delete, sender=Attendance)
+def attendance_deleted(sender, instance, **kwargs):
+    # Instructor removed the record - the student may scan again
+    cache.delete(MARKED_KEY.format(session_id=instance.session_id, student_id=instance.student_id))
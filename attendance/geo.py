@@ -0,0 +1,56 @@
+# attendance/geo.py - Distance helpers for attendance location checks
+"""
+Haversine on a sphere (R = 6371 km) is accurate to ~0.5% - a few metres at
+classroom radii - and costs a handful of float ops, so it is the default:
+
+- ``haversine_m()``       one check-in
+- ``haversine_m_many()``  NumPy, one classroom point vs. many students
+                           (re-verify a whole session at once)
+
+``precise=True`` switches to geopy's ellipsoidal ``geodesic`` (imported only
+when asked for).
+"""
+
+from math import asin, cos, radians, sin, sqrt
+
+EARTH_RADIUS_M = 6371000
+
+
+def haversine_m(lat1, lon1, lat2, lon2):
+    """Great-circle distance in metres between two points (degrees)"""
+    lat1, lon1, lat2, lon2 = map(radians, (float(lat1), float(lon1), float(lat2), float(lon2)))
+    a = sin((lat2 - lat1) / 2) ** 2 + cos(lat1) * cos(lat2) * sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * asin(sqrt(a))
+
+
+def haversine_m_many(lat, lon, lats, lons):
+    """Distances in metres from (``lat``, ``lon``) to each point of ``lats`` / ``lons`` (NumPy array)"""
+    import numpy as np
+
+    lat, lon = np.radians(float(lat)), np.radians(float(lon))
+    lats = np.radians(np.asarray(lats, dtype=float))
+    lons = np.radians(np.asarray(lons, dtype=float))
+    a = np.sin((lats - lat) / 2) ** 2 + np.cos(lat) * np.cos(lats) * np.sin((lons - lon) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+
+def geodesic_m(lat1, lon1, lat2, lon2):
+    """Ellipsoidal (WGS-84) distance in metres - slow, for the precise mode"""
+    from geopy.distance import geodesic
+
+    return geodesic((float(lat1), float(lon1)), (float(lat2), float(lon2))).meters
+
+
+def distance_m(lat1, lon1, lat2, lon2, precise=False):
+    if precise:
+        return geodesic_m(lat1, lon1, lat2, lon2)
+    return haversine_m(lat1, lon1, lat2, lon2)
+
+
+def distances_m(lat, lon, lats, lons, precise=False):
+    """``distance_m`` for many points - NumPy array"""
+    if precise:
+        import numpy as np
+
+        return np.array([geodesic_m(lat, lon, lat2, lon2) for lat2, lon2 in zip(lats, lons)], dtype=float)
+    return haversine_m_many(lat, lon, lats, lons)
@@ -0,0 +1,22 @@
+# attendance/management/commands/rebuild_attendance_summaries.py
+
+from django.core.management.base import BaseCommand
+
+from attendance.summary import rebuild_all_summaries
+
+
+class Command(BaseCommand):
+    help = 'Recount the per-student attendance summaries from attendance records'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--student',
+            type=int,
+            action='append',
+            help='Only recount summaries of this student id (repeatable)',
+        )
+
+    def handle(self, *args, **options):
+        written = rebuild_all_summaries(options['student'])
+
+        self.stdout.write(self.style.SUCCESS(f'Attendance summaries recounted: {written}'))
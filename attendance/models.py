@@ -7,7 +7,6 @@ import qrcode
 from io import BytesIO
 from django.core.files import File
 import uuid
-from math import radians, cos, sin, asin, sqrt
 from courses.models import *
 from django.db.models import Q  # ✅ Add this import
 
@@ -24,9 +23,9 @@ import qrcode
 from io import BytesIO
 from django.core.files import File
 import uuid
-from math import radians, cos, sin, asin, sqrt
 from courses.models import *
 from django.db.models import Q
+from .geo import haversine_m
 from django.conf import settings
 from datetime import timedelta
 
@@ -228,27 +227,14 @@ class Attendance(models.Model):
         return f"{self.student.get_full_name()} - {self.session.start_time.date()} - {'Present' if self.is_present else 'Absent'}"
     
     def calculate_distance(self):
-        """Calculate distance between student and classroom using Haversine formula"""
+        """Distance in metres between student and classroom (haversine, attendance/geo.py)"""
         if not self.student_latitude or not self.student_longitude:
             return None
         
-        # Convert to radians
-        lon1 = radians(float(self.session.longitude))
-        lat1 = radians(float(self.session.latitude))
-        lon2 = radians(float(self.student_longitude))
-        lat2 = radians(float(self.student_latitude))
-        
-        # Haversine formula
-        dlon = lon2 - lon1
-        dlat = lat2 - lat1
-        a = sin(dlat/2)**2 + cos(lat1) * cos(lat2) * sin(dlon/2)**2
-        c = 2 * asin(sqrt(a))
-        
-        # Earth radius in meters
-        radius_earth = 6371000
-        distance = c * radius_earth
-        
-        return int(distance)
+        return int(haversine_m(
+            self.session.latitude, self.session.longitude,
+            self.student_latitude, self.student_longitude,
+        ))
     
     def verify_location(self):
         """Check if student is within allowed radius"""
@@ -338,4 +324,42 @@ class ManualAttendanceRequest(models.Model):
         ]
     
     def __str__(self):
-        return f"{self.student.get_full_name()} - {self.session.start_time.date()} - {self.status}"
\ No newline at end of file
+        return f"{self.student.get_full_name()} - {self.session.start_time.date()} - {self.status}"
+
+# attendance/models.py - AttendanceSummary rollup
+
+class AttendanceSummary(models.Model):
+    """
+    Attendance counters per (student, batch) - kept up to date on every
+    Attendance insert / update / delete (attendance/summary.py),
+    rebuild with `manage.py rebuild_attendance_summaries`
+    """
+    
+    student = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='attendance_summaries'
+    )
+    batch = models.ForeignKey(
+        Batch,
+        on_delete=models.CASCADE,
+        related_name='attendance_summaries'
+    )
+    
+    total = models.PositiveIntegerField(default=0)
+    present = models.PositiveIntegerField(default=0)
+    absent = models.PositiveIntegerField(default=0)
+    late = models.PositiveIntegerField(default=0, help_text="Present but late")
+    
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        unique_together = ['student', 'batch']
+        verbose_name_plural = 'Attendance summaries'
+    
+    @property
+    def percentage(self):
+        return (self.present / self.total * 100) if self.total > 0 else 0
+    
+    def __str__(self):
+        return f"{self.student} - {self.batch} - {self.present}/{self.total}"
@@ -0,0 +1,219 @@
+# attendance/summary.py - AttendanceSummary maintenance
+"""
+``AttendanceSummary`` holds present / absent / late / total per (student, batch)
+so dashboards and reports read one row instead of re-counting ``Attendance``.
+
+- single saves / deletes apply a +/- delta with one ``F()`` UPDATE (signals
+  below); the state a row was loaded with is remembered in ``post_init``
+- bulk writes (``bulk_create`` / ``bulk_update`` send no signals) call
+  ``recompute_summaries(pairs)`` for the (student, batch) pairs they touched
+- ``manage.py rebuild_attendance_summaries`` rebuilds everything
+"""
+
+from django.conf import settings
+from django.db.models import Count, F, Q, Sum
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from courses.models import BatchEnrollment
+from .models import Attendance, AttendanceSession, AttendanceSummary
+
+BATCH_SIZE = getattr(settings, "ATTENDANCE_SUMMARY_BATCH_SIZE", 1000)
+
+COUNTERS = ['total', 'present', 'absent', 'late']
+
+
+def counts_for(is_present, is_late):
+    """Counter contribution of one attendance row"""
+    return {
+        'total': 1,
+        'present': int(bool(is_present)),
+        'absent': int(not is_present),
+        'late': int(bool(is_present and is_late)),
+    }
+
+
+def aggregate_summaries(attendances):
+    """``values()`` rows of (student_id, batch_id, counters) for an Attendance queryset"""
+    return attendances.values('student_id', batch_id=F('session__batch_id')).annotate(
+        total=Count('id'),
+        present=Count('id', filter=Q(is_present=True)),
+        absent=Count('id', filter=Q(is_present=False)),
+        late=Count('id', filter=Q(is_present=True, is_late=True)),
+    ).order_by()
+
+
+def recompute_summaries(pairs):
+    """
+    Recount the summaries of ``pairs`` [(student_id, batch_id)] from
+    ``Attendance`` - one aggregate query + one upsert. Returns rows written.
+    """
+    pairs = set(pairs)
+    if not pairs:
+        return 0
+
+    student_ids = {student_id for student_id, _ in pairs}
+    batch_ids = {batch_id for _, batch_id in pairs}
+    found = {
+        (row['student_id'], row['batch_id']): row
+        for row in aggregate_summaries(Attendance.objects.filter(
+            student_id__in=student_ids, session__batch_id__in=batch_ids
+        ))
+    }
+
+    summaries = []
+    for student_id, batch_id in pairs:
+        row = found.get((student_id, batch_id)) or dict.fromkeys(COUNTERS, 0)
+        summaries.append(AttendanceSummary(
+            student_id=student_id,
+            batch_id=batch_id,
+            **{counter: row[counter] for counter in COUNTERS},
+        ))
+
+    AttendanceSummary.objects.bulk_create(
+        summaries,
+        update_conflicts=True,
+        unique_fields=['student', 'batch'],
+        update_fields=COUNTERS,
+        batch_size=BATCH_SIZE,
+    )
+    return len(summaries)
+
+
+def rebuild_all_summaries(student_ids=None):
+    """Full rebuild (optionally for some students). Returns rows written."""
+    attendances = Attendance.objects.all()
+    summaries = AttendanceSummary.objects.all()
+    if student_ids:
+        attendances = attendances.filter(student_id__in=student_ids)
+        summaries = summaries.filter(student_id__in=student_ids)
+
+    pairs = {(row['student_id'], row['batch_id']) for row in aggregate_summaries(attendances)}
+    # Rows whose attendance is gone are zeroed too
+    pairs |= set(summaries.values_list('student_id', 'batch_id'))
+
+    written = 0
+    pairs = sorted(pairs)
+    for start in range(0, len(pairs), BATCH_SIZE):
+        written += recompute_summaries(pairs[start:start + BATCH_SIZE])
+    return written
+
+
+def summary_totals(summaries):
+    """``{total, present, absent, late}`` summed over an AttendanceSummary queryset"""
+    totals = summaries.aggregate(**{counter: Sum(counter) for counter in COUNTERS})
+    return {counter: totals[counter] or 0 for counter in COUNTERS}
+
+
+def session_stats_bulk(sessions):
+    """
+    ``{session_id: stats}`` shaped like ``AttendanceSession.get_stats()`` for
+    many sessions - one grouped attendance query + one enrollment count query
+    """
+    sessions = list(sessions)
+    if not sessions:
+        return {}
+
+    marked = {
+        row['session_id']: row
+        for row in Attendance.objects.filter(session__in=sessions).values('session_id').annotate(
+            total_marked=Count('id'),
+            present_count=Count('id', filter=Q(is_present=True)),
+            absent_count=Count('id', filter=Q(is_present=False)),
+            late_count=Count('id', filter=Q(is_late=True)),
+            qr_count=Count('id', filter=Q(marking_method='qr_scan')),
+            manual_count=Count('id', filter=Q(marking_method='manual')),
+        ).order_by()
+    }
+    enrolled = dict(
+        BatchEnrollment.objects.filter(
+            batch_id__in={session.batch_id for session in sessions}, is_active=True
+        ).values('batch_id').annotate(students=Count('id')).values_list('batch_id', 'students').order_by()
+    )
+
+    stats = {}
+    for session in sessions:
+        row = marked.get(session.id, {})
+        total_students = enrolled.get(session.batch_id, 0)
+        present_count = row.get('present_count', 0)
+        stats[session.id] = {
+            'total_students': total_students,
+            'total_marked': row.get('total_marked', 0),
+            'present_count': present_count,
+            'absent_count': row.get('absent_count', 0),
+            'late_count': row.get('late_count', 0),
+            'not_marked': total_students - row.get('total_marked', 0),
+            'attendance_percentage': round(present_count / total_students * 100, 2) if total_students > 0 else 0,
+            'qr_count': row.get('qr_count', 0),
+            'manual_count': row.get('manual_count', 0),
+        }
+    return stats
+
+
+def apply_delta(student_id, batch_id, delta):
+    """Add ``delta`` ({counter: +/-n}) to one summary row - recount if it doesn't exist yet"""
+    updated = AttendanceSummary.objects.filter(student_id=student_id, batch_id=batch_id).update(
+        **{counter: F(counter) + delta[counter] for counter in COUNTERS}
+    )
+    if not updated:
+        recompute_summaries([(student_id, batch_id)])
+
+
+def _state(instance):
+    # __dict__ - never trigger a query for a deferred field
+    values = instance.__dict__
+    if values.get('id') is None or 'session_id' not in values or 'is_present' not in values:
+        return None
+    return (values['session_id'], values.get('student_id'), values['is_present'], values.get('is_late', False))
+
+
+def _batch_id(session_id, instance=None):
+    session = instance._state.fields_cache.get('session') if instance is not None else None
+    if session is not None and session.pk == session_id:
+        return session.batch_id
+    return AttendanceSession.objects.filter(pk=session_id).values_list('batch_id', flat=True).first()
+
+
+# ==================== SIGNALS ====================
+
+@receiver(post_init, sender=Attendance)
+def remember_state(sender, instance, **kwargs):
+    instance._summary_state = _state(instance)
+
+
+@receiver(post_save, sender=Attendance)
+def attendance_saved(sender, instance, created, **kwargs):
+    old = None if created else getattr(instance, '_summary_state', None)
+    new = (instance.session_id, instance.student_id, instance.is_present, instance.is_late)
+    instance._summary_state = new
+
+    if created:
+        apply_delta(instance.student_id, _batch_id(instance.session_id, instance), counts_for(*new[2:]))
+        return
+    if old == new:
+        return
+    if old is None or old[1] is None:
+        # Loaded with deferred fields - recount instead of guessing the old state
+        recompute_summaries([(instance.student_id, _batch_id(instance.session_id, instance))])
+        return
+
+    old_session_id, old_student_id, old_present, old_late = old
+    before, after = counts_for(old_present, old_late), counts_for(*new[2:])
+    if (old_session_id, old_student_id) == new[:2]:
+        # Same row, status changed - one UPDATE with the difference
+        apply_delta(instance.student_id, _batch_id(instance.session_id, instance),
+                    {counter: after[counter] - before[counter] for counter in COUNTERS})
+        return
+    apply_delta(old_student_id, _batch_id(old_session_id),
+                {counter: -value for counter, value in before.items()})
+    apply_delta(instance.student_id, _batch_id(instance.session_id, instance), after)
+
+
+@receiver(post_delete, sender=Attendance)
+def attendance_deleted(sender, instance, **kwargs):
+    batch_id = _batch_id(instance.session_id, instance)
+    if batch_id is None:
+        return  # Session deleted too - its summaries are recounted by the rebuild command
+    apply_delta(instance.student_id, batch_id, {
+        counter: -value for counter, value in counts_for(instance.is_present, instance.is_late).items()
+    })
@@ -12,6 +12,7 @@ urlpatterns = [
     path('instructor/sessions/', views.instructor_sessions, name='instructor_sessions'),
     path('instructor/create-session/', views.create_session, name='create_session'),
     path('session/<int:session_id>/', views.session_detail, name='session_detail'),
+    path('session/<int:session_id>/recheck-locations/', views.recheck_session_locations, name='recheck_session_locations'),
     
     # Manual Attendance
     path('session/<int:session_id>/student/<int:student_id>/mark/', 
@@ -64,6 +65,7 @@ path('request-manual/<int:session_id>/',
 # - instructor_sessions: List all sessions
 # - create_session: Create new attendance session
 # - session_detail: View session with student list
+# - recheck_session_locations: Fix classroom coordinates + re-check all QR scans
 # - manual_mark_attendance: Mark individual student
 # - mark_attendance: Mark multiple students page
 # - mark_selected_attendance: AJAX bulk mark selected
@@ -1,112 +1,167 @@
-from geopy.distance import geodesic
+from .geo import distance_m, distances_m
 
-def is_within_allowed_location(lat, lon, session, radius_meters=100):
+def is_within_allowed_location(lat, lon, session, radius_meters=None, precise=False):
     """
-    Checks whether student's location is within the allowed radius of the session's allowed location.
+    Checks whether student's location is within the allowed radius of the session's classroom.
     """
     try:
         if not (lat and lon):
-            print("⚠️ Missing latitude or longitude.")
+            logger.warning("Location check: missing latitude or longitude")
             return False
 
-        if not session.allowed_latitude or not session.allowed_longitude:
-            print("⚠️ Session has no allowed location defined.")
+        if session.latitude is None or session.longitude is None:
             return True  # Skip restriction if location not set
 
-        session_location = (session.allowed_latitude, session.allowed_longitude)
-        student_location = (lat, lon)
-        distance = geodesic(session_location, student_location).meters
-        print(f"📏 Distance from allowed location: {distance:.2f} meters")
-
-        return distance <= radius_meters
-    except Exception as e:
-        print(f"❌ Error in is_within_allowed_location: {e}")
+        if radius_meters is None:
+            radius_meters = session.allowed_radius_meters
+        return distance_m(session.latitude, session.longitude, lat, lon, precise=precise) <= radius_meters
+    except (TypeError, ValueError) as e:
+        logger.error(f"Error in is_within_allowed_location: {e}")
         return False
 
 
 # attendance/utils.py
 
+import logging
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, F, OuterRef
 from django.utils import timezone
 from .models import AttendanceSession, Attendance
-from courses.models import BatchEnrollment
-import logging
+from .summary import recompute_summaries
 
 logger = logging.getLogger(__name__)
 
+ABSENT_BATCH_SIZE = getattr(settings, "ATTENDANCE_ABSENT_BATCH_SIZE", 1000)
+
 
-def mark_absent_for_ended_sessions():
+def unmarked_pairs(session_ids):
     """
-    Automatically mark absent for students who didn't attend ended sessions
+    ``[(session_id, student_id)]`` of active batch enrollments with no
+    attendance row for the session - one anti-join query
     """
-    
-    current_time = timezone.now()
-    
-    # Get sessions that ended but still active
-    ended_sessions = AttendanceSession.objects.filter(
-        is_active=True,
-        end_time__lt=current_time
+    return list(
+        AttendanceSession.objects.filter(
+            id__in=session_ids, batch__enrollments__is_active=True
+        ).annotate(
+            enrolled_student_id=F('batch__enrollments__student_id')
+        ).filter(
+            ~Exists(Attendance.objects.filter(
+                session_id=OuterRef('pk'), student_id=OuterRef('enrolled_student_id')
+            ))
+        ).values_list('pk', 'enrolled_student_id').distinct().order_by()
     )
+
+
+def mark_absent_for_ended_sessions(now=None):
+    """
+    Automatically mark absent for students who didn't attend ended sessions,
+    then deactivate those sessions. Returns the number of absent rows created.
+    """
+    started = time.monotonic()
+    now = now or timezone.now()
     
-    if ended_sessions.count() == 0:
-        print("✅ No ended sessions to process")
+    # Freeze the set first - sessions ending while we run wait for the next tick
+    session_ids = list(
+        AttendanceSession.objects.filter(is_active=True, end_time__lt=now).values_list('id', flat=True)
+    )
+    if not session_ids:
+        logger.debug("Auto-absent: no ended sessions to process")
         return 0
     
-    print("=" * 60)
-    print(f"🔍 AUTO-ABSENT CHECKER")
-    print(f"⏰ Time: {timezone.localtime(current_time).strftime('%d/%m/%Y %I:%M %p')}")
-    print(f"📊 Ended Sessions: {ended_sessions.count()}")
-    print("=" * 60)
-    
-    total_marked = 0
-    
-    for session in ended_sessions:
-        print(f"\n✅ Processing: {session.batch.name}")
-        print(f"   Session: {session.start_time.strftime('%d/%m/%Y %I:%M %p')}")
-        
-        # Get enrolled students
-        enrolled = BatchEnrollment.objects.filter(
-            batch=session.batch,
-            is_active=True
-        ).values_list('student_id', flat=True)
-        
-        # Get who marked
-        marked = Attendance.objects.filter(
-            session=session
-        ).values_list('student_id', flat=True)
-        
-        # Find who didn't mark
-        unmarked_ids = set(enrolled) - set(marked)
+    with transaction.atomic():
+        pairs = unmarked_pairs(session_ids)
+        found_at = time.monotonic()
         
-        print(f"   👥 Total: {len(enrolled)} | ✅ Marked: {len(marked)} | ❌ Unmarked: {len(unmarked_ids)}")
-        
-        # Mark absent
-        for student_id in unmarked_ids:
-            try:
-                from userss.models import CustomUser
-                student = CustomUser.objects.get(id=student_id)
-                
-                Attendance.objects.create(
-                    session=session,
-                    student=student,
+        # ignore_conflicts - a student scanning the QR at the last second wins (unique session+student)
+        Attendance.objects.bulk_create(
+            [
+                Attendance(
+                    session_id=session_id,
+                    student_id=student_id,
                     is_present=False,
                     is_late=False,
                     marking_method='manual',
-                    notes='Auto-marked absent: Session ended without attendance'
+                    notes='Auto-marked absent: Session ended without attendance',
                 )
-                total_marked += 1
-                print(f"      ❌ Marked absent: {student.get_full_name()}")
-                
-            except Exception as e:
-                logger.error(f"Error marking absent for student {student_id}: {str(e)}")
-                print(f"      ⚠️ Error: {str(e)}")
+                for session_id, student_id in pairs
+            ],
+            batch_size=ABSENT_BATCH_SIZE,
+            ignore_conflicts=True,
+        )
         
-        # Deactivate session
-        session.is_active = False
-        session.save()
-        print(f"   🔒 Session deactivated")
-    
-    print("=" * 60)
-    print(f"✅ COMPLETED: Marked {total_marked} students as absent")
-    print("=" * 60)
+        # bulk_create sends no signals - recount the touched summaries
+        batch_ids = dict(
+            AttendanceSession.objects.filter(id__in=session_ids).values_list('id', 'batch_id')
+        )
+        recompute_summaries({(student_id, batch_ids[session_id]) for session_id, student_id in pairs})
+        
+        deactivated = AttendanceSession.objects.filter(id__in=session_ids, is_active=True).update(is_active=False)
     
-    return total_marked
\ No newline at end of file
+    finished = time.monotonic()
+    logger.info(
+        "Auto-absent: %s ended sessions, %s students marked absent, %s sessions deactivated "
+        "(anti-join %.3fs, write %.3fs)",
+        len(session_ids), len(pairs), deactivated, found_at - started, finished - found_at,
+    )
+    return len(pairs)
+
+
+def revalidate_session_locations(session, precise=False):
+    """
+    Re-check every QR attendance of ``session`` against its (corrected)
+    classroom coordinates / radius in one vectorized pass: distance,
+    within-radius, present and late are recomputed and written with one
+    ``bulk_update``. Manual marks are left alone. Returns counts.
+    """
+    rows = list(
+        session.attendances.filter(
+            marking_method='qr_scan',
+            student_latitude__isnull=False,
+            student_longitude__isnull=False,
+        ).only(
+            'id', 'session_id', 'student_id', 'student_latitude', 'student_longitude', 'marked_at',
+            'distance_from_classroom', 'is_within_radius', 'is_present', 'is_late',
+        )
+    )
+    result = {'checked': len(rows), 'changed': 0, 'now_present': 0, 'now_absent': 0}
+    if not rows:
+        return result
+
+    distances = distances_m(
+        session.latitude, session.longitude,
+        [row.student_latitude for row in rows],
+        [row.student_longitude for row in rows],
+        precise=precise,
+    )
+    within = distances <= session.allowed_radius_meters
+
+    changed = []
+    for row, distance, ok in zip(rows, distances, within):
+        ok = bool(ok)
+        before = (row.distance_from_classroom, row.is_within_radius, row.is_present, row.is_late)
+        row.distance_from_classroom = int(distance)
+        row.is_within_radius = ok
+        row.is_present = ok
+        row.is_late = ok and row.marked_at > session.start_time
+        if before != (row.distance_from_classroom, row.is_within_radius, row.is_present, row.is_late):
+            changed.append(row)
+            if before[2] != row.is_present:
+                result['now_present' if ok else 'now_absent'] += 1
+
+    Attendance.objects.bulk_update(
+        changed,
+        ['distance_from_classroom', 'is_within_radius', 'is_present', 'is_late'],
+        batch_size=ABSENT_BATCH_SIZE,
+    )
+    result['changed'] = len(changed)
+    # bulk_update sends no signals - recount the touched summaries
+    recompute_summaries({(row.student_id, session.batch_id) for row in changed})
+
+    logger.info(
+        "Location re-check for session %s: %s checked, %s changed (%s now present, %s now absent)",
+        session.pk, result['checked'], result['changed'], result['now_present'], result['now_absent'],
+    )
+    return result
@@ -6,11 +6,17 @@ from django.http import JsonResponse
 from django.contrib import messages
 from django.utils import timezone
 from django.views.decorators.http import require_POST
-from django.db.models import Q, Count, Avg
+from django.db.models import Q, Count, Avg, Sum
 import json
-from .models import AttendanceSession, Attendance, ManualAttendanceRequest
+import logging
+from .models import AttendanceSession, Attendance, AttendanceSummary, ManualAttendanceRequest
+from .checkin import CheckInError, check_in
+from .summary import session_stats_bulk, summary_totals
+from .utils import revalidate_session_locations
 from courses.models import BatchEnrollment, Batch
 
+logger = logging.getLogger(__name__)
+
 # Helper function for role-based redirects
 def get_dashboard_url(user):
     """Return appropriate dashboard URL based on user role"""
@@ -295,6 +301,46 @@ def instructor_sessions(request):
 
 
     
+@login_required
+@require_POST
+def recheck_session_locations(request, session_id):
+    """Correct classroom coordinates / radius (optional) and re-check all QR scans of the session"""
+    
+    if request.user.role not in ['instructor', 'superadmin']:
+        messages.error(request, 'Access denied!')
+        return redirect(get_dashboard_url(request.user))
+    
+    session = get_object_or_404(AttendanceSession, id=session_id)
+    
+    if request.user.role == 'instructor' and session.instructor != request.user:
+        messages.error(request, 'Access denied!')
+        return redirect('attendance:instructor_sessions')
+    
+    try:
+        updates = {}
+        for field in ('latitude', 'longitude'):
+            if request.POST.get(field):
+                updates[field] = float(request.POST[field])
+        if request.POST.get('allowed_radius_meters'):
+            updates['allowed_radius_meters'] = int(request.POST['allowed_radius_meters'])
+    except ValueError:
+        messages.error(request, 'Invalid coordinates or radius!')
+        return redirect('attendance:session_detail', session_id=session_id)
+    
+    if updates:
+        for field, value in updates.items():
+            setattr(session, field, value)
+        session.save(update_fields=list(updates))
+    
+    result = revalidate_session_locations(session, precise=request.POST.get('precise') == '1')
+    messages.success(
+        request,
+        f"Re-checked {result['checked']} QR scans: {result['now_present']} now present, "
+        f"{result['now_absent']} now absent."
+    )
+    return redirect('attendance:session_detail', session_id=session_id)
+
+    
 @login_required
 def session_detail(request, session_id):
     """View session details and attendance list"""
@@ -403,7 +449,7 @@ def student_scanner(request):
 @login_required
 @require_POST
 def mark_attendance_qr(request):
-    """Mark attendance via QR code scan with location verification"""
+    """Mark attendance via QR code scan with location verification (attendance/checkin.py)"""
     
     if request.user.role != 'student':
         return JsonResponse({
@@ -413,168 +459,40 @@ def mark_attendance_qr(request):
     
     try:
         data = json.loads(request.body)
-        qr_data = data.get('qr_data', '')
-        student_lat = data.get('latitude')
-        student_lon = data.get('longitude')
-        
-        # Validate QR data
-        if not qr_data.startswith('ATTENDANCE:'):
-            return JsonResponse({
-                'success': False,
-                'message': 'Invalid QR code!'
-            })
-        
-        # Parse QR data
-        try:
-            _, session_id, qr_secret = qr_data.split(':')
-        except ValueError:
-            return JsonResponse({
-                'success': False,
-                'message': 'Invalid QR code format!'
-            })
-        
-        # Get session
-        try:
-            session = AttendanceSession.objects.get(
-                id=session_id,
-                qr_secret=qr_secret,
-                is_active=True
-            )
-        except AttendanceSession.DoesNotExist:
-            return JsonResponse({
-                'success': False,
-                'message': 'Invalid or expired QR code!'
-            })
-        
-        # ===== DEBUGGING START =====
-        from django.utils import timezone
-        import logging
-        
-        logger = logging.getLogger(__name__)
-        current_time = timezone.now()
-        
-        debug_info = {
-            'current_datetime': str(current_time),
-            'current_timezone': str(timezone.get_current_timezone()),
-            'session_start_time': str(session.start_time),
-            'session_end_time': str(session.end_time),
-            'session_start_type': type(session.start_time).__name__,
-            'session_end_type': type(session.end_time).__name__,
-        }
-        
-        logger.info(f"DEBUG ATTENDANCE: {debug_info}")
-        print("="*60)
-        print("DEBUGGING ATTENDANCE SESSION CHECK")
-        print("="*60)
-        print(f"Current DateTime: {current_time}")
-        print(f"Current Timezone: {timezone.get_current_timezone()}")
-        print(f"Session Start: {session.start_time} (Type: {type(session.start_time).__name__})")
-        print(f"Session End: {session.end_time} (Type: {type(session.end_time).__name__})")
-        print(f"Session is_active: {session.is_active}")
-        print("="*60)
-        
-        # Check if session is open
-        is_open = session.is_open_now()
-        print(f"is_open_now() result: {is_open}")
-        
-        if hasattr(session, 'start_time') and hasattr(session, 'end_time'):
-            # Manual time check
-            current_time_only = current_time.time()
-            start_time_only = session.start_time.time() if hasattr(session.start_time, 'time') else session.start_time
-            end_time_only = session.end_time.time() if hasattr(session.end_time, 'time') else session.end_time
-            
-            print(f"\nManual Check (Time Only):")
-            print(f"  Current Time: {current_time_only}")
-            print(f"  Start Time: {start_time_only}")
-            print(f"  End Time: {end_time_only}")
-            print(f"  Between? {start_time_only <= current_time_only <= end_time_only}")
-        
-        print("="*60)
-        # ===== DEBUGGING END =====
-        
-        if not is_open:
-            return JsonResponse({
-                'success': False,
-                'message': f'Session closed! Time: {session.start_time.strftime("%I:%M %p")} - {session.end_time.strftime("%I:%M %p")}',
-                'debug': debug_info  # Frontend mein dekh sakta hai
-            })
-        
-        # Check enrollment
-        if not BatchEnrollment.objects.filter(
-            student=request.user,
-            batch=session.batch,
-            is_active=True
-        ).exists():
-            return JsonResponse({
-                'success': False,
-                'message': 'You are not enrolled in this batch!'
-            })
-        
-        # Check if already marked
-        if Attendance.objects.filter(session=session, student=request.user).exists():
-            return JsonResponse({
-                'success': False,
-                'message': 'Attendance already marked!'
-            })
-        
-        # Validate location
-        if not student_lat or not student_lon:
-            return JsonResponse({
-                'success': False,
-                'message': 'Location permission required!'
-            })
-        
-        # Create attendance
-        attendance = Attendance.objects.create(
-            session=session,
-            student=request.user,
-            marking_method='qr_scan',
-            student_latitude=student_lat,
-            student_longitude=student_lon
+        attendance = check_in(
+            request.user,
+            data.get('qr_data', ''),
+            data.get('latitude'),
+            data.get('longitude'),
         )
-        
-        # Verify location
-        is_valid = attendance.verify_location()
-        
-        if not is_valid:
-            # Mark as absent - outside radius
-            attendance.is_present = False
-            attendance.save()
-            
-            return JsonResponse({
-                'success': False,
-                'message': f'Too far! You are {attendance.distance_from_classroom}m away. Max: {session.allowed_radius_meters}m',
-                'can_request': True  # Allow manual request
-            })
-        
-        # Check if late (compare datetime with datetime, not time with datetime!)
-        current_datetime = timezone.now()
-        if current_datetime > session.start_time:
-            attendance.is_late = True
-            attendance.save()
-        
-        return JsonResponse({
-            'success': True,
-            'message': 'Attendance marked!' + (' (Late)' if attendance.is_late else ''),
-            'data': {
-                'distance': attendance.distance_from_classroom,
-                'marked_at': attendance.marked_at.strftime('%I:%M %p'),
-                'is_late': attendance.is_late
-            }
-        })
-        
-    except Exception as e:
-        import traceback
-        error_trace = traceback.format_exc()
-        logger.error(f"ATTENDANCE ERROR: {error_trace}")
-        print("ERROR TRACE:")
-        print(error_trace)
-        
+    except CheckInError as e:
+        return JsonResponse({'success': False, 'message': e.message, **e.extra}, status=e.status)
+    except (ValueError, AttributeError):
+        return JsonResponse({'success': False, 'message': 'Invalid request!'}, status=400)
+    except Exception:
+        logger.exception("QR check-in failed for user %s", request.user.pk)
         return JsonResponse({
             'success': False,
-            'message': f'Error: {str(e)}',
-            'error_trace': error_trace  # Development mein hi dekh
+            'message': 'Could not mark attendance, please try again.'
         }, status=500)
+    
+    if not attendance.is_present:
+        # Saved as absent - outside radius
+        return JsonResponse({
+            'success': False,
+            'message': f'Too far! You are {attendance.distance_from_classroom}m away. Max: {attendance.session.allowed_radius_meters}m',
+            'can_request': True  # Allow manual request
+        })
+    
+    return JsonResponse({
+        'success': True,
+        'message': 'Attendance marked!' + (' (Late)' if attendance.is_late else ''),
+        'data': {
+            'distance': attendance.distance_from_classroom,
+            'marked_at': timezone.localtime(attendance.marked_at).strftime('%I:%M %p'),
+            'is_late': attendance.is_late
+        }
+    })
 # ==================== STUDENT - MANUAL REQUEST ====================
 from django.views.decorators.http import require_http_methods
 
@@ -1199,11 +1117,13 @@ def student_my_attendance(request):
         'session__batch'
     ).order_by('-session__created_at', '-session__start_time')
     
-    # Calculate overall stats
-    total_sessions = attendances.count()
-    present_count = attendances.filter(is_present=True).count()
-    absent_count = attendances.filter(is_present=False).count()
-    late_count = attendances.filter(is_late=True, is_present=True).count()
+    # ✅ Overall stats - one aggregate over the AttendanceSummary rows
+    summaries = AttendanceSummary.objects.filter(student=request.user)
+    totals = summary_totals(summaries)
+    total_sessions = totals['total']
+    present_count = totals['present']
+    absent_count = totals['absent']
+    late_count = totals['late']
     
     # Calculate percentage
     attendance_percentage = 0
@@ -1233,6 +1153,13 @@ def student_my_attendance(request):
         ).select_related('session')
     }
     
+    # ✅ Pending manual requests - one query instead of one per session
+    pending_session_ids = set(ManualAttendanceRequest.objects.filter(
+        student=request.user,
+        session__in=all_sessions,
+        status='pending'
+    ).values_list('session_id', flat=True))
+    
     # 🎯 Add status + attendance info to each session
     sessions_with_status = []
     for session in all_sessions:
@@ -1244,11 +1171,7 @@ def student_my_attendance(request):
         attendance_record = attendance_dict.get(session.id)
         
         # ✅ CHECK if manual request exists
-        has_pending_request = ManualAttendanceRequest.objects.filter(
-            session=session,
-            student=request.user,
-            status='pending'
-        ).exists()
+        has_pending_request = session.id in pending_session_ids
         
         sessions_with_status.append({
             'session': session,
@@ -1291,32 +1214,15 @@ def student_my_attendance(request):
         except ValueError:
             messages.warning(request, 'Invalid to_date format. Use YYYY-MM-DD')
     
-    # ✅ Calculate batch-wise stats
+    # ✅ Batch-wise stats - straight from the summary rows
     batch_stats = {}
-    all_batches = Attendance.objects.filter(
-        student=request.user
-    ).values('session__batch__id', 'session__batch__name').distinct()
-    
-    for batch in all_batches:
-        batch_id_val = batch['session__batch__id']
-        batch_name = batch['session__batch__name']
-        
-        batch_attendances = Attendance.objects.filter(
-            student=request.user,
-            session__batch_id=batch_id_val
-        )
-        
-        batch_total = batch_attendances.count()
-        batch_present = batch_attendances.filter(is_present=True).count()
-        batch_absent = batch_attendances.filter(is_present=False).count()
-        batch_late = batch_attendances.filter(is_late=True, is_present=True).count()
-        
-        batch_stats[batch_name] = {
-            'total': batch_total,
-            'present': batch_present,
-            'absent': batch_absent,
-            'late': batch_late,
-            'percentage': (batch_present / batch_total * 100) if batch_total > 0 else 0
+    for summary in summaries.select_related('batch').filter(total__gt=0).order_by('batch__name'):
+        batch_stats[summary.batch.name] = {
+            'total': summary.total,
+            'present': summary.present,
+            'absent': summary.absent,
+            'late': summary.late,
+            'percentage': summary.percentage,
         }
     
     # Pagination - Show recent 8 records
@@ -1570,8 +1476,23 @@ def attendance_reports(request):
     sessions = sessions.select_related('batch').order_by('-start_time')
     
     total_sessions = sessions.count()
-    total_attendances = Attendance.objects.filter(session__in=sessions).count()
-    present_count = Attendance.objects.filter(session__in=sessions, is_present=True).count()
+    if date_from or date_to:
+        # Date range cuts across summaries - one aggregate over the filtered sessions
+        marks = Attendance.objects.filter(session__in=sessions).aggregate(
+            total=Count('id'),
+            present=Count('id', filter=Q(is_present=True)),
+        )
+    else:
+        summaries = AttendanceSummary.objects.filter(batch_id__in=sessions.values('batch_id'))
+        marks = summary_totals(summaries)
+    total_attendances = marks['total']
+    present_count = marks['present']
+    
+    # ✅ Per-session stats in bulk (the template used to call get_stats per row)
+    sessions = list(sessions)
+    session_stats = session_stats_bulk(sessions)
+    for session in sessions:
+        session.stats = session_stats[session.id]
     
     overall_percentage = round((present_count / total_attendances * 100), 2) if total_attendances > 0 else 0
     
@@ -1611,21 +1532,42 @@ def attendance_analytics(request):
     total_sessions = sessions.count()
     active_sessions = sessions.filter(is_active=True).count()
     
-    all_attendances = Attendance.objects.filter(session__in=sessions)
-    total_marks = all_attendances.count()
-    present_marks = all_attendances.filter(is_present=True).count()
-    late_marks = all_attendances.filter(is_late=True).count()
+    # ✅ Totals from the AttendanceSummary rollup (no Attendance scan)
+    summaries = AttendanceSummary.objects.all()
+    if request.user.role != 'superadmin':
+        summaries = summaries.filter(batch__instructor=request.user)
+    totals = summary_totals(summaries)
+    total_marks = totals['total']
+    present_marks = totals['present']
+    late_marks = totals['late']
     
     avg_attendance = round((present_marks / total_marks * 100), 2) if total_marks > 0 else 0
     
-    batch_stats = sessions.values('batch__name').annotate(
-        session_count=Count('id'),
-        avg_attendance=Avg('attendances__is_present')
-    ).order_by('-session_count')[:10]
+    # Per batch: session count + present share of its summaries (as a percentage)
+    batch_sessions = dict(
+        sessions.values('batch_id').annotate(session_count=Count('id')).values_list('batch_id', 'session_count').order_by()
+    )
+    batch_marks = {
+        row['batch_id']: row
+        for row in summaries.filter(batch_id__in=batch_sessions).values('batch_id').annotate(
+            marked=Sum('total'), present_marked=Sum('present')
+        ).order_by()
+    }
+    batch_names = dict(Batch.objects.filter(id__in=batch_sessions).values_list('id', 'name'))
+    batch_stats = []
+    for batch_id, session_count in sorted(batch_sessions.items(), key=lambda item: -item[1])[:10]:
+        marks = batch_marks.get(batch_id, {})
+        marked = marks.get('marked') or 0
+        batch_stats.append({
+            'batch__name': batch_names.get(batch_id),
+            'session_count': session_count,
+            'avg_attendance': round((marks.get('present_marked') or 0) / marked * 100, 2) if marked else 0,
+        })
     
-    recent_sessions = sessions.select_related('batch').order_by('-start_time')[:10]
+    recent_sessions = list(sessions.select_related('batch').order_by('-start_time')[:10])
+    session_stats = session_stats_bulk(recent_sessions)
     for session in recent_sessions:
-        session.stats = session.get_stats()
+        session.stats = session_stats[session.id]
     
     context = {
         'total_sessions': total_sessions,
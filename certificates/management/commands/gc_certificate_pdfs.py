@@ -0,0 +1,39 @@
+# certificates/management/commands/gc_certificate_pdfs.py
+
+from django.core.management.base import BaseCommand
+
+from certificates.pdf_store import collect_garbage
+
+
+class Command(BaseCommand):
+    help = 'Delete certificate PDFs that no issued certificate references any more'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--min-age-hours',
+            type=float,
+            default=1.0,
+            help='Keep unreferenced files younger than this (may belong to a running job)',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report what would be deleted',
+        )
+        parser.add_argument(
+            '--store-only',
+            action='store_true',
+            help='Skip per-certificate files written before the content-addressed store',
+        )
+
+    def handle(self, *args, **options):
+        deleted, freed = collect_garbage(
+            min_age_seconds=int(options['min_age_hours'] * 3600),
+            dry_run=options['dry_run'],
+            include_legacy=not options['store_only'],
+        )
+
+        action = 'Would delete' if options['dry_run'] else 'Deleted'
+        self.stdout.write(
+            self.style.SUCCESS(f'{action} {deleted} unreferenced PDFs ({freed / (1024 * 1024):.1f} MB)')
+        )
@@ -0,0 +1,49 @@
+# certificates/management/commands/process_certificate_jobs.py
+import time
+
+from django.core.management.base import BaseCommand
+
+from certificates.pipeline import process_certificate_jobs
+
+
+class Command(BaseCommand):
+    help = 'Render PDFs of pending certificate issue jobs in a process pool'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=None,
+            help='Render processes (default: CERTIFICATE_RENDER_WORKERS or one per CPU core)',
+        )
+        parser.add_argument(
+            '--max-jobs',
+            type=int,
+            default=None,
+            help='Stop after this many jobs (default: all pending jobs)',
+        )
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Keep running and poll for new jobs (long-lived worker)',
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=5.0,
+            help='Seconds to wait between polls in --loop mode',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            processed = process_certificate_jobs(
+                max_jobs=options['max_jobs'],
+                workers=options['workers'],
+            )
+
+            if processed or not options['loop']:
+                self.stdout.write(self.style.SUCCESS(f'Certificate issue jobs processed: {processed}'))
+
+            if not options['loop']:
+                break
+            time.sleep(options['sleep'])
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-17 07:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('certificates', '0003_certificate_issue_job'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='certificateissuejob',
+            name='reused_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='issuedcertificate',
+            name='pdf_hash',
+            field=models.CharField(blank=True, db_index=True, max_length=64),
+        ),
+        migrations.AlterField(
+            model_name='certificateissuejob',
+            name='issue_type',
+            field=models.CharField(choices=[('individual', 'Individual'), ('batch', 'Batch'), ('course', 'Course'), ('reissue', 'Re-issue')], max_length=20),
+        ),
+        migrations.AlterField(
+            model_name='issuedcertificate',
+            name='pdf_status',
+            field=models.CharField(choices=[('none', 'Not Rendered'), ('pending', 'Queued'), ('rendering', 'Rendering'), ('ready', 'Ready'), ('stale', 'Stale (template changed)'), ('failed', 'Failed')], default='none', max_length=20),
+        ),
+    ]
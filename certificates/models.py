@@ -103,6 +103,15 @@ class IssuedCertificate(models.Model):
         ('expired', 'Expired'),
     ]
     
+    PDF_STATUS_CHOICES = [
+        ('none', 'Not Rendered'),
+        ('pending', 'Queued'),
+        ('rendering', 'Rendering'),
+        ('ready', 'Ready'),
+        ('stale', 'Stale (template changed)'),
+        ('failed', 'Failed'),
+    ]
+    
     # Unique identifier
     certificate_id = models.CharField(max_length=100, unique=True, editable=False)
     
@@ -136,6 +145,14 @@ class IssuedCertificate(models.Model):
     
     # Generated file
     generated_pdf = models.FileField(upload_to='certificates/issued/', blank=True, null=True)
+    pdf_status = models.CharField(max_length=20, choices=PDF_STATUS_CHOICES, default='none')
+    # sha256 of the rendered HTML - key into certificates/pdf_store.py
+    pdf_hash = models.CharField(max_length=64, blank=True, db_index=True)
+    pdf_error = models.TextField(blank=True)
+    issue_job = models.ForeignKey(
+        'CertificateIssueJob', on_delete=models.SET_NULL, null=True, blank=True,
+        related_name='certificates'
+    )
     
     # Status
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='active')
@@ -158,16 +175,81 @@ class IssuedCertificate(models.Model):
     def __str__(self):
         return f"Certificate #{self.certificate_id} - {self.student_name}"
     
-    def save(self, *args, **kwargs):
+    def assign_identifiers(self):
+        """Fill certificate_id / verification_code (bulk_create skips save())"""
         if not self.certificate_id:
             self.certificate_id = f"CERT-{uuid.uuid4().hex[:8].upper()}"
         
         if not self.verification_code:
             self.verification_code = uuid.uuid4().hex.upper()
-        
+    
+    def save(self, *args, **kwargs):
+        self.assign_identifiers()
         super().save(*args, **kwargs)
     
+    @property
+    def is_pdf_rendering(self):
+        return self.pdf_status in ('pending', 'rendering')
+    
     def get_verification_url(self):
         """Get public verification URL"""
         from django.urls import reverse
-        return reverse('certificates:verify', args=[self.verification_code])
\ No newline at end of file
+        return reverse('certificates:verify', args=[self.verification_code])
+
+
+class CertificateIssueJob(models.Model):
+    """Bulk certificate issuance - PDFs are rendered in the background"""
+    
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+    
+    ISSUE_TYPE_CHOICES = [
+        ('individual', 'Individual'),
+        ('batch', 'Batch'),
+        ('course', 'Course'),
+        ('reissue', 'Re-issue'),
+    ]
+    
+    template = models.ForeignKey(CertificateTemplate, on_delete=models.PROTECT, related_name='issue_jobs')
+    issue_type = models.CharField(max_length=20, choices=ISSUE_TYPE_CHOICES)
+    description = models.CharField(max_length=255, blank=True)
+    
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending', db_index=True)
+    total_count = models.PositiveIntegerField(default=0)
+    rendered_count = models.PositiveIntegerField(default=0)
+    # Ready without rendering - identical PDF already in the store
+    reused_count = models.PositiveIntegerField(default=0)
+    failed_count = models.PositiveIntegerField(default=0)
+    error_message = models.TextField(blank=True)
+    
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='certificate_issue_jobs')
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    # Touched after every rendered chunk - stale 'running' jobs are re-queued
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        return f"Issue job #{self.id} - {self.description or self.issue_type} ({self.status})"
+    
+    @property
+    def processed_count(self):
+        return self.rendered_count + self.failed_count
+    
+    @property
+    def progress_percent(self):
+        if not self.total_count:
+            return 100
+        return int(self.processed_count * 100 / self.total_count)
+    
+    @property
+    def is_finished(self):
+        return self.status in ('completed', 'failed')
+
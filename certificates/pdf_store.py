@@ -0,0 +1,83 @@
+# certificates/pdf_store.py
+"""
+Content-addressed certificate PDF store.
+
+A PDF is stored under ``MEDIA_ROOT/certificates/store/<aa>/<sha256>.pdf``
+where the hash is taken over the fully rendered certificate HTML - i.e. the
+template version (HTML, CSS, orientation) plus every placeholder value it
+uses. Identical renders share one file, a template edit yields new hashes,
+and files no certificate points to are removed by ``gc_certificate_pdfs``.
+"""
+
+import hashlib
+import os
+import time
+
+from django.conf import settings
+
+STORE_DIR = 'certificates/store'
+# Per-certificate files written before the store existed
+LEGACY_DIR = 'certificates/issued'
+
+
+def content_hash(html_content):
+    return hashlib.sha256(html_content.encode('utf-8')).hexdigest()
+
+
+def relative_path(pdf_hash):
+    """Path relative to MEDIA_ROOT (value stored in ``generated_pdf``)"""
+    return f"{STORE_DIR}/{pdf_hash[:2]}/{pdf_hash}.pdf"
+
+
+def absolute_path(pdf_hash):
+    return os.path.join(settings.MEDIA_ROOT, relative_path(pdf_hash))
+
+
+def exists(pdf_hash):
+    return os.path.exists(absolute_path(pdf_hash))
+
+
+def _iter_files(directory):
+    root = os.path.join(settings.MEDIA_ROOT, directory)
+    for dirpath, _, filenames in os.walk(root):
+        for filename in filenames:
+            path = os.path.join(dirpath, filename)
+            yield os.path.relpath(path, settings.MEDIA_ROOT).replace(os.sep, '/'), path
+
+
+def collect_garbage(min_age_seconds=3600, dry_run=False, include_legacy=True):
+    """
+    Delete PDFs not referenced by any ``IssuedCertificate.generated_pdf``.
+
+    Files younger than ``min_age_seconds`` are kept - a worker may have
+    written them but not saved the certificate rows yet.
+    Returns ``(deleted_count, freed_bytes)``.
+    """
+    from .models import IssuedCertificate
+
+    referenced = set(
+        IssuedCertificate.objects.exclude(generated_pdf='')
+        .exclude(generated_pdf__isnull=True)
+        .values_list('generated_pdf', flat=True)
+    )
+    cutoff = time.time() - min_age_seconds
+
+    directories = [STORE_DIR] + ([LEGACY_DIR] if include_legacy else [])
+    deleted = 0
+    freed = 0
+    for directory in directories:
+        for relative, path in _iter_files(directory):
+            if relative in referenced:
+                continue
+            try:
+                stat = os.stat(path)
+                if stat.st_mtime > cutoff:
+                    continue
+                if not dry_run:
+                    os.remove(path)
+            except FileNotFoundError:
+                continue
+            deleted += 1
+            freed += stat.st_size
+
+    return deleted, freed
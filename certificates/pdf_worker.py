@@ -0,0 +1,26 @@
+# certificates/pdf_worker.py
+"""
+HTML -> PDF rendering for the process pool.
+
+Kept free of Django imports: pool workers only receive ``(pdf_hash, html,
+pdf_path)`` tuples, so they never touch settings or the database.
+"""
+
+import os
+
+
+def render_pdf(task):
+    """Render one PDF, returns ``(pdf_hash, error or None)``"""
+    pdf_hash, html_content, pdf_path = task
+    try:
+        from weasyprint import HTML
+
+        os.makedirs(os.path.dirname(pdf_path), exist_ok=True)
+
+        # Write to a temp file first so a half-written PDF is never served
+        tmp_path = f"{pdf_path}.{os.getpid()}.tmp"
+        HTML(string=html_content).write_pdf(tmp_path)
+        os.replace(tmp_path, pdf_path)
+        return pdf_hash, None
+    except Exception as e:
+        return pdf_hash, str(e) or e.__class__.__name__
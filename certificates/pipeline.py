@@ -0,0 +1,285 @@
+# certificates/pipeline.py
+"""
+Background certificate issuance.
+
+Issue views only bulk-create ``IssuedCertificate`` rows (``pdf_status='pending'``)
+under a ``CertificateIssueJob`` and return. The ``process_certificate_jobs``
+worker renders the HTML in the main process and hands the WeasyPrint work to
+a process pool, one chunk at a time, updating job progress after each chunk.
+PDFs live in the content-addressed ``pdf_store`` - identical renders are
+written once.
+"""
+
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import pdf_store
+from .models import CertificateIssueJob, IssuedCertificate
+from .pdf_worker import render_pdf
+from .rendering import render_certificate_html
+
+logger = logging.getLogger(__name__)
+
+# None -> one worker process per CPU core
+RENDER_WORKERS = getattr(settings, "CERTIFICATE_RENDER_WORKERS", None)
+RENDER_CHUNK_SIZE = getattr(settings, "CERTIFICATE_RENDER_CHUNK_SIZE", 50)
+# A 'running' job without a heartbeat for this long belongs to a dead worker
+STALE_JOB_SECONDS = getattr(settings, "CERTIFICATE_JOB_STALE_SECONDS", 15 * 60)
+
+
+# ==================== PRODUCER API ====================
+
+def create_issue_job(template, issue_type, certificates, created_by, description=''):
+    """
+    Bulk-create unsaved ``IssuedCertificate`` objects under a new job.
+
+    Returns the job; PDFs are rendered later by ``process_certificate_jobs``.
+    """
+    certificates = list(certificates)
+
+    with transaction.atomic():
+        job = CertificateIssueJob.objects.create(
+            template=template,
+            issue_type=issue_type,
+            description=description[:255],
+            total_count=len(certificates),
+            status='pending' if certificates else 'completed',
+            created_by=created_by,
+        )
+        for certificate in certificates:
+            certificate.assign_identifiers()
+            certificate.issue_job = job
+            certificate.pdf_status = 'pending'
+        IssuedCertificate.objects.bulk_create(certificates, batch_size=500)
+
+    return job
+
+
+# ==================== WORKER ====================
+
+def release_stale_jobs():
+    """Re-queue jobs whose worker died mid-run"""
+    cutoff = timezone.now() - timedelta(seconds=STALE_JOB_SECONDS)
+    return CertificateIssueJob.objects.filter(
+        status='running', heartbeat_at__lt=cutoff
+    ).update(status='pending')
+
+
+def claim_next_job():
+    """Atomically move the oldest pending job to 'running'"""
+    for job_id in CertificateIssueJob.objects.filter(status='pending').order_by('created_at').values_list('id', flat=True)[:5]:
+        now = timezone.now()
+        claimed = CertificateIssueJob.objects.filter(id=job_id, status='pending').update(
+            status='running', started_at=now, heartbeat_at=now
+        )
+        if claimed:
+            return CertificateIssueJob.objects.get(id=job_id)
+    return None
+
+
+def _prepare(certificate):
+    """Render HTML, point the certificate at its content-addressed PDF"""
+    html_content = render_certificate_html(certificate)
+    certificate.pdf_hash = pdf_store.content_hash(html_content)
+    certificate.generated_pdf = pdf_store.relative_path(certificate.pdf_hash)
+    return html_content
+
+
+def _mark_result(certificate, error):
+    if error:
+        certificate.generated_pdf = None
+        certificate.pdf_hash = ''
+        certificate.pdf_status = 'failed'
+        certificate.pdf_error = error
+        logger.error(f"Certificate {certificate.certificate_id}: PDF generation failed: {error}")
+    else:
+        certificate.pdf_status = 'ready'
+        certificate.pdf_error = ''
+
+
+def _render_chunk(pool, certificates):
+    """
+    Render one chunk in the pool. Renders already in the store and duplicates
+    inside the chunk are not rendered again. Returns the number reused.
+    """
+    to_render = {}
+    for certificate in certificates:
+        html_content = _prepare(certificate)
+        if certificate.pdf_hash not in to_render and not pdf_store.exists(certificate.pdf_hash):
+            to_render[certificate.pdf_hash] = html_content
+
+    tasks = [
+        (pdf_hash, html_content, pdf_store.absolute_path(pdf_hash))
+        for pdf_hash, html_content in to_render.items()
+    ]
+    errors = dict(pool.map(render_pdf, tasks)) if tasks else {}
+
+    rendered_hashes = set()
+    reused = 0
+    for certificate in certificates:
+        pdf_hash = certificate.pdf_hash
+        _mark_result(certificate, errors.get(pdf_hash))
+        if certificate.pdf_status != 'ready':
+            continue
+        if pdf_hash in to_render and pdf_hash not in rendered_hashes:
+            rendered_hashes.add(pdf_hash)
+        else:
+            reused += 1
+    return reused
+
+
+def run_issue_job(job, workers=None, chunk_size=None):
+    """Render every pending certificate of ``job`` (already claimed)"""
+    chunk_size = chunk_size or RENDER_CHUNK_SIZE
+    workers = workers or RENDER_WORKERS
+
+    pending = IssuedCertificate.objects.filter(
+        issue_job=job, pdf_status__in=['pending', 'rendering']
+    ).select_related('template', 'student', 'issued_by').order_by('id')
+
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            while True:
+                certificates = list(pending[:chunk_size])
+                if not certificates:
+                    break
+
+                IssuedCertificate.objects.filter(
+                    id__in=[c.pk for c in certificates]
+                ).update(pdf_status='rendering')
+
+                reused = _render_chunk(pool, certificates)
+
+                rendered = sum(1 for c in certificates if c.pdf_status == 'ready')
+                with transaction.atomic():
+                    IssuedCertificate.objects.bulk_update(
+                        certificates, ['generated_pdf', 'pdf_hash', 'pdf_status', 'pdf_error']
+                    )
+                    CertificateIssueJob.objects.filter(pk=job.pk).update(
+                        rendered_count=F('rendered_count') + rendered,
+                        reused_count=F('reused_count') + reused,
+                        failed_count=F('failed_count') + len(certificates) - rendered,
+                        heartbeat_at=timezone.now(),
+                    )
+
+        CertificateIssueJob.objects.filter(pk=job.pk).update(
+            status='completed', finished_at=timezone.now()
+        )
+    except Exception as e:
+        logger.exception(f"Certificate issue job #{job.pk} failed")
+        fail_issue_job(job, str(e) or e.__class__.__name__)
+
+    job.refresh_from_db()
+    return job
+
+
+def fail_issue_job(job, error):
+    """
+    Mark ``job`` failed together with its unfinished certificates - left in
+    'pending' / 'rendering' they would report "still being generated" forever.
+    """
+    with transaction.atomic():
+        stuck = IssuedCertificate.objects.filter(
+            issue_job=job, pdf_status__in=['pending', 'rendering']
+        ).update(pdf_status='failed', pdf_error=f"Issue job #{job.pk} failed: {error}"[:1000])
+        CertificateIssueJob.objects.filter(pk=job.pk).update(
+            status='failed',
+            error_message=error,
+            failed_count=F('failed_count') + stuck,
+            finished_at=timezone.now(),
+        )
+    return stuck
+
+
+def retry_issue_job(job):
+    """
+    Re-queue the failed certificates of a finished job. Returns how many
+    were re-queued (0 - job still running or nothing failed).
+    """
+    with transaction.atomic():
+        job = CertificateIssueJob.objects.select_for_update().get(pk=job.pk)
+        if job.status not in ('completed', 'failed'):
+            return 0
+        requeued = IssuedCertificate.objects.filter(issue_job=job, pdf_status='failed').update(
+            pdf_status='pending', pdf_error=''
+        )
+        if requeued:
+            CertificateIssueJob.objects.filter(pk=job.pk).update(
+                status='pending',
+                error_message='',
+                failed_count=F('failed_count') - min(requeued, job.failed_count),
+                started_at=None,
+                finished_at=None,
+                heartbeat_at=None,
+            )
+    return requeued
+
+
+def process_certificate_jobs(max_jobs=None, workers=None):
+    """
+    Run pending issue jobs one after another. Returns the number of jobs run.
+
+    Also usable as a django_crontab job.
+    """
+    released = release_stale_jobs()
+    if released:
+        logger.warning(f"Certificate jobs: re-queued {released} stale jobs")
+
+    processed = 0
+    while max_jobs is None or processed < max_jobs:
+        job = claim_next_job()
+        if job is None:
+            break
+        job = run_issue_job(job, workers=workers)
+        logger.info(
+            f"Certificate issue job #{job.pk} {job.status}: "
+            f"{job.rendered_count} rendered, {job.failed_count} failed"
+        )
+        processed += 1
+    return processed
+
+
+def generate_certificate_pdf(certificate):
+    """Render a single certificate synchronously (no pool, store hits are free)"""
+    html_content = _prepare(certificate)
+    error = None
+    if not pdf_store.exists(certificate.pdf_hash):
+        _, error = render_pdf((
+            certificate.pdf_hash, html_content, pdf_store.absolute_path(certificate.pdf_hash)
+        ))
+
+    _mark_result(certificate, error)
+    certificate.save(update_fields=['generated_pdf', 'pdf_hash', 'pdf_status', 'pdf_error'])
+    return error is None
+
+
+def reissue_certificates(certificates, template, created_by, description=''):
+    """
+    Queue existing certificates for re-rendering (e.g. after a template edit).
+
+    Certificates whose render inputs did not change hit the PDF store and
+    are not rendered again.
+    """
+    certificate_ids = list(certificates.values_list('id', flat=True))
+
+    with transaction.atomic():
+        job = CertificateIssueJob.objects.create(
+            template=template,
+            issue_type='reissue',
+            description=description[:255],
+            total_count=len(certificate_ids),
+            status='pending' if certificate_ids else 'completed',
+            created_by=created_by,
+        )
+        for start in range(0, len(certificate_ids), 500):
+            IssuedCertificate.objects.filter(id__in=certificate_ids[start:start + 500]).update(
+                issue_job=job, pdf_status='pending', pdf_error=''
+            )
+
+    return job
@@ -0,0 +1,178 @@
+# certificates/rendering.py
+"""
+Certificate HTML rendering (shared by views and the PDF pipeline).
+
+Every template is compiled once into a ``RenderPlan``: the full HTML document
+(CSS wrapper included) pre-split into literal segments and placeholder slots.
+Plans are cached per process, keyed by template id + ``updated_at``, so a
+render is one list copy and one ``str.join``.
+"""
+
+import re
+import threading
+
+PLACEHOLDER_NAMES = (
+    'student_name',
+    'course_name',
+    'batch_name',
+    'completion_date',
+    'issue_date',
+    'certificate_id',
+    'instructor_name',
+    'grade',
+    'duration',
+)
+
+PLACEHOLDER_RE = re.compile(r'\{(' + '|'.join(PLACEHOLDER_NAMES) + r')\}')
+
+# Slot for the raw student name in <title> (no 'N/A' fallback there)
+TITLE_SLOT = '__title__'
+_BODY_MARKER = '\x00body\x00'
+_TITLE_MARKER = '\x00title\x00'
+
+DOCUMENT_TEMPLATE = """
+    <!DOCTYPE html>
+    <html>
+    <head>
+        <meta charset="UTF-8">
+        <title>Certificate - {title}</title>
+        <link rel="stylesheet" href="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.0.0/css/all.min.css">
+        <link href="https://fonts.googleapis.com/css2?family=Poppins:wght@300;400;600;700&family=Georgia:wght@400;700&display=swap" rel="stylesheet">
+        <style>
+            body {{
+                margin: 0;
+                padding: 0;
+                font-family: 'Georgia', serif;
+            }}
+            @page {{
+                size: {page_size};
+                margin: 0;
+            }}
+            @media print {{
+                body {{
+                    -webkit-print-color-adjust: exact;
+                    print-color-adjust: exact;
+                }}
+            }}
+            {css_content}
+        </style>
+    </head>
+    <body>
+        {body}
+    </body>
+    </html>
+    """
+
+PLAN_CACHE_SIZE = 64
+
+
+class RenderPlan:
+    """Literal segments with placeholder slots, filled by ``render()``"""
+
+    __slots__ = ('parts', 'slots')
+
+    def __init__(self, parts, slots):
+        self.parts = parts
+        self.slots = slots
+
+    def render(self, values):
+        parts = self.parts[:]
+        for index, name in self.slots:
+            parts[index] = values[name]
+        return ''.join(parts)
+
+
+def _append_segments(parts, slots, text):
+    """Split ``text`` on known placeholders into ``parts``/``slots``"""
+    position = 0
+    for match in PLACEHOLDER_RE.finditer(text):
+        if match.start() > position:
+            parts.append(text[position:match.start()])
+        slots.append((len(parts), match.group(1)))
+        parts.append('')
+        position = match.end()
+    if position < len(text):
+        parts.append(text[position:])
+
+
+def compile_template(template):
+    """Build the (document, body) render plans of a CertificateTemplate"""
+    document = DOCUMENT_TEMPLATE.format(
+        title=_TITLE_MARKER,
+        page_size='A4 landscape' if template.orientation == 'landscape' else 'A4 portrait',
+        css_content=template.css_content,
+        body=_BODY_MARKER,
+    )
+    head, tail = document.split(_BODY_MARKER)
+    before_title, after_title = head.split(_TITLE_MARKER)
+
+    body_parts, body_slots = [], []
+    _append_segments(body_parts, body_slots, template.html_content)
+
+    # Wrapper literals are never scanned for placeholders (same as before:
+    # only html_content was substituted)
+    parts = [before_title, '', after_title]
+    slots = [(1, TITLE_SLOT)]
+    offset = len(parts)
+    parts.extend(body_parts)
+    slots.extend((index + offset, name) for index, name in body_slots)
+    parts.append(tail)
+
+    return RenderPlan(parts, slots), RenderPlan(body_parts, body_slots)
+
+
+_plan_cache = {}
+_plan_lock = threading.Lock()
+
+
+def get_render_plans(template):
+    """Cached ``(document_plan, body_plan)`` for this template version"""
+    key = (template.pk, template.updated_at)
+    plans = _plan_cache.get(key)
+    if plans is None:
+        plans = compile_template(template)
+        with _plan_lock:
+            # Drop older versions of this template, then bound the cache
+            for stale_key in [k for k in _plan_cache if k[0] == template.pk]:
+                _plan_cache.pop(stale_key, None)
+            while len(_plan_cache) >= PLAN_CACHE_SIZE:
+                _plan_cache.pop(next(iter(_plan_cache)))
+            _plan_cache[key] = plans
+    return plans
+
+
+def clear_render_plans():
+    with _plan_lock:
+        _plan_cache.clear()
+
+
+def get_certificate_context_data(certificate):
+    """Placeholder values (without braces) for one certificate"""
+    date_format = '%B %d, %Y'
+    issue_date = certificate.issue_date.strftime(date_format) if certificate.issue_date else 'N/A'
+
+    return {
+        'student_name': certificate.student_name or 'N/A',
+        'course_name': certificate.course_name or 'N/A',
+        'batch_name': certificate.batch_name or 'N/A',
+        'completion_date': certificate.completion_date.strftime(date_format) if certificate.completion_date else issue_date,
+        'issue_date': issue_date,
+        'certificate_id': certificate.certificate_id or f"CERT-{certificate.id}",
+        'instructor_name': certificate.issued_by.get_full_name() if certificate.issued_by else 'Admin',
+        'grade': certificate.grade or 'N/A',
+        'duration': certificate.duration or 'N/A',
+    }
+
+
+def render_certificate_html(certificate):
+    """Full HTML document of a certificate"""
+    document_plan, _ = get_render_plans(certificate.template)
+    values = get_certificate_context_data(certificate)
+    values[TITLE_SLOT] = str(certificate.student_name)
+    return document_plan.render(values)
+
+
+def render_template_body(template, values):
+    """Template body only, placeholders filled from ``values`` (previews)"""
+    _, body_plan = get_render_plans(template)
+    return body_plan.render(values)
@@ -0,0 +1,16 @@
+# certificates/signals.py
+
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from .models import CertificateTemplate, IssuedCertificate
+
+
+@receiver(post_save, sender=CertificateTemplate)
+def invalidate_template_pdfs(sender, instance, created, **kwargs):
+    """Template edited - its issued PDFs no longer match the template"""
+    if created:
+        return
+    # Unchanged renders hash to the same store file, so re-rendering these
+    # (download or re-issue job) is free for them
+    IssuedCertificate.objects.filter(template=instance, pdf_status='ready').update(pdf_status='stale')
@@ -1,3 +1,70 @@
+# certificates/tests.py - Background issuance job failures
+
+from unittest import mock
+
+from django.contrib.auth import get_user_model
 from django.test import TestCase
 
-# Create your tests here.
+from .models import CertificateIssueJob, CertificateTemplate, CertificateType, IssuedCertificate
+from .pipeline import claim_next_job, create_issue_job, retry_issue_job, run_issue_job
+
+User = get_user_model()
+
+
+class IssueJobFailureTests(TestCase):
+    """A crashed job must not leave certificates "still being generated" forever"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(username='cert_admin', password='x', role='superadmin')
+        cls.students = [
+            User.objects.create_user(username=f'cert_student_{i}', password='x', role='student')
+            for i in range(3)
+        ]
+        cls.certificate_type = CertificateType.objects.create(name='Completion')
+        cls.template = CertificateTemplate.objects.create(
+            name='Plain', certificate_type=cls.certificate_type, html_content='<p>{{ student_name }}</p>',
+        )
+
+    def setUp(self):
+        self.job = create_issue_job(self.template, 'batch', [
+            IssuedCertificate(
+                template=self.template, certificate_type=self.certificate_type,
+                student=student, student_name=student.username, issued_by=self.admin,
+            )
+            for student in self.students
+        ], self.admin)
+
+    def run_failing_job(self):
+        job = claim_next_job()
+        with mock.patch('certificates.pipeline._render_chunk', side_effect=RuntimeError('renderer crashed')):
+            return run_issue_job(job, workers=1)
+
+    def test_render_exception_fails_job_and_certificates(self):
+        job = self.run_failing_job()
+
+        self.assertEqual(job.status, 'failed')
+        self.assertEqual(job.error_message, 'renderer crashed')
+        self.assertEqual(job.failed_count, 3)
+        for certificate in job.certificates.all():
+            self.assertEqual(certificate.pdf_status, 'failed')
+            self.assertFalse(certificate.is_pdf_rendering)
+            self.assertIn('renderer crashed', certificate.pdf_error)
+
+    def test_retry_requeues_failed_certificates(self):
+        job = self.run_failing_job()
+
+        self.assertEqual(retry_issue_job(job), 3)
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'pending')
+        self.assertEqual(job.failed_count, 0)
+        self.assertEqual(job.error_message, '')
+        self.assertEqual(
+            set(job.certificates.values_list('pdf_status', flat=True)), {'pending'}
+        )
+        # Picked up again by the worker
+        self.assertEqual(claim_next_job().pk, job.pk)
+
+    def test_retry_ignores_unfinished_job(self):
+        self.assertEqual(retry_issue_job(self.job), 0)
+        self.assertEqual(CertificateIssueJob.objects.get(pk=self.job.pk).status, 'pending')
@@ -18,11 +18,15 @@ urlpatterns = [
     path('admin/templates/create/', views.admin_create_template, name='admin_create_template'),
     path('admin/templates/<int:template_id>/edit/', views.admin_edit_template, name='admin_edit_template'),
     path('admin/templates/<int:template_id>/preview/', views.admin_preview_template, name='admin_preview_template'),
+    path('admin/templates/<int:template_id>/reissue/', views.admin_reissue_template_certificates, name='admin_reissue_template'),
     
     # Issue Certificates (Admin)
     path('admin/issue/', views.admin_issue_certificate, name='admin_issue'),
     path('admin/issued/', views.admin_issued_certificates, name='admin_issued'),
     path('admin/issued/<int:cert_id>/revoke/', views.admin_revoke_certificate, name='admin_revoke'),
+    path('admin/issue/jobs/<int:job_id>/', views.admin_issue_job, name='admin_issue_job'),
+    path('admin/issue/jobs/<int:job_id>/status/', views.admin_issue_job_status, name='admin_issue_job_status'),
+    path('admin/issue/jobs/<int:job_id>/retry/', views.admin_retry_issue_job, name='admin_retry_issue_job'),
     
     # ========== INSTRUCTOR PANEL ==========
     path('instructor/dashboard/', views.instructor_certificate_dashboard, name='instructor_dashboard'),
@@ -2,12 +2,13 @@ from django.shortcuts import render
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.http import HttpResponse, JsonResponse
+from django.http import FileResponse, HttpResponse, JsonResponse
 from django.db.models import Q, Count
 from django.core.paginator import Paginator
 from django.utils import timezone
 from datetime import datetime
 from .models import CertificateType, CertificateTemplate, IssuedCertificate
+from .rendering import render_template_body
 from courses.models import Course, Batch, BatchEnrollment
 from userss.models import CustomUser as User
 
@@ -183,21 +184,19 @@ def admin_preview_template(request, template_id):
     
     # Sample data for preview
     sample_data = {
-        '{student_name}': 'John Doe',
-        '{course_name}': 'Advanced Python Programming',
-        '{batch_name}': 'Batch 2024-A',
-        '{completion_date}': datetime.now().strftime('%B %d, %Y'),
-        '{issue_date}': datetime.now().strftime('%B %d, %Y'),
-        '{certificate_id}': 'CERT-SAMPLE123',
-        '{instructor_name}': 'Prof. Jane Smith',
-        '{grade}': 'A+',
-        '{duration}': '12 Weeks',
+        'student_name': 'John Doe',
+        'course_name': 'Advanced Python Programming',
+        'batch_name': 'Batch 2024-A',
+        'completion_date': datetime.now().strftime('%B %d, %Y'),
+        'issue_date': datetime.now().strftime('%B %d, %Y'),
+        'certificate_id': 'CERT-SAMPLE123',
+        'instructor_name': 'Prof. Jane Smith',
+        'grade': 'A+',
+        'duration': '12 Weeks',
     }
     
-    # Replace placeholders
-    html = template.html_content
-    for placeholder, value in sample_data.items():
-        html = html.replace(placeholder, value)
+    # Fill placeholders from the cached render plan
+    html = render_template_body(template, sample_data)
     
     context = {
         'template': template,
@@ -343,7 +342,7 @@ def instructor_issue_certificate(request):
         
         template = get_object_or_404(CertificateTemplate, id=template_id)
         
-        issued_count = 0
+        certificates = []
         
         if issue_type == 'individual':
             student_ids = request.POST.getlist('selected_students')
@@ -360,7 +359,7 @@ def instructor_issue_certificate(request):
                 if not is_instructor_student(request.user, student):
                     continue
                 
-                cert = IssuedCertificate.objects.create(
+                certificates.append(IssuedCertificate(
                     template=template,
                     certificate_type=template.certificate_type,
                     student=student,
@@ -371,21 +370,16 @@ def instructor_issue_certificate(request):
                     batch_name=batch.name if batch else '',
                     issue_date=timezone.now().date(),
                     issued_by=request.user
-                )
-                
-                generate_certificate_pdf(cert)
-                issued_count += 1
+                ))
             
-            messages.success(request, f'✅ Issued {issued_count} certificates!')
-        
         elif issue_type == 'batch':
             batch_id = request.POST.get('batch_id')
             batch = get_object_or_404(Batch, id=batch_id, instructor=request.user)
             
-            enrollments = BatchEnrollment.objects.filter(batch=batch, is_active=True)
+            enrollments = BatchEnrollment.objects.filter(batch=batch, is_active=True).select_related('student')
             
             for enrollment in enrollments:
-                cert = IssuedCertificate.objects.create(
+                certificates.append(IssuedCertificate(
                     template=template,
                     certificate_type=template.certificate_type,
                     student=enrollment.student,
@@ -396,22 +390,17 @@ def instructor_issue_certificate(request):
                     batch_name=batch.name,
                     issue_date=timezone.now().date(),
                     issued_by=request.user
-                )
-                
-                generate_certificate_pdf(cert)
-                issued_count += 1
+                ))
             
-            messages.success(request, f'✅ Issued {issued_count} certificates to batch!')
-        
         elif issue_type == 'course':
             course_id = request.POST.get('course_id')
             course = get_object_or_404(Course, id=course_id, instructor=request.user)
             
             from courses.models import Enrollment
-            enrollments = Enrollment.objects.filter(course=course, is_active=True)
+            enrollments = Enrollment.objects.filter(course=course, is_active=True).select_related('student')
             
             for enrollment in enrollments:
-                cert = IssuedCertificate.objects.create(
+                certificates.append(IssuedCertificate(
                     template=template,
                     certificate_type=template.certificate_type,
                     student=enrollment.student,
@@ -420,12 +409,12 @@ def instructor_issue_certificate(request):
                     course_name=course.title,
                     issue_date=timezone.now().date(),
                     issued_by=request.user
-                )
-                
-                generate_certificate_pdf(cert)
-                issued_count += 1
+                ))
             
-            messages.success(request, f'✅ Issued {issued_count} certificates!')
+        # PDFs are rendered by the process_certificate_jobs worker
+        if certificates:
+            job = create_issue_job(template, issue_type, certificates, request.user)
+            messages.success(request, f'✅ Issued {job.total_count} certificates - PDFs are being generated')
         
         return redirect('certificates:instructor_issued')
     
@@ -506,103 +495,9 @@ from django.http import HttpResponse
 from .models import CertificateTemplate, CertificateType, IssuedCertificate
 from userss.models import AbstractUser
 from courses.models import Course, Batch, Enrollment
-
-
-def get_certificate_context_data(certificate):
-    """
-    Generate complete context data for certificate rendering
-    Replaces all placeholders with actual data
-    """
-    context = {
-        # Student Information
-        'student_name': certificate.student_name or 'N/A',
-        '{student_name}': certificate.student_name or 'N/A',
-        
-        # Course Information
-        'course_name': certificate.course_name or 'N/A',
-        '{course_name}': certificate.course_name or 'N/A',
-        
-        # Batch Information
-        'batch_name': certificate.batch_name or 'N/A',
-        '{batch_name}': certificate.batch_name or 'N/A',
-        
-        # Dates
-        'completion_date': certificate.completion_date.strftime('%B %d, %Y') if certificate.completion_date else certificate.issue_date.strftime('%B %d, %Y'),
-        '{completion_date}': certificate.completion_date.strftime('%B %d, %Y') if certificate.completion_date else certificate.issue_date.strftime('%B %d, %Y'),
-        
-        'issue_date': certificate.issue_date.strftime('%B %d, %Y') if certificate.issue_date else 'N/A',
-        '{issue_date}': certificate.issue_date.strftime('%B %d, %Y') if certificate.issue_date else 'N/A',
-        
-        # Certificate ID
-        'certificate_id': certificate.certificate_id or f"CERT-{certificate.id}",
-        '{certificate_id}': certificate.certificate_id or f"CERT-{certificate.id}",
-        
-        # Instructor/Issuer Information
-        'instructor_name': certificate.issued_by.get_full_name() if certificate.issued_by else 'Admin',
-        '{instructor_name}': certificate.issued_by.get_full_name() if certificate.issued_by else 'Admin',
-        
-        # Grade Information
-        'grade': certificate.grade if certificate.grade else 'N/A',
-        '{grade}': certificate.grade if certificate.grade else 'N/A',
-        
-        # Duration Information
-        'duration': certificate.duration if certificate.duration else 'N/A',
-        '{duration}': certificate.duration if certificate.duration else 'N/A',
-    }
-    
-    return context
-
-
-def render_certificate_html(certificate):
-    """
-    Render certificate HTML by replacing all placeholders
-    """
-    html_content = certificate.template.html_content
-    css_content = certificate.template.css_content
-    
-    # Get context data
-    context = get_certificate_context_data(certificate)
-    
-    # Replace all placeholders in HTML
-    for placeholder, value in context.items():
-        if placeholder.startswith('{'):
-            html_content = html_content.replace(placeholder, str(value))
-    
-    # Combine HTML with CSS
-    full_html = f"""
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <meta charset="UTF-8">
-        <title>Certificate - {certificate.student_name}</title>
-        <link rel="stylesheet" href="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.0.0/css/all.min.css">
-        <link href="https://fonts.googleapis.com/css2?family=Poppins:wght@300;400;600;700&family=Georgia:wght@400;700&display=swap" rel="stylesheet">
-        <style>
-            body {{
-                margin: 0;
-                padding: 0;
-                font-family: 'Georgia', serif;
-            }}
-            @page {{
-                size: {'A4 landscape' if certificate.template.orientation == 'landscape' else 'A4 portrait'};
-                margin: 0;
-            }}
-            @media print {{
-                body {{
-                    -webkit-print-color-adjust: exact;
-                    print-color-adjust: exact;
-                }}
-            }}
-            {css_content}
-        </style>
-    </head>
-    <body>
-        {html_content}
-    </body>
-    </html>
-    """
-    
-    return full_html
+from .rendering import get_certificate_context_data, render_certificate_html
+from .models import CertificateIssueJob
+from .pipeline import create_issue_job, generate_certificate_pdf, reissue_certificates, retry_issue_job
 
 
 @login_required
@@ -617,7 +512,8 @@ def admin_issue_certificate(request):
         
         template = get_object_or_404(CertificateTemplate, id=template_id)
         
-        issued_count = 0
+        certificates = []
+        description = ''
         
         if issue_type == 'individual':
             student_ids = request.POST.getlist('selected_students')
@@ -691,8 +587,8 @@ def admin_issue_certificate(request):
                     except Exception as e:
                         print(f"Course enrollment error: {e}")
                 
-                # Create certificate
-                cert = IssuedCertificate.objects.create(
+                # Certificate row (bulk-created with the job)
+                certificates.append(IssuedCertificate(
                     template=template,
                     certificate_type=template.certificate_type,
                     student=student,
@@ -706,18 +602,10 @@ def admin_issue_certificate(request):
                     issue_date=timezone.now().date(),
                     completion_date=completion_date,
                     issued_by=request.user
-                )
-                
-                # Generate PDF
-                try:
-                    generate_certificate_pdf(cert)
-                except Exception as e:
-                    print(f"PDF Generation Error: {e}")
-                
-                issued_count += 1
+                ))
             
             cert_type = "Batch" if certificate_for == 'batch' else "Course"
-            messages.success(request, f'✅ Issued {issued_count} {cert_type} certificates!')
+            description = f'{len(certificates)} {cert_type} certificates'
         
         elif issue_type == 'batch':
             batch_id = request.POST.get('batch_id')
@@ -748,7 +636,7 @@ def admin_issue_certificate(request):
             for enrollment in enrollments:
                 grade = enrollment.grade if hasattr(enrollment, 'grade') else ''
                 
-                cert = IssuedCertificate.objects.create(
+                certificates.append(IssuedCertificate(
                     template=template,
                     certificate_type=template.certificate_type,
                     student=enrollment.student,
@@ -762,16 +650,9 @@ def admin_issue_certificate(request):
                     issue_date=timezone.now().date(),
                     completion_date=completion_date,
                     issued_by=request.user
-                )
-                
-                try:
-                    generate_certificate_pdf(cert)
-                except Exception as e:
-                    print(f"PDF Generation Error: {e}")
-                
-                issued_count += 1
+                ))
             
-            messages.success(request, f'✅ Issued {issued_count} certificates to {batch.name}!')
+            description = f'Batch: {batch.name}'
         
         elif issue_type == 'course':
             course_id = request.POST.get('course_id')
@@ -797,7 +678,7 @@ def admin_issue_certificate(request):
                 grade = enrollment.grade if hasattr(enrollment, 'grade') else ''
                 completion_date = enrollment.completion_date if hasattr(enrollment, 'completion_date') and enrollment.completion_date else timezone.now().date()
                 
-                cert = IssuedCertificate.objects.create(
+                certificates.append(IssuedCertificate(
                     template=template,
                     certificate_type=template.certificate_type,
                     student=enrollment.student,
@@ -810,18 +691,18 @@ def admin_issue_certificate(request):
                     issue_date=timezone.now().date(),
                     completion_date=completion_date,
                     issued_by=request.user
-                )
-                
-                try:
-                    generate_certificate_pdf(cert)
-                except Exception as e:
-                    print(f"PDF Generation Error: {e}")
-                
-                issued_count += 1
+                ))
             
-            messages.success(request, f'✅ Issued {issued_count} certificates for {course.title}!')
+            description = f'Course: {course.title}'
         
-        return redirect('certificates:admin_issued')
+        if not certificates:
+            messages.warning(request, 'No students found to issue certificates to.')
+            return redirect('certificates:admin_issue')
+        
+        # PDFs are rendered by the process_certificate_jobs worker
+        job = create_issue_job(template, issue_type, certificates, request.user, description)
+        messages.success(request, f'✅ Issued {job.total_count} certificates - PDFs are being generated')
+        return redirect('certificates:admin_issue_job', job_id=job.id)
     
     # GET request
     templates = CertificateTemplate.objects.filter(is_active=True)
@@ -841,9 +722,9 @@ def admin_issue_certificate(request):
 
 
 @login_required
-def view_certificate(request, certificate_id):
+def view_certificate(request, cert_id):
     """View certificate with all data rendered"""
-    certificate = get_object_or_404(IssuedCertificate, id=certificate_id)
+    certificate = get_object_or_404(IssuedCertificate, id=cert_id)
     
     # Check permissions
     if request.user.role == 'student' and certificate.student != request.user:
@@ -856,52 +737,31 @@ def view_certificate(request, certificate_id):
     return HttpResponse(html_content)
 
 
-def generate_certificate_pdf(certificate):
-    """
-    Generate PDF from certificate HTML
-    Uses WeasyPrint for HTML to PDF conversion
-    """
-    try:
-        from weasyprint import HTML
-        from django.conf import settings
-        import os
-        
-        # Get rendered HTML
-        html_content = render_certificate_html(certificate)
-        
-        # Generate PDF filename
-        filename = f"certificate_{certificate.student.username}_{certificate.certificate_id}.pdf"
-        pdf_path = os.path.join(settings.MEDIA_ROOT, 'certificates', 'issued', filename)
-        
-        # Create directory if not exists
-        os.makedirs(os.path.dirname(pdf_path), exist_ok=True)
-        
-        # Generate PDF
-        HTML(string=html_content).write_pdf(pdf_path)
-        
-        # Save PDF path to certificate
-        certificate.generated_pdf = f'certificates/issued/{filename}'
-        certificate.save()
-        
-        return True
-        
-    except Exception as e:
-        print(f"PDF Generation Error: {e}")
-        return False
-
-
 @login_required
-def download_certificate(request, certificate_id):
-    """Download certificate PDF"""
-    certificate = get_object_or_404(IssuedCertificate, id=certificate_id)
+def download_certificate(request, cert_id):
+    """Download certificate PDF (streamed) or report that it is still rendering"""
+    certificate = get_object_or_404(IssuedCertificate, id=cert_id)
     
     # Check permissions
     if request.user.role == 'student' and certificate.student != request.user:
         messages.error(request, '❌ Access denied!')
         return redirect('user_login')
     
-    # Generate PDF if not exists
-    if not certificate.generated_pdf:
+    wants_json = request.headers.get('x-requested-with') == 'XMLHttpRequest' or request.GET.get('format') == 'json'
+    
+    if certificate.is_pdf_rendering:
+        if wants_json:
+            return JsonResponse({
+                'status': certificate.pdf_status,
+                'message': 'Certificate PDF is still being generated',
+            }, status=202)
+        messages.info(request, '⏳ Certificate PDF is still being generated - please try again in a minute.')
+        return redirect('certificates:student_certificates')
+    
+    # Issued before the background pipeline, template edited since, or the
+    # background render failed - render on demand (unchanged renders are
+    # served from the PDF store)
+    if not certificate.generated_pdf or certificate.pdf_status in ('stale', 'failed'):
         generate_certificate_pdf(certificate)
     
     if certificate.generated_pdf:
@@ -911,15 +771,99 @@ def download_certificate(request, certificate_id):
         pdf_path = os.path.join(settings.MEDIA_ROOT, str(certificate.generated_pdf))
         
         if os.path.exists(pdf_path):
-            with open(pdf_path, 'rb') as pdf:
-                response = HttpResponse(pdf.read(), content_type='application/pdf')
-                response['Content-Disposition'] = f'attachment; filename="certificate_{certificate.student.username}.pdf"'
-                return response
-    
+            return FileResponse(
+                open(pdf_path, 'rb'),
+                as_attachment=True,
+                filename=f"certificate_{certificate.student.username}.pdf",
+                content_type='application/pdf',
+            )
+    
+    if wants_json:
+        return JsonResponse({'status': 'failed', 'message': 'Certificate PDF not found'}, status=404)
     messages.error(request, '❌ Certificate PDF not found!')
     return redirect('certificates:admin_issued')
 
 
+@login_required
+def admin_reissue_template_certificates(request, template_id):
+    """Re-render the PDFs of a template's active certificates in the background"""
+    if request.user.role != 'superadmin':
+        return redirect('user_login')
+    
+    template = get_object_or_404(CertificateTemplate, id=template_id)
+    
+    if request.method != 'POST':
+        return redirect('certificates:admin_templates')
+    
+    certificates = IssuedCertificate.objects.filter(template=template, status='active')
+    job = reissue_certificates(certificates, template, request.user, f'Re-issue: {template.name}')
+    
+    if not job.total_count:
+        messages.info(request, f'No active certificates use "{template.name}".')
+        return redirect('certificates:admin_templates')
+    
+    messages.success(request, f'✅ Re-issuing {job.total_count} certificates - unchanged PDFs are reused')
+    return redirect('certificates:admin_issue_job', job_id=job.id)
+
+
+@login_required
+def admin_issue_job(request, job_id):
+    """Progress page of a background issuance job"""
+    if request.user.role != 'superadmin':
+        return redirect('user_login')
+    
+    job = get_object_or_404(
+        CertificateIssueJob.objects.select_related('template', 'created_by'), id=job_id
+    )
+    failed_certificates = job.certificates.filter(pdf_status='failed').select_related('student')[:50]
+    
+    context = {
+        'job': job,
+        'failed_certificates': failed_certificates,
+    }
+    
+    return render(request, 'admin/issue_job.html', context)
+
+
+@login_required
+def admin_retry_issue_job(request, job_id):
+    """Re-queue the failed PDFs of a finished issuance job"""
+    if request.user.role != 'superadmin':
+        return redirect('user_login')
+    
+    job = get_object_or_404(CertificateIssueJob, id=job_id)
+    
+    if request.method == 'POST':
+        requeued = retry_issue_job(job)
+        if requeued:
+            messages.success(request, f'✅ Re-queued {requeued} failed certificates')
+        else:
+            messages.info(request, 'Nothing to retry - the job is still running or has no failed certificates.')
+    
+    return redirect('certificates:admin_issue_job', job_id=job.id)
+
+
+@login_required
+def admin_issue_job_status(request, job_id):
+    """JSON progress of an issuance job (polled by the progress page)"""
+    if request.user.role != 'superadmin':
+        return JsonResponse({'error': 'Access denied'}, status=403)
+    
+    job = get_object_or_404(CertificateIssueJob, id=job_id)
+    
+    return JsonResponse({
+        'id': job.id,
+        'status': job.status,
+        'total': job.total_count,
+        'rendered': job.rendered_count,
+        'reused': job.reused_count,
+        'failed': job.failed_count,
+        'progress': job.progress_percent,
+        'finished': job.is_finished,
+        'error': job.error_message,
+    })
+
+
 @login_required
 def admin_edit_template(request, template_id):
     """Edit certificate template with GrapeJS page builder"""
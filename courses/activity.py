@@ -0,0 +1,174 @@
+# courses/activity.py
+"""
+Write-behind activity buffer for the student tracking middleware.
+
+- The "is my attendance log still open" and "is this device registered"
+  answers are cached per log / per device, and dropped by signals whenever a
+  log is closed or a device / device limit changes or is deleted.
+- ``DeviceSession.last_login`` heartbeats are coalesced in an in-process
+  buffer and written with one ``bulk_update`` every ``FLUSH_INTERVAL``
+  seconds (and at process exit) instead of one UPDATE per device per minute.
+"""
+
+import atexit
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import DeviceSession, StudentDeviceLimit, StudentLoginLog
+
+logger = logging.getLogger(__name__)
+
+CACHE_TIMEOUT = getattr(settings, "STUDENT_ACTIVITY_CACHE_TIMEOUT", 300)
+FLUSH_INTERVAL = getattr(settings, "STUDENT_ACTIVITY_FLUSH_SECONDS", 60)
+
+LOGIN_LOG_KEY = "activity:login_log:{log_id}"
+# Bumped when any device / the device limit of a student changes
+DEVICE_VERSION_KEY = "activity:device:version:{student_id}"
+DEVICE_KEY = "activity:device:{student_id}:{version}:{fingerprint}"
+
+# Cached "limit disabled" marker (device lookups are skipped for these)
+LIMIT_DISABLED = "disabled"
+
+
+# ==================== LOGIN LOG ====================
+
+def is_login_log_open(log_id, student_id):
+    """True if attendance log ``log_id`` of this student is still open"""
+    key = LOGIN_LOG_KEY.format(log_id=log_id)
+    cached = cache.get(key)
+    if cached is not None:
+        return cached == student_id
+
+    is_open = StudentLoginLog.objects.filter(
+        id=log_id, student_id=student_id, logout_time__isnull=True
+    ).exists()
+    if is_open:
+        cache.set(key, student_id, CACHE_TIMEOUT)
+    return is_open
+
+
+def remember_open_login_log(log):
+    cache.set(LOGIN_LOG_KEY.format(log_id=log.id), log.student_id, CACHE_TIMEOUT)
+
+
+# ==================== DEVICE ====================
+
+def _device_key(student_id, fingerprint):
+    version = cache.get(DEVICE_VERSION_KEY.format(student_id=student_id), 1)
+    return DEVICE_KEY.format(student_id=student_id, version=version, fingerprint=fingerprint)
+
+
+def get_device_state(student, fingerprint):
+    """
+    Cached device check, same semantics as the old per-request lookups.
+
+    Returns ``LIMIT_DISABLED``, ``None`` (unknown device) or the
+    ``DeviceSession`` id.
+    """
+    key = _device_key(student.id, fingerprint)
+    state = cache.get(key)
+    if state is not None:
+        return state or None
+
+    device_limit, created = StudentDeviceLimit.objects.get_or_create(
+        student=student,
+        defaults={'max_devices': 2, 'is_active': True}
+    )
+    if not device_limit.is_active:
+        state = LIMIT_DISABLED
+    else:
+        state = DeviceSession.objects.filter(
+            device_id=fingerprint, student_limit=device_limit
+        ).values_list('id', flat=True).first()
+
+    # 0 = "unknown device" (None means cache miss)
+    cache.set(key, state or 0, CACHE_TIMEOUT)
+    return state
+
+
+def invalidate_student_devices(student_id):
+    """Drop every cached device state of a student"""
+    key = DEVICE_VERSION_KEY.format(student_id=student_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 2, None)
+
+
+# ==================== HEARTBEAT BUFFER ====================
+
+_heartbeats = {}
+_heartbeat_lock = threading.Lock()
+_last_flush = time.monotonic()
+
+
+def record_device_heartbeat(device_id, when=None):
+    """Buffer a ``last_login`` touch; flushes when the interval has passed"""
+    with _heartbeat_lock:
+        _heartbeats[device_id] = when or timezone.now()
+        due = time.monotonic() - _last_flush >= FLUSH_INTERVAL
+    if due:
+        flush_device_heartbeats()
+
+
+def flush_device_heartbeats():
+    """Write buffered heartbeats with one bulk_update. Returns rows written"""
+    global _last_flush
+    with _heartbeat_lock:
+        pending = dict(_heartbeats)
+        _heartbeats.clear()
+        _last_flush = time.monotonic()
+    if not pending:
+        return 0
+
+    # Devices removed meanwhile simply match no row
+    devices = [
+        DeviceSession(id=device_id, last_login=when, is_active=True)
+        for device_id, when in pending.items()
+    ]
+    try:
+        DeviceSession.objects.bulk_update(devices, ['last_login', 'is_active'], batch_size=500)
+    except Exception as e:
+        logger.error(f"❌ Device heartbeat flush failed: {e}")
+        return 0
+    return len(devices)
+
+
+atexit.register(lambda: _heartbeats and flush_device_heartbeats())
+
+
+# ==================== CACHE INVALIDATION SIGNALS ====================
+
+@receiver(post_save, sender=StudentLoginLog)
+def login_log_saved(sender, instance, created, **kwargs):
+    if instance.logout_time:
+        cache.delete(LOGIN_LOG_KEY.format(log_id=instance.id))
+
+
+@receiver(post_delete, sender=StudentLoginLog)
+def login_log_deleted(sender, instance, **kwargs):
+    cache.delete(LOGIN_LOG_KEY.format(log_id=instance.id))
+
+
+@receiver(post_save, sender=DeviceSession)
+@receiver(post_delete, sender=DeviceSession)
+def device_session_changed(sender, instance, **kwargs):
+    try:
+        student_id = instance.student_limit.student_id
+    except StudentDeviceLimit.DoesNotExist:
+        # Device limit deleted (cascade) - handled by its own signal
+        return
+    invalidate_student_devices(student_id)
+
+
+@receiver(post_save, sender=StudentDeviceLimit)
+@receiver(post_delete, sender=StudentDeviceLimit)
+def device_limit_changed(sender, instance, **kwargs):
+    invalidate_student_devices(instance.student_id)
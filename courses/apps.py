@@ -7,4 +7,6 @@ class CoursesConfig(AppConfig):
     def ready(self):
         """Import signals when app is ready"""
         import courses.signals  # This connects the signals
+        import courses.batch_locks  # Materialized batch lock state
+        import courses.activity  # Tracking middleware cache invalidation
         print("📡 Courses app ready - Signals imported")
\ No newline at end of file
@@ -0,0 +1,206 @@
+# courses/batch_locks.py
+"""
+Materialized batch lock state.
+
+``BatchEnrollment.lock_state`` / ``lock_reason`` are computed here in bulk -
+one query each for enrollments, admin access controls and fee assignments
+(with the oldest pending EMI as a subquery) - and written back with one
+``UPDATE`` per distinct outcome. Signals on the fee models schedule a
+recompute for the affected student after commit, and the daily fee run
+refreshes every row.
+"""
+
+from collections import defaultdict
+from datetime import date, timedelta
+
+from django.db import transaction
+from django.db.models import Min, OuterRef, Q, Subquery
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from fees.models import BatchAccessControl, EMISchedule, PaymentRecord, StudentFeeAssignment
+
+from .models import Batch, BatchEnrollment
+
+CHUNK_SIZE = 500
+
+LOCK_FIELDS = ['lock_state', 'lock_reason', 'lock_evaluated_on']
+
+
+def _fee_assignment_locked(assignment, today):
+    """Same rule as ``StudentFeeAssignment.is_batch_locked()``"""
+    if assignment['unlock_date'] and today <= assignment['unlock_date']:
+        return False
+    if assignment['is_course_locked']:
+        return True
+    oldest_pending = assignment['oldest_pending_due']
+    grace_days = assignment['fee_structure__grace_period_days'] or 0
+    return bool(oldest_pending and oldest_pending < today - timedelta(days=grace_days))
+
+
+def evaluate_lock(enrollment, control, assignment, today):
+    """
+    ``(lock_state, lock_reason)`` for one enrollment.
+
+    Order matches the old ``BatchEnrollment.is_locked``: inactive enrollment,
+    batch not running, admin access control, then fee/EMI lock.
+    """
+    if not enrollment['is_active']:
+        return 'locked', 'inactive'
+    if enrollment['batch__status'] != 'active':
+        return 'unlocked', ''
+    if control is not None and not control.is_access_allowed(today):
+        return 'locked', 'admin'
+    if assignment is not None and _fee_assignment_locked(assignment, today):
+        return 'locked', 'payment'
+    return 'unlocked', ''
+
+
+def recompute_batch_locks(enrollments=None, today=None):
+    """
+    Recompute and store the lock state of ``enrollments`` (a BatchEnrollment
+    queryset, default: all). Returns the number of rows written.
+    """
+    today = today or date.today()
+    if enrollments is None:
+        enrollments = BatchEnrollment.objects.all()
+
+    rows = list(enrollments.values(
+        'id', 'student_id', 'batch_id', 'batch__course_id', 'batch__status',
+        'is_active', 'lock_state', 'lock_reason', 'lock_evaluated_on',
+    ))
+    if not rows:
+        return 0
+
+    student_ids = {row['student_id'] for row in rows}
+    batch_ids = {row['batch_id'] for row in rows}
+    course_ids = {row['batch__course_id'] for row in rows}
+
+    controls = {
+        (control.student_id, control.batch_id): control
+        for control in BatchAccessControl.objects.filter(
+            student_id__in=student_ids, batch_id__in=batch_ids,
+        ).only('student_id', 'batch_id', 'access_type', 'override_access', 'override_until')
+    }
+
+    oldest_pending = EMISchedule.objects.filter(
+        fee_assignment=OuterRef('pk'), status='pending',
+    ).order_by().values('fee_assignment').annotate(due=Min('due_date')).values('due')
+    assignments = {
+        (assignment['student_id'], assignment['course_id']): assignment
+        for assignment in StudentFeeAssignment.objects.filter(
+            student_id__in=student_ids, course_id__in=course_ids,
+        ).annotate(
+            oldest_pending_due=Subquery(oldest_pending)
+        ).values(
+            'student_id', 'course_id', 'unlock_date', 'is_course_locked',
+            'fee_structure__grace_period_days', 'oldest_pending_due',
+        )
+    }
+
+    # Only a handful of distinct outcomes - group the ids and write each
+    # group with one plain UPDATE instead of a per-row CASE (bulk_update)
+    changed = defaultdict(list)
+    for row in rows:
+        state, reason = evaluate_lock(
+            row,
+            controls.get((row['student_id'], row['batch_id'])),
+            assignments.get((row['student_id'], row['batch__course_id'])),
+            today,
+        )
+        if (state, reason, today) != (row['lock_state'], row['lock_reason'], row['lock_evaluated_on']):
+            changed[(state, reason)].append(row['id'])
+
+    # Rows that only need a new evaluation date are written too, so
+    # is_locked does not fall back to a per-row refresh for them
+    with transaction.atomic():
+        for (state, reason), ids in changed.items():
+            for start in range(0, len(ids), CHUNK_SIZE):
+                BatchEnrollment.objects.filter(id__in=ids[start:start + CHUNK_SIZE]).update(
+                    lock_state=state, lock_reason=reason, lock_evaluated_on=today,
+                )
+
+    return sum(len(ids) for ids in changed.values())
+
+
+def recompute_student_batch_locks(student_ids, today=None):
+    student_ids = {student_id for student_id in student_ids if student_id}
+    if not student_ids:
+        return 0
+    return recompute_batch_locks(
+        BatchEnrollment.objects.filter(student_id__in=student_ids), today
+    )
+
+
+def refresh_stale_batch_locks(student, today=None):
+    """Recompute a student's enrollments not yet evaluated today (list views)"""
+    today = today or date.today()
+    stale = BatchEnrollment.objects.filter(student=student).filter(
+        Q(lock_state='unknown') | Q(lock_evaluated_on__isnull=True) | ~Q(lock_evaluated_on=today)
+    )
+    return recompute_batch_locks(stale, today)
+
+
+def refresh_enrollment_lock(enrollment, today=None):
+    """Recompute one enrollment and copy the result onto the instance"""
+    today = today or date.today()
+    if enrollment.pk is None:
+        return
+    recompute_batch_locks(BatchEnrollment.objects.filter(pk=enrollment.pk), today)
+    stored = BatchEnrollment.objects.filter(pk=enrollment.pk).values(*LOCK_FIELDS).first()
+    if stored:
+        for field, value in stored.items():
+            setattr(enrollment, field, value)
+
+
+def schedule_student_recompute(student_id):
+    """Recompute a student's lock state once the current transaction commits"""
+    if student_id:
+        transaction.on_commit(lambda: recompute_student_batch_locks([student_id]))
+
+
+# ==================== SIGNALS ====================
+# NOTE: QuerySet.update() does not send signals - code that bulk-updates the
+# fee models must call recompute_student_batch_locks() itself.
+
+def _fee_assignment_student_id(instance):
+    try:
+        return instance.fee_assignment.student_id
+    except Exception:
+        # Fee assignment already deleted (cascade) - its own signal handles it
+        return None
+
+
+@receiver(post_save, sender=BatchAccessControl)
+@receiver(post_delete, sender=BatchAccessControl)
+@receiver(post_save, sender=StudentFeeAssignment)
+@receiver(post_delete, sender=StudentFeeAssignment)
+def student_lock_inputs_changed(sender, instance, **kwargs):
+    schedule_student_recompute(instance.student_id)
+
+
+@receiver(post_save, sender=EMISchedule)
+@receiver(post_delete, sender=EMISchedule)
+@receiver(post_save, sender=PaymentRecord)
+def emi_lock_inputs_changed(sender, instance, **kwargs):
+    schedule_student_recompute(_fee_assignment_student_id(instance))
+
+
+@receiver(post_save, sender=BatchEnrollment)
+def enrollment_saved(sender, instance, created, update_fields=None, **kwargs):
+    if update_fields and set(update_fields) <= set(LOCK_FIELDS):
+        return
+    enrollment_id = instance.pk
+    transaction.on_commit(
+        lambda: recompute_batch_locks(BatchEnrollment.objects.filter(pk=enrollment_id))
+    )
+
+
+@receiver(post_save, sender=Batch)
+def batch_saved(sender, instance, created, **kwargs):
+    if created:
+        return
+    batch_id = instance.pk
+    transaction.on_commit(
+        lambda: recompute_batch_locks(BatchEnrollment.objects.filter(batch_id=batch_id))
+    )
@@ -0,0 +1,33 @@
+# courses/exports.py - Login log (attendance) export (see userss/export_engine.py)
+
+from userss.export_engine import CHUNK_SIZE, Export
+
+from .models import StudentLoginLog
+
+
+def login_log_export(params):
+    # StudentLoginLog has no course FK - the old select_related('course') crashed
+    logs = StudentLoginLog.objects.select_related('student').order_by('-login_time')
+    if params.get('date_from'):
+        logs = logs.filter(login_time__date__gte=params['date_from'])
+    if params.get('date_to'):
+        logs = logs.filter(login_time__date__lte=params['date_to'])
+
+    header = [
+        'Student', 'Email', 'Course', 'Login Time', 'Logout Time',
+        'Duration (mins)', 'IP Address'
+    ]
+
+    def rows():
+        for log in logs.iterator(chunk_size=CHUNK_SIZE):
+            yield [
+                log.student.get_full_name() or log.student.username,
+                log.student.email,
+                'General',
+                log.login_time.strftime('%Y-%m-%d %H:%M:%S'),
+                log.logout_time.strftime('%Y-%m-%d %H:%M:%S') if log.logout_time else 'Active',
+                log.session_duration,
+                log.ip_address or 'N/A'
+            ]
+
+    return Export('attendance', header, rows(), queryset=logs, title='Attendance')
@@ -0,0 +1,25 @@
+# courses/management/commands/rebuild_batch_locks.py
+
+from django.core.management.base import BaseCommand
+
+from courses.batch_locks import recompute_batch_locks, recompute_student_batch_locks
+
+
+class Command(BaseCommand):
+    help = 'Recompute the stored lock state of batch enrollments'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--student',
+            type=int,
+            action='append',
+            help='Only recompute enrollments of this student id (repeatable)',
+        )
+
+    def handle(self, *args, **options):
+        if options['student']:
+            written = recompute_student_batch_locks(options['student'])
+        else:
+            written = recompute_batch_locks()
+
+        self.stdout.write(self.style.SUCCESS(f'Batch lock state updated for {written} enrollments'))
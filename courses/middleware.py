@@ -3,6 +3,10 @@
 from django.utils import timezone
 from django.utils.deprecation import MiddlewareMixin
 from courses.models import StudentLoginLog
+from courses.activity import (
+    LIMIT_DISABLED, get_device_state, is_login_log_open, record_device_heartbeat,
+    remember_open_login_log,
+)
 import logging
 
 logger = logging.getLogger(__name__)
@@ -36,29 +40,17 @@ class AttendanceTrackingMiddleware(MiddlewareMixin):
             # Get session ID from session storage
             log_id = request.session.get('attendance_log_id')
             
-            if log_id:
-                # Check if this session still exists and is active
-                try:
-                    active_log = StudentLoginLog.objects.get(
-                        id=log_id,
-                        student=request.user,
-                        logout_time__isnull=True
-                    )
-                    # Session exists and is active - continue using it
-                    return None
-                    
-                except StudentLoginLog.DoesNotExist:
-                    # Session doesn't exist or was logged out
-                    # Create new session
-                    pass
+            # Open/closed state is cached - no query while the log stays open
+            if log_id and is_login_log_open(log_id, request.user.id):
+                return None
             
             # No active session found - create new one
             new_log = StudentLoginLog.objects.create(
                 student=request.user,
-                course=None,
                 ip_address=self.get_client_ip(request),
                 device_info=request.META.get('HTTP_USER_AGENT', '')[:500]
             )
+            remember_open_login_log(new_log)
             
             # Store new session ID
             request.session['attendance_log_id'] = new_log.id
@@ -82,9 +74,6 @@ class AttendanceTrackingMiddleware(MiddlewareMixin):
 
 # courses/middleware.py
 
-from django.utils import timezone
-from courses.models import StudentDeviceLimit, DeviceSession
-
 class DeviceTrackingMiddleware:
     """Track student devices using fingerprint"""
     
@@ -94,7 +83,9 @@ class DeviceTrackingMiddleware:
     def __call__(self, request):
         # Process before view
         if request.user.is_authenticated and hasattr(request.user, 'role') and request.user.role == 'student':
-            self.track_student_device(request)
+            redirect_response = self.track_student_device(request)
+            if redirect_response is not None:
+                return redirect_response
         
         response = self.get_response(request)
         return response
@@ -124,31 +115,18 @@ class DeviceTrackingMiddleware:
                 # Don't track, let login handle it
                 return
             
-            # Get or create device limit
-            device_limit, created = StudentDeviceLimit.objects.get_or_create(
-                student=request.user,
-                defaults={'max_devices': 2, 'is_active': True}
-            )
+            # Device limit + registered device, cached per student/fingerprint
+            device_state = get_device_state(request.user, device_fingerprint)
             
-            if not device_limit.is_active:
+            if device_state == LIMIT_DISABLED:
                 # Account disabled - don't track
                 return
             
-            # Check if device exists
-            try:
-                device_session = DeviceSession.objects.get(
-                    device_id=device_fingerprint,
-                    student_limit=device_limit
-                )
-                
-                # Update last login time (only once per minute to avoid too many writes)
-                now = timezone.now()
-                if (now - device_session.last_login).total_seconds() > 60:
-                    device_session.last_login = now
-                    device_session.is_active = True
-                    device_session.save(update_fields=['last_login', 'is_active'])
-                
-            except DeviceSession.DoesNotExist:
+            if device_state is not None:
+                # last_login is buffered and written in bulk (write-behind)
+                record_device_heartbeat(device_state)
+            
+            else:
                 # Device not found - this shouldn't happen if login was successful
                 # But if it does, log user out for security
                 print(f"⚠️ Unknown device detected for {request.user.username}")
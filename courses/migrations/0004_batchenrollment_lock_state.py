@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-17 07:36
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0003_alter_devicesession_device_id'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='batchenrollment',
+            name='lock_evaluated_on',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='batchenrollment',
+            name='lock_reason',
+            field=models.CharField(blank=True, choices=[('', 'None'), ('inactive', 'Enrollment inactive'), ('admin', 'Admin lock'), ('payment', 'Pending payment')], default='', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='batchenrollment',
+            name='lock_state',
+            field=models.CharField(choices=[('unknown', 'Not evaluated'), ('unlocked', 'Unlocked'), ('locked', 'Locked')], db_index=True, default='unknown', max_length=10),
+        ),
+        migrations.AddIndex(
+            model_name='batchenrollment',
+            index=models.Index(fields=['student', 'lock_state'], name='batchenroll_student_lock_idx'),
+        ),
+    ]
@@ -6,6 +6,7 @@ from django.utils import timezone
 from django.core.validators import MinValueValidator, MaxValueValidator
 from PIL import Image
 import os
+from datetime import date
 
 User = get_user_model()
 
@@ -790,6 +791,19 @@ class BatchEnrollment(models.Model):
         ('completed', 'Completed'),
         ('dropped', 'Dropped'),
     ]
+
+    LOCK_STATE_CHOICES = [
+        ('unknown', 'Not evaluated'),
+        ('unlocked', 'Unlocked'),
+        ('locked', 'Locked'),
+    ]
+
+    LOCK_REASON_CHOICES = [
+        ('', 'None'),
+        ('inactive', 'Enrollment inactive'),
+        ('admin', 'Admin lock'),
+        ('payment', 'Pending payment'),
+    ]
     
     student = models.ForeignKey(
         User, on_delete=models.CASCADE,
@@ -802,112 +816,45 @@ class BatchEnrollment(models.Model):
     enrolled_at = models.DateTimeField(auto_now_add=True)
     is_active = models.BooleanField(default=True)
 
+    # Materialized lock state - maintained by courses/batch_locks.py
+    lock_state = models.CharField(
+        max_length=10, choices=LOCK_STATE_CHOICES, default='unknown', db_index=True
+    )
+    lock_reason = models.CharField(max_length=20, choices=LOCK_REASON_CHOICES, blank=True, default='')
+    lock_evaluated_on = models.DateField(null=True, blank=True)
+
     class Meta:
         unique_together = ['student', 'batch']
+        indexes = [
+            models.Index(fields=['student', 'lock_state'], name='batchenroll_student_lock_idx'),
+        ]
 
     def __str__(self):
         return f"{self.student.username} - {self.batch.name}"
-    
-    
+
+    def refresh_lock_state(self):
+        """Re-evaluate and store the lock state of this enrollment"""
+        from .batch_locks import refresh_enrollment_lock
+        refresh_enrollment_lock(self)
+
+    def _ensure_lock_state(self):
+        # Lock rules depend on today's date (grace periods, unlock/override
+        # dates) - a state evaluated on an earlier day is stale
+        if self.lock_state == 'unknown' or self.lock_evaluated_on != date.today():
+            self.refresh_lock_state()
+
     @property
     def is_locked(self):
-        """Check if THIS specific batch is locked - WITH DEBUGGING"""
-        
-        print(f"\n=== CHECKING LOCK for Enrollment {self.id} ===")
-        print(f"Student: {self.student.username}")
-        print(f"Batch: {self.batch.name}")
-        print(f"Batch Status: {self.batch.status}")
-        print(f"Enrollment is_active: {self.is_active}")
-        
-        # Check 1: Batch inactive ho to NOT LOCKED (just unavailable)
-        if not self.is_active:
-            print(f"✓ Enrollment INACTIVE - Returning TRUE (locked)")
-            return True
-        
-        # Check 2: Batch completed/draft
-        if self.batch.status == 'completed':
-            print(f"✓ Batch COMPLETED - Returning FALSE (not locked, just completed)")
-            return False
-            
-        if self.batch.status != 'active':
-            print(f"✓ Batch NOT ACTIVE ({self.batch.status}) - Returning FALSE")
-            return False
-        
-        # Check 3: Admin batch-specific lock (HIGHEST PRIORITY)
-        try:
-            from fees.models import BatchAccessControl
-            batch_control = BatchAccessControl.objects.get(
-                student=self.student,
-                batch=self.batch
-            )
-            if not batch_control.is_access_allowed():
-                print(f"✓ ADMIN LOCK found - Returning TRUE")
-                return True
-            else:
-                print(f"✓ Admin control exists but access allowed")
-        except BatchAccessControl.DoesNotExist:
-            print(f"✓ No admin lock found")
-        
-        # Check 4: Fee-based lock (ONLY if admin not locked)
-        try:
-            from fees.models import StudentFeeAssignment
-            fee_assignment = StudentFeeAssignment.objects.get(
-                student=self.student,
-                course=self.batch.course
-            )
-            is_batch_locked = fee_assignment.is_batch_locked(self.batch)
-            print(f"✓ Fee assignment found - is_batch_locked: {is_batch_locked}")
-            return is_batch_locked
-        except StudentFeeAssignment.DoesNotExist:
-            print(f"✓ No fee assignment found")
-        
-        print(f"✓ FINAL: Returning FALSE (unlocked)")
-        return False
-    
+        """Check if THIS specific batch is locked (stored lock_state)"""
+        self._ensure_lock_state()
+        return self.lock_state == 'locked'
+
     def get_lock_reason(self):
-        """Get lock reason - WITH DEBUGGING"""
-        
-        print(f"\n=== GETTING LOCK REASON for Enrollment {self.id} ===")
-        
-        if not self.is_locked:
-            print(f"✓ Not locked - Returning None")
+        """Lock reason: 'inactive', 'admin', 'payment' or None"""
+        self._ensure_lock_state()
+        if self.lock_state != 'locked':
             return None
-        
-        # Check inactive
-        if not self.is_active:
-            print(f"✓ Enrollment INACTIVE - Reason: 'inactive'")
-            return 'inactive'
-        
-        # Check admin lock
-        try:
-            from fees.models import BatchAccessControl
-            batch_control = BatchAccessControl.objects.get(
-                student=self.student,
-                batch=self.batch
-            )
-            if not batch_control.is_access_allowed():
-                print(f"✓ Admin lock found - Reason: 'admin'")
-                return 'admin'
-        except:
-            print(f"✓ No admin lock")
-            pass
-        
-        # Check fee lock
-        try:
-            from fees.models import StudentFeeAssignment
-            fee_assignment = StudentFeeAssignment.objects.get(
-                student=self.student,
-                course=self.batch.course
-            )
-            if fee_assignment.is_batch_locked(self.batch):
-                print(f"✓ Fee lock found - Reason: 'payment'")
-                return 'payment'
-        except:
-            print(f"✓ No fee lock")
-            pass
-        
-        print(f"✓ Unknown reason - Returning None")
-        return None
+        return self.lock_reason or None
 
 
 
@@ -10,6 +10,7 @@ from django.urls import reverse
 from django.utils import timezone
 from django.utils.text import slugify
 from django.contrib.auth import get_user_model
+from userss.student_stats import invalidate_student_stats
 from .forms import (
     CourseForm, CourseCategoryForm, CourseModuleForm,
     EnrollmentForm, CourseReviewForm, CourseFAQForm, CourseSearchForm,
@@ -1641,7 +1642,9 @@ def bulk_update_status(request):
         if request.user.role == 'instructor':
             enrollments = enrollments.filter(course__instructor=request.user)
         
+        student_ids = list(enrollments.values_list('student_id', flat=True))
         updated = enrollments.update(status=new_status)
+        invalidate_student_stats(*student_ids)
         
         logger.info(f"{updated} enrollments updated to {new_status} by {request.user.username}")
         
@@ -2120,7 +2123,9 @@ def bulk_update_status(request):
             )
         
         # Update enrollments
+        student_ids = list(enrollments.values_list('student_id', flat=True))
         updated_count = enrollments.update(status=new_status)
+        invalidate_student_stats(*student_ids)
         
         return JsonResponse({
             'success': True, 
@@ -4472,46 +4477,21 @@ def student_attendance_detail(request, student_id):
 
 @login_required
 def export_attendance(request):
-    """Export attendance to CSV"""
-    import csv
-    from django.http import HttpResponse
-    
+    """Export attendance (CSV / XLSX, streamed)"""
+    from userss.export_engine import export_response
+
     if request.user.role != 'superadmin':
         return redirect('courses:attendance_status')
-    
-    # Get filters
-    date_from = request.GET.get('date_from', '')
-    date_to = request.GET.get('date_to', '')
-    
-    logs = StudentLoginLog.objects.all().select_related('student', 'course')
-    
-    if date_from:
-        logs = logs.filter(login_time__date__gte=date_from)
-    if date_to:
-        logs = logs.filter(login_time__date__lte=date_to)
-    
-    # Create CSV
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = 'attachment; filename="attendance.csv"'
-    
-    writer = csv.writer(response)
-    writer.writerow([
-        'Student', 'Email', 'Course', 'Login Time', 'Logout Time', 
-        'Duration (mins)', 'IP Address'
-    ])
-    
-    for log in logs:
-        writer.writerow([
-            log.student.get_full_name() or log.student.username,
-            log.student.email,
-            log.course.title if log.course else 'General',
-            log.login_time.strftime('%Y-%m-%d %H:%M:%S'),
-            log.logout_time.strftime('%Y-%m-%d %H:%M:%S') if log.logout_time else 'Active',
-            log.session_duration,
-            log.ip_address or 'N/A'
-        ])
-    
-    return response
+
+    params = {
+        'date_from': request.GET.get('date_from', ''),
+        'date_to': request.GET.get('date_to', ''),
+    }
+    return export_response(
+        request, 'courses.login_logs', params,
+        file_format=request.GET.get('format', 'csv'),
+        fallback_url=reverse('courses:attendance_status'),
+    )
 # courses/views.py - ADD AT THE END
 
 # ==================== STUDENT REVIEW SUBMISSION ====================
@@ -5144,12 +5124,6 @@ def batch_continue_learning(request, batch_id):
         is_active=True
     )
     
-    print(f"\n=== CONTINUE LEARNING DEBUG ===")
-    print(f"Student: {request.user.username}")
-    print(f"Batch: {batch.name}")
-    print(f"Enrollment is_locked: {enrollment.is_locked}")
-    print(f"Lock reason: {enrollment.get_lock_reason()}")
-    
     # ✅ Check if batch is locked
     if enrollment.is_locked:
         lock_reason = enrollment.get_lock_reason()
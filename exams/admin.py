@@ -11,6 +11,7 @@ from .models import (
     ExamAssignment, ExamAttempt, MCQResponse, QAResponse,
     AssignmentSubmission, ExamFile
 )
+from .grading import CLOSED_STATUSES, grade_attempts
 
 
 class MCQOptionInline(admin.TabularInline):
@@ -128,6 +129,7 @@ class ExamAdmin(admin.ModelAdmin):
     list_editable = ('status', 'is_active')
     date_hierarchy = 'created_at'
     ordering = ['-created_at']
+    actions = ['regrade_mcq_attempts']
     
     fieldsets = (
         ('Basic Information', {
@@ -163,6 +165,16 @@ class ExamAdmin(admin.ModelAdmin):
         return obj.get_total_questions()
     total_questions.short_description = 'Questions'
     
+    @admin.action(description="Regrade submitted MCQ attempts (after answer key changes)")
+    def regrade_mcq_attempts(self, request, queryset):
+        result = grade_attempts(ExamAttempt.objects.filter(
+            exam__in=queryset, status__in=CLOSED_STATUSES
+        ))
+        self.message_user(
+            request,
+            f"Regraded {result['graded']} attempts - {result['changed']} results changed, {result['passed']} passed."
+        )
+    
     def save_model(self, request, obj, form, change):
         if not change:  # Only set created_by for new objects
             obj.created_by = request.user
@@ -237,6 +249,7 @@ class ExamAttemptAdmin(admin.ModelAdmin):
     readonly_fields = ('started_at', 'exam_config', 'percentage')
     date_hierarchy = 'started_at'
     ordering = ['-started_at']
+    actions = ['grade_mcq_attempts']
     
     fieldsets = (
         ('Attempt Information', {
@@ -264,6 +277,14 @@ class ExamAttemptAdmin(admin.ModelAdmin):
             return [QAResponseInline]
         return []
     
+    @admin.action(description="Grade selected MCQ attempts")
+    def grade_mcq_attempts(self, request, queryset):
+        result = grade_attempts(queryset.filter(status__in=CLOSED_STATUSES))
+        self.message_user(
+            request,
+            f"Graded {result['graded']} MCQ attempts - {result['changed']} results changed, {result['passed']} passed."
+        )
+    
     def save_model(self, request, obj, form, change):
         if obj.is_graded and not obj.graded_by:
             obj.graded_by = request.user
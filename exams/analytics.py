@@ -0,0 +1,178 @@
+# exams/analytics.py - Exam results analytics (item statistics)
+"""
+Per-exam analytics for the exam detail pages (JSON endpoint ``exam_analytics``):
+
+- score distribution of graded attempts (histogram, mean / median / std, quartiles)
+- per MCQ question: difficulty (p-value = share of attempts answering it
+  right), discrimination index (p of the top 27% minus p of the bottom 27%
+  by score) and how often each option was picked
+
+Responses are read with two aggregate queries (option counts joined to
+``MCQOption.is_correct``, and the correct (attempt, question) pairs); the
+statistics are NumPy array maths. Results are cached per exam and dropped
+when attempts get graded (``grading.grade_attempts``, the deadline sweeper,
+or a graded attempt being saved).
+"""
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import ExamAttempt, MCQQuestion, MCQResponse
+
+CACHE_TIMEOUT = getattr(settings, "EXAM_ANALYTICS_CACHE_TIMEOUT", 15 * 60)
+
+KEY = "exams:analytics:{exam_id}"
+
+GRADED_STATUSES = ['submitted', 'auto_submitted']
+
+# Kelley's upper / lower group size for the discrimination index
+GROUP_FRACTION = 0.27
+
+
+def _round(value, digits=4):
+    return None if value is None else round(float(value), digits)
+
+
+def score_distribution(percentages):
+    """Summary + 10-bucket histogram of ``percentages`` (NumPy array)"""
+    import numpy as np
+
+    counts, edges = np.histogram(np.clip(percentages, 0, 100), bins=10, range=(0, 100))
+    histogram = [
+        {'range': f'{int(edges[i])}-{int(edges[i + 1])}', 'count': int(counts[i])}
+        for i in range(len(counts))
+    ]
+    if not len(percentages):
+        return {'count': 0, 'histogram': histogram}
+
+    q1, median, q3 = np.percentile(percentages, [25, 50, 75])
+    return {
+        'count': int(len(percentages)),
+        'mean': _round(percentages.mean(), 2),
+        'median': _round(median, 2),
+        'std': _round(percentages.std(), 2),
+        'min': _round(percentages.min(), 2),
+        'max': _round(percentages.max(), 2),
+        'q1': _round(q1, 2),
+        'q3': _round(q3, 2),
+        'histogram': histogram,
+    }
+
+
+def item_statistics(exam_id, attempt_ids, scores):
+    """
+    Difficulty / discrimination / option frequencies of every active MCQ
+    question, over ``attempt_ids`` (ordered like ``scores``).
+    """
+    import numpy as np
+
+    questions = list(
+        MCQQuestion.objects.filter(exam_id=exam_id, is_active=True)
+        .prefetch_related('options').order_by('order', 'id')
+    )
+    if not questions or not attempt_ids:
+        return []
+
+    attempt_index = {attempt_id: i for i, attempt_id in enumerate(attempt_ids)}
+    question_index = {question.id: j for j, question in enumerate(questions)}
+
+    # correct[i, j] - attempt i answered question j right
+    correct = np.zeros((len(attempt_ids), len(questions)), dtype=bool)
+    for attempt_id, question_id in MCQResponse.objects.filter(
+        attempt_id__in=attempt_ids, selected_option__is_correct=True
+    ).values_list('attempt_id', 'question_id').order_by():
+        j = question_index.get(question_id)
+        if j is not None:
+            correct[attempt_index[attempt_id], j] = True
+
+    option_counts = {
+        (row['question_id'], row['selected_option_id']): row['picked']
+        for row in MCQResponse.objects.filter(attempt_id__in=attempt_ids)
+        .values('question_id', 'selected_option_id').annotate(picked=Count('id')).order_by()
+    }
+
+    n = len(attempt_ids)
+    p_values = correct.mean(axis=0)
+
+    # Upper / lower 27% by total score (stable sort - ties keep attempt order)
+    discrimination = np.full(len(questions), np.nan)
+    group = int(round(n * GROUP_FRACTION))
+    if n >= 2 and group >= 1:
+        order = np.argsort(scores, kind='stable')
+        lower, upper = order[:group], order[-group:]
+        discrimination = correct[upper].mean(axis=0) - correct[lower].mean(axis=0)
+
+    items = []
+    for j, question in enumerate(questions):
+        options = []
+        for option in sorted(question.options.all(), key=lambda o: (o.order, o.id)):
+            picked = option_counts.get((question.id, option.id), 0)
+            options.append({
+                'id': option.id,
+                'text': option.option_text,
+                'is_correct': option.is_correct,
+                'picked': picked,
+                'share': _round(picked / n),
+            })
+        skipped = n - sum(option['picked'] for option in options)
+        items.append({
+            'question_id': question.id,
+            'order': question.order,
+            'question': question.question_text[:120],
+            'marks': question.marks,
+            'p_value': _round(p_values[j]),
+            'discrimination': None if np.isnan(discrimination[j]) else _round(discrimination[j]),
+            'skipped': max(0, skipped),
+            'options': options,
+        })
+    return items
+
+
+def compute_exam_analytics(exam):
+    """Full analytics dict of ``exam`` (no caching)"""
+    import numpy as np
+
+    rows = list(
+        ExamAttempt.objects.filter(exam=exam, status__in=GRADED_STATUSES, is_graded=True)
+        .values_list('id', 'total_marks_obtained', 'percentage', 'is_passed').order_by('id')
+    )
+    attempt_ids = [row[0] for row in rows]
+    scores = np.array([float(row[1]) for row in rows], dtype=float)
+    percentages = np.array([float(row[2]) for row in rows], dtype=float)
+    passed = np.array([row[3] for row in rows], dtype=bool)
+
+    return {
+        'exam_id': exam.id,
+        'exam_type': exam.exam_type,
+        'generated_at': timezone.now().isoformat(),
+        'graded_attempts': len(rows),
+        'pass_rate': _round(passed.mean() * 100, 2) if len(rows) else None,
+        'scores': score_distribution(percentages),
+        'questions': item_statistics(exam.id, attempt_ids, scores) if exam.exam_type == 'mcq' else [],
+    }
+
+
+def get_exam_analytics(exam):
+    key = KEY.format(exam_id=exam.id)
+    analytics = cache.get(key)
+    if analytics is None:
+        analytics = compute_exam_analytics(exam)
+        cache.set(key, analytics, CACHE_TIMEOUT)
+    return analytics
+
+
+def invalidate_exam_analytics(*exam_ids):
+    cache.delete_many([KEY.format(exam_id=exam_id) for exam_id in set(exam_ids)])
+
+
+# ==================== CACHE INVALIDATION SIGNALS ====================
+
+@receiver(post_save, sender=ExamAttempt)
+def attempt_graded(sender, instance, **kwargs):
+    # Manual / per-attempt grading (calculate_mcq_marks, Q&A and assignment grading)
+    if instance.is_graded:
+        invalidate_exam_analytics(instance.exam_id)
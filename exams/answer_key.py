@@ -0,0 +1,78 @@
+# exams/answer_key.py - Cached per-exam answer key
+"""
+Everything needed to validate (and grade) responses of one exam, cached:
+
+    {
+        'exam_type': 'mcq',
+        'mcq': {question_id: {'options': [option_id, ...], 'correct': [option_id, ...], 'marks': '2.00'}},
+        'qa': [question_id, ...],
+    }
+
+Only active questions are included. Question / option changes drop the
+exam's entry (signals below), so a live exam hits the DB once per edit
+instead of once per autosave.
+"""
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Exam, MCQOption, MCQQuestion, QAQuestion
+
+CACHE_TIMEOUT = getattr(settings, "EXAM_ANSWER_KEY_CACHE_TIMEOUT", 60 * 60)
+
+KEY = "exams:answer_key:{exam_id}"
+
+
+def build_answer_key(exam_id):
+    exam_type = Exam.objects.filter(pk=exam_id).values_list('exam_type', flat=True).first()
+
+    mcq = {}
+    for question_id, marks in MCQQuestion.objects.filter(
+        exam_id=exam_id, is_active=True
+    ).values_list('id', 'marks'):
+        mcq[question_id] = {'options': [], 'correct': [], 'marks': str(marks)}
+    for option_id, question_id, is_correct in MCQOption.objects.filter(
+        question_id__in=list(mcq)
+    ).values_list('id', 'question_id', 'is_correct').order_by('order', 'id'):
+        mcq[question_id]['options'].append(option_id)
+        if is_correct:
+            mcq[question_id]['correct'].append(option_id)
+
+    qa = list(QAQuestion.objects.filter(
+        exam_id=exam_id, is_active=True
+    ).values_list('id', flat=True))
+
+    return {'exam_type': exam_type, 'mcq': mcq, 'qa': qa}
+
+
+def get_answer_key(exam_id):
+    key = KEY.format(exam_id=exam_id)
+    answer_key = cache.get(key)
+    if answer_key is None:
+        answer_key = build_answer_key(exam_id)
+        cache.set(key, answer_key, CACHE_TIMEOUT)
+    return answer_key
+
+
+def invalidate_answer_key(exam_id):
+    cache.delete(KEY.format(exam_id=exam_id))
+
+
+# ==================== CACHE INVALIDATION SIGNALS ====================
+
+@receiver(post_save, sender=MCQQuestion)
+@receiver(post_delete, sender=MCQQuestion)
+@receiver(post_save, sender=QAQuestion)
+@receiver(post_delete, sender=QAQuestion)
+def question_changed(sender, instance, **kwargs):
+    invalidate_answer_key(instance.exam_id)
+
+
+@receiver(post_save, sender=MCQOption)
+@receiver(post_delete, sender=MCQOption)
+def option_changed(sender, instance, **kwargs):
+    exam_id = MCQQuestion.objects.filter(pk=instance.question_id).values_list('exam_id', flat=True).first()
+    if exam_id:
+        invalidate_answer_key(exam_id)
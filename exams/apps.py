@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class ExamsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'exams'
+
+    def ready(self):
+        import exams.answer_key  # Answer key cache invalidation signals
+        import exams.paper  # Exam paper cache invalidation signals
+        import exams.analytics  # Exam analytics cache invalidation signals
@@ -0,0 +1,123 @@
+# exams/autosave.py - Batched exam autosave
+"""
+One request carries every answer changed since the last save:
+
+    {"seq": 7, "responses": [{"question_id": 12, "option_id": 40},
+                             {"question_id": 15, "answer_text": "..."}]}
+
+``seq`` increases per client flush; a batch with a ``seq`` not above the
+last applied one (retry, out-of-order delivery) is acknowledged without
+writing. Ids are checked against the cached answer key (no query) and the
+valid deltas are upserted with ``bulk_create(update_conflicts=True)`` -
+about three queries per batch however many answers it holds.
+"""
+
+from django.db import transaction
+
+from .answer_key import get_answer_key
+from .models import ExamAttempt, MCQResponse, QAResponse
+
+MAX_DELTAS = 500
+
+
+def _as_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def validate_deltas(answer_key, deltas):
+    """
+    Split deltas into ``(mcq, qa, rejected)``: ``{question_id: option_id|None}``,
+    ``{question_id: text}`` and ``[(delta, reason)]``. Later deltas win.
+    """
+    mcq, qa, rejected = {}, {}, []
+    qa_ids = set(answer_key['qa'])
+
+    for delta in deltas:
+        if not isinstance(delta, dict):
+            rejected.append((delta, 'invalid delta'))
+            continue
+        question_id = _as_int(delta.get('question_id'))
+
+        if 'answer_text' in delta:
+            if question_id not in qa_ids:
+                rejected.append((delta, 'unknown question'))
+                continue
+            qa[question_id] = str(delta.get('answer_text') or '')
+            continue
+
+        question = answer_key['mcq'].get(question_id) if question_id is not None else None
+        if question is None:
+            rejected.append((delta, 'unknown question'))
+            continue
+        option_id = delta.get('option_id')
+        if option_id in (None, ''):
+            # Answer cleared
+            mcq[question_id] = None
+            continue
+        option_id = _as_int(option_id)
+        if option_id not in question['options']:
+            rejected.append((delta, 'option does not belong to question'))
+            continue
+        mcq[question_id] = option_id
+
+    return mcq, qa, rejected
+
+
+def claim_sequence(attempt_id, seq):
+    """True if ``seq`` is newer than the last applied batch (and records it)"""
+    if seq is None:
+        return True
+    return ExamAttempt.objects.filter(pk=attempt_id, autosave_seq__lt=seq).update(autosave_seq=seq) == 1
+
+
+def apply_autosave(attempt, deltas, seq=None):
+    """
+    Validate and upsert ``deltas`` for ``attempt`` (already checked to be
+    open and before its deadline). Returns a JSON-able result dict.
+    """
+    if len(deltas) > MAX_DELTAS:
+        return {'success': False, 'message': f'Too many responses in one batch (max {MAX_DELTAS})'}
+
+    answer_key = get_answer_key(attempt.exam_id)
+    mcq, qa, rejected = validate_deltas(answer_key, deltas)
+
+    with transaction.atomic():
+        if not claim_sequence(attempt.pk, seq):
+            return {'success': True, 'stale': True, 'saved': 0, 'seq': seq, 'rejected': []}
+
+        if mcq:
+            MCQResponse.objects.bulk_create(
+                [
+                    MCQResponse(attempt_id=attempt.pk, question_id=question_id, selected_option_id=option_id)
+                    for question_id, option_id in mcq.items()
+                ],
+                update_conflicts=True,
+                unique_fields=['attempt', 'question'],
+                update_fields=['selected_option'],
+            )
+        if qa:
+            QAResponse.objects.bulk_create(
+                [
+                    QAResponse(attempt_id=attempt.pk, question_id=question_id, answer_text=text)
+                    for question_id, text in qa.items()
+                ],
+                update_conflicts=True,
+                unique_fields=['attempt', 'question'],
+                update_fields=['answer_text'],
+            )
+
+        if attempt.status == 'started':
+            ExamAttempt.objects.filter(pk=attempt.pk, status='started').update(status='in_progress')
+
+    return {
+        'success': True,
+        'saved': len(mcq) + len(qa),
+        'seq': seq,
+        'rejected': [
+            {'question_id': delta.get('question_id') if isinstance(delta, dict) else None, 'reason': reason}
+            for delta, reason in rejected
+        ],
+    }
@@ -0,0 +1,98 @@
+# exams/deadlines.py - Server-side exam timer
+"""
+Every timed attempt gets ``ExamAttempt.deadline_at`` when it starts
+(``Exam.get_attempt_deadline()``: duration limit, capped by the exam window).
+
+- ``save_mcq_response`` / ``save_qa_response`` refuse writes once
+  ``is_past_deadline()`` (a datetime compare, no query)
+- ``auto_submit_expired_attempts()`` (scheduled task ``exams.auto_submit``)
+  moves every open attempt past its deadline to ``auto_submitted`` and
+  grades all MCQ attempts with one aggregate query - no per-attempt saves
+  (marks stay hidden unless the exam has ``show_results_immediately``)
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .analytics import invalidate_exam_analytics
+from .grading import grade_mcq_attempts
+from .models import ExamAttempt
+
+# Late autosaves (slow network on the last click) are still accepted this long
+GRACE_SECONDS = getattr(settings, "EXAM_DEADLINE_GRACE_SECONDS", 30)
+SWEEP_BATCH_SIZE = getattr(settings, "EXAM_SWEEP_BATCH_SIZE", 500)
+
+OPEN_STATUSES = ['started', 'in_progress']
+
+
+def is_past_deadline(attempt, now=None):
+    if attempt.deadline_at is None:
+        return False
+    now = now or timezone.now()
+    return now > attempt.deadline_at + timedelta(seconds=GRACE_SECONDS)
+
+
+def seconds_left(attempt, now=None):
+    """Remaining seconds for the exam timer (None = no time limit)"""
+    if attempt.deadline_at is None:
+        return None
+    now = now or timezone.now()
+    return max(0, int((attempt.deadline_at - now).total_seconds()))
+
+
+def auto_submit_attempts(attempts, now=None):
+    """
+    Close ``attempts`` (open, past deadline) as ``auto_submitted`` in bulk.
+    Returns how many were closed.
+    """
+    from userss.student_stats import invalidate_student_stats
+
+    now = now or timezone.now()
+    if not attempts:
+        return 0
+
+    for attempt in attempts:
+        attempt.status = 'auto_submitted'
+        attempt.submitted_at = min(attempt.deadline_at or now, now)
+        attempt.time_spent_minutes = max(0, round((attempt.submitted_at - attempt.started_at).total_seconds() / 60))
+
+    # Every MCQ attempt is graded here - nobody submits it again later.
+    # Result views still hide marks unless show_results_immediately.
+    grade_mcq_attempts([attempt for attempt in attempts if attempt.exam.exam_type == 'mcq'], now)
+
+    ExamAttempt.objects.bulk_update(attempts, [
+        'status', 'submitted_at', 'time_spent_minutes',
+        'total_marks_obtained', 'percentage', 'is_passed', 'is_graded', 'graded_at',
+    ])
+    # bulk_update sends no post_save
+    invalidate_student_stats(*[attempt.student_id for attempt in attempts])
+    invalidate_exam_analytics(*[attempt.exam_id for attempt in attempts if attempt.is_graded])
+    return len(attempts)
+
+
+def auto_submit_expired_attempts(now=None):
+    """Sweep every open attempt past its deadline. Returns the number closed."""
+    now = now or timezone.now()
+    cutoff = now - timedelta(seconds=GRACE_SECONDS)
+    total = 0
+    while True:
+        with transaction.atomic():
+            attempts = list(
+                ExamAttempt.objects.select_for_update(skip_locked=True, of=('self',)).filter(
+                    status__in=OPEN_STATUSES, deadline_at__lt=cutoff
+                ).select_related('exam').order_by('deadline_at')[:SWEEP_BATCH_SIZE]
+            )
+            closed = auto_submit_attempts(attempts, now)
+        total += closed
+        if closed < SWEEP_BATCH_SIZE:
+            return total
+
+
+def close_if_expired(attempt, now=None):
+    """Auto-submit a single open attempt whose time is up. True if it was closed."""
+    if attempt.status not in OPEN_STATUSES or not is_past_deadline(attempt, now):
+        return False
+    return auto_submit_attempts([attempt], now) == 1
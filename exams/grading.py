@@ -0,0 +1,131 @@
+# exams/grading.py - Bulk MCQ grading / regrade
+"""
+Grades many MCQ attempts at once, same rules as ``ExamAttempt.calculate_mcq_marks()``:
+
+- marks of every attempt come from ONE aggregate query (responses joined to
+  the correct options and summed over question marks)
+- percentage / pass are computed in memory and written grouped by outcome
+
+Used by the deadline sweeper (``exams/deadlines.py``), the admin actions and
+``python manage.py regrade_exam <exam_id>`` - after an answer key correction
+just fix ``MCQOption.is_correct`` and regrade the exam.
+"""
+
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from .analytics import invalidate_exam_analytics
+from .models import ExamAttempt, MCQResponse
+
+GRADE_BATCH_SIZE = getattr(settings, "EXAM_GRADE_BATCH_SIZE", 1000)
+
+CLOSED_STATUSES = ['submitted', 'auto_submitted']
+
+
+def mcq_marks_by_attempt(attempt_ids):
+    """
+    ``{attempt_id: marks}`` - sum of question marks of correct answers.
+    ``attempt_ids`` may be a list or a ``values('id')`` queryset (subquery).
+    """
+    return {
+        row['attempt_id']: Decimal(str(row['marks'] or 0))
+        for row in MCQResponse.objects.filter(
+            attempt_id__in=attempt_ids, selected_option__is_correct=True
+        ).values('attempt_id').annotate(marks=Sum('question__marks')).order_by()
+    }
+
+
+def apply_marks(attempts, marks, now=None):
+    """Set marks / percentage / pass on ``attempts`` in memory from ``{attempt_id: marks}``"""
+    now = now or timezone.now()
+    for attempt in attempts:
+        exam = attempt.exam
+        attempt.total_marks_obtained = marks.get(attempt.id, Decimal('0'))
+        if exam.total_marks > 0:
+            attempt.percentage = round(attempt.total_marks_obtained * 100 / exam.total_marks, 2)
+            attempt.is_passed = attempt.total_marks_obtained >= exam.passing_marks
+        else:
+            attempt.percentage = Decimal('0')
+            attempt.is_passed = False
+        attempt.is_graded = True
+        attempt.graded_at = now
+    return attempts
+
+
+def grade_mcq_attempts(attempts, now=None):
+    """Grade already loaded MCQ ``attempts`` in memory. Caller saves them."""
+    return apply_marks(attempts, mcq_marks_by_attempt([attempt.id for attempt in attempts]), now)
+
+
+def save_results(attempts, now):
+    """
+    Write results grouped by outcome - an exam has few distinct scores, so
+    this is a handful of ``UPDATE ... WHERE id IN (...)`` instead of one
+    row-by-row CASE per attempt (``bulk_update``).
+    """
+    groups = {}
+    for attempt in attempts:
+        outcome = (attempt.total_marks_obtained, attempt.percentage, attempt.is_passed)
+        groups.setdefault(outcome, []).append(attempt.id)
+
+    for (marks, percentage, is_passed), ids in groups.items():
+        for start in range(0, len(ids), GRADE_BATCH_SIZE):
+            ExamAttempt.objects.filter(id__in=ids[start:start + GRADE_BATCH_SIZE]).update(
+                total_marks_obtained=marks,
+                percentage=percentage,
+                is_passed=is_passed,
+                is_graded=True,
+                graded_at=now,
+            )
+
+
+def grade_attempts(attempts_qs, now=None):
+    """
+    Grade (or regrade) every MCQ attempt of ``attempts_qs`` and save the
+    results in bulk. Returns ``{'graded', 'changed', 'passed'}``.
+    """
+    from userss.student_stats import invalidate_student_stats
+
+    now = now or timezone.now()
+    attempts_qs = attempts_qs.filter(exam__exam_type='mcq')
+
+    with transaction.atomic():
+        attempts = list(
+            attempts_qs.select_related('exam').defer('exam_config').order_by()
+        )
+        if not attempts:
+            return {'graded': 0, 'changed': 0, 'passed': 0}
+
+        before = {
+            attempt.id: (attempt.total_marks_obtained, attempt.is_passed, attempt.is_graded)
+            for attempt in attempts
+        }
+        marks = mcq_marks_by_attempt(attempts_qs.values('id'))
+        apply_marks(attempts, marks, now)
+        save_results(attempts, now)
+
+    changed = [
+        attempt for attempt in attempts
+        if before[attempt.id] != (attempt.total_marks_obtained, attempt.is_passed, attempt.is_graded)
+    ]
+    # QuerySet.update sends no post_save
+    invalidate_student_stats(*[attempt.student_id for attempt in changed])
+    invalidate_exam_analytics(*[attempt.exam_id for attempt in attempts])
+
+    return {
+        'graded': len(attempts),
+        'changed': len(changed),
+        'passed': sum(1 for attempt in attempts if attempt.is_passed),
+    }
+
+
+def regrade_exam(exam_id, ungraded_only=False, now=None):
+    """Grade every submitted attempt of an MCQ exam (``ungraded_only`` skips graded ones)"""
+    attempts_qs = ExamAttempt.objects.filter(exam_id=exam_id, status__in=CLOSED_STATUSES)
+    if ungraded_only:
+        attempts_qs = attempts_qs.filter(is_graded=False)
+    return grade_attempts(attempts_qs, now)
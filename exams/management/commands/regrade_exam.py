@@ -0,0 +1,39 @@
+# exams/management/commands/regrade_exam.py
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from exams.grading import regrade_exam
+from exams.models import Exam
+
+
+class Command(BaseCommand):
+    help = 'Grade / regrade every submitted attempt of MCQ exams in bulk (e.g. after an answer key fix)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('exam_ids', nargs='+', type=int, help='Exam id(s) to regrade')
+        parser.add_argument(
+            '--ungraded-only',
+            action='store_true',
+            help='Only grade attempts that have no result yet',
+        )
+
+    def handle(self, *args, **options):
+        exams = Exam.objects.in_bulk(options['exam_ids'])
+        missing = set(options['exam_ids']) - set(exams)
+        if missing:
+            raise CommandError(f"Exam(s) not found: {', '.join(map(str, sorted(missing)))}")
+
+        for exam_id in options['exam_ids']:
+            exam = exams[exam_id]
+            if exam.exam_type != 'mcq':
+                self.stdout.write(self.style.WARNING(f'Skipping "{exam.title}" - not an MCQ exam'))
+                continue
+
+            started = time.monotonic()
+            result = regrade_exam(exam_id, ungraded_only=options['ungraded_only'])
+            self.stdout.write(self.style.SUCCESS(
+                f'"{exam.title}": {result["graded"]} attempts graded, {result["changed"]} changed, '
+                f'{result["passed"]} passed ({time.monotonic() - started:.2f}s)'
+            ))
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-17 07:59
+
+from django.conf import settings
+from datetime import timedelta
+
+from django.db import migrations, models
+
+
+def backfill_open_deadlines(apps, schema_editor):
+    # Same rule as Exam.get_attempt_deadline() - historical models have no methods
+    ExamAttempt = apps.get_model('exams', 'ExamAttempt')
+    attempts = ExamAttempt.objects.filter(
+        status__in=['started', 'in_progress'], deadline_at__isnull=True
+    ).select_related('exam')
+    for attempt in attempts:
+        exam = attempt.exam
+        duration = None
+        if exam.timing_type == 'total_exam':
+            duration = exam.total_exam_time_minutes
+        elif exam.timing_type == 'per_question' and exam.time_per_question_minutes:
+            questions = exam.mcq_questions if exam.exam_type == 'mcq' else exam.qa_questions
+            count = questions.filter(is_active=True).count() if exam.exam_type in ('mcq', 'qa') else 1
+            duration = count * exam.time_per_question_minutes
+        deadline = attempt.started_at + timedelta(minutes=duration) if duration else None
+        if exam.end_datetime and (deadline is None or exam.end_datetime < deadline):
+            deadline = exam.end_datetime
+        if deadline:
+            ExamAttempt.objects.filter(pk=attempt.pk).update(deadline_at=deadline)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exams', '0002_alter_exam_time_per_question_minutes_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='examattempt',
+            name='deadline_at',
+            field=models.DateTimeField(blank=True, help_text='Set at start - open attempts past it are auto-submitted (exams/deadlines.py)', null=True),
+        ),
+        migrations.AddIndex(
+            model_name='examattempt',
+            index=models.Index(fields=['status', 'deadline_at'], name='exams_exama_status_d73dd9_idx'),
+        ),
+        migrations.RunPython(backfill_open_deadlines, migrations.RunPython.noop),
+    ]
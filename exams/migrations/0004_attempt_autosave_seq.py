@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 08:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exams', '0003_attempt_deadline'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='examattempt',
+            name='autosave_seq',
+            field=models.PositiveIntegerField(default=0, help_text='Last applied client sequence number of the batched autosave'),
+        ),
+    ]
@@ -109,6 +109,17 @@ class Exam(models.Model):
         else:  # total_exam
             return self.total_exam_time_minutes  # ✅ Can be None
     
+    def get_attempt_deadline(self, started_at):
+        """Server-side deadline of an attempt started at ``started_at`` (None = untimed)"""
+        deadline = None
+        duration = self.calculate_exam_duration()
+        if duration:
+            deadline = started_at + timedelta(minutes=duration)
+        # Nobody writes answers after the exam window closes
+        if self.end_datetime and (deadline is None or self.end_datetime < deadline):
+            deadline = self.end_datetime
+        return deadline
+    
     def is_available_now(self):
         """Check if exam is currently available"""
         now = timezone.now()
@@ -152,7 +163,10 @@ class Exam(models.Model):
         # Check if there's an ongoing attempt
         ongoing_attempt = attempts.filter(status='in_progress').first()
         if ongoing_attempt:
-            return False, 'You have an ongoing attempt. Complete it first.'
+            from .deadlines import close_if_expired
+            # Time already up (browser closed) - submit it now instead of blocking
+            if not close_if_expired(ongoing_attempt):
+                return False, 'You have an ongoing attempt. Complete it first.'
         
         # If no attempts yet, allow first attempt (within window)
         if attempt_count == 0:
@@ -400,7 +414,14 @@ class ExamAttempt(models.Model):
     # Timing
     started_at = models.DateTimeField(auto_now_add=True)
     submitted_at = models.DateTimeField(null=True, blank=True)
+    deadline_at = models.DateTimeField(
+        null=True, blank=True,
+        help_text="Set at start - open attempts past it are auto-submitted (exams/deadlines.py)"
+    )
     time_spent_minutes = models.PositiveIntegerField(default=0)
+    autosave_seq = models.PositiveIntegerField(
+        default=0, help_text="Last applied client sequence number of the batched autosave"
+    )
     
     # Exam configuration at time of attempt (frozen)
     exam_config = models.JSONField(default=dict, help_text="Exam settings when attempt was made")
@@ -424,6 +445,9 @@ class ExamAttempt(models.Model):
     class Meta:
         unique_together = ['exam', 'student', 'attempt_number']
         ordering = ['-started_at']
+        indexes = [
+            models.Index(fields=['status', 'deadline_at']),
+        ]
     
     def __str__(self):
         return f"{self.student.username} - {self.exam.title} (Attempt {self.attempt_number})"
@@ -0,0 +1,134 @@
+# exams/paper.py - Cached exam paper for the exam interface
+"""
+The student-facing "paper" of an exam (questions, options, marks - never
+``is_correct`` / model answers) is serialized once and cached under a
+versioned key; question / option edits bump the version (signals below).
+
+Randomized exams are ordered per attempt from ``exam_config['shuffle_seed']``
+(set in ``take_exam``): every question / option gets a rank derived from
+the seed and its id, so a student's order is stable across refreshes and
+a question added later doesn't reshuffle the rest.
+"""
+
+import random
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import MCQOption, MCQQuestion, QAQuestion
+
+CACHE_TIMEOUT = getattr(settings, "EXAM_PAPER_CACHE_TIMEOUT", 60 * 60)
+
+VERSION_KEY = "exams:paper:version:{exam_id}"
+PAPER_KEY = "exams:paper:{version}:{exam_id}"
+
+
+def _image_url(image):
+    return image.url if image else ''
+
+
+def build_paper(exam_id):
+    """Serialize the active questions of an exam (no caching)"""
+    mcq = []
+    questions = MCQQuestion.objects.filter(exam_id=exam_id, is_active=True).prefetch_related('options').order_by('order', 'id')
+    for question in questions:
+        mcq.append({
+            'id': question.id,
+            'order': question.order,
+            'question_text': question.question_text,
+            'question_image_url': _image_url(question.question_image),
+            'marks': question.marks,
+            'options': [
+                {
+                    'id': option.id,
+                    'option_text': option.option_text,
+                    'option_image_url': _image_url(option.option_image),
+                }
+                for option in sorted(question.options.all(), key=lambda o: (o.order, o.id))
+            ],
+        })
+
+    qa = [
+        {
+            'id': question.id,
+            'order': question.order,
+            'question_text': question.question_text,
+            'question_image_url': _image_url(question.question_image),
+            'marks': question.marks,
+            'keywords': question.keywords,
+            'has_hint': bool(question.model_answer),
+        }
+        for question in QAQuestion.objects.filter(exam_id=exam_id, is_active=True).order_by('order', 'id')
+    ]
+
+    return {'mcq': mcq, 'qa': qa}
+
+
+def _paper_key(exam_id):
+    version = cache.get(VERSION_KEY.format(exam_id=exam_id), 1)
+    return PAPER_KEY.format(version=version, exam_id=exam_id)
+
+
+def get_paper(exam_id):
+    key = _paper_key(exam_id)
+    paper = cache.get(key)
+    if paper is None:
+        paper = build_paper(exam_id)
+        cache.set(key, paper, CACHE_TIMEOUT)
+    return paper
+
+
+def invalidate_paper(exam_id):
+    key = VERSION_KEY.format(exam_id=exam_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 2, None)
+
+
+def new_shuffle_seed():
+    return random.SystemRandom().randrange(1, 2 ** 31)
+
+
+def _rank(seed, kind, item_id):
+    return random.Random(f"{seed}:{kind}:{item_id}").random()
+
+
+def attempt_questions(attempt, exam, kind):
+    """
+    Questions (``kind`` 'mcq' / 'qa') of the paper in this attempt's order,
+    numbered 1..n in ``order``. Returns new dicts - the cached paper is not touched.
+    """
+    seed = attempt.exam_config.get('shuffle_seed') or attempt.id
+    questions = get_paper(exam.id)[kind]
+
+    if exam.randomize_questions:
+        questions = sorted(questions, key=lambda q: _rank(seed, 'q', q['id']))
+
+    ordered = []
+    for position, question in enumerate(questions, start=1):
+        question = dict(question, order=position)
+        if 'options' in question and exam.randomize_options:
+            question['options'] = sorted(question['options'], key=lambda o: _rank(seed, 'o', o['id']))
+        ordered.append(question)
+    return ordered
+
+
+# ==================== CACHE INVALIDATION SIGNALS ====================
+
+@receiver(post_save, sender=MCQQuestion)
+@receiver(post_delete, sender=MCQQuestion)
+@receiver(post_save, sender=QAQuestion)
+@receiver(post_delete, sender=QAQuestion)
+def paper_question_changed(sender, instance, **kwargs):
+    invalidate_paper(instance.exam_id)
+
+
+@receiver(post_save, sender=MCQOption)
+@receiver(post_delete, sender=MCQOption)
+def paper_option_changed(sender, instance, **kwargs):
+    exam_id = MCQQuestion.objects.filter(pk=instance.question_id).values_list('exam_id', flat=True).first()
+    if exam_id:
+        invalidate_paper(exam_id)
@@ -47,7 +47,7 @@ urlpatterns = [
     # Reports and Export
     # path('attempt/<int:attempt_id>/report/', views.download_attempt_report, name='download_attempt_report'),
     # path('submissions/export/', views.export_submissions, name='export_submissions'),
-    # path('exam/<int:exam_id>/analytics/', views.exam_analytics, name='exam_analytics'),
+    path('exam/<int:exam_id>/analytics/', views.exam_analytics, name='exam_analytics'),
     
     # ==================== STUDENT EXAM URLs ====================
     
@@ -65,6 +65,7 @@ urlpatterns = [
     # ==================== AJAX/API URLs ====================
     
     # Question Management AJAX
+    path('ajax/autosave/<int:attempt_id>/', views.autosave_responses, name='autosave_responses'),
     path('ajax/save-mcq-response/<int:attempt_id>/', views.save_mcq_response, name='save_mcq_response'),
     path('ajax/save-qa-response/<int:attempt_id>/', views.save_qa_response, name='save_qa_response'),
  path('ajax/save-assignment/<int:attempt_id>/', views.save_assignment_submission, name='save_assignment_submission'),
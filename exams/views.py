@@ -28,6 +28,10 @@ from .forms import (
     MCQResponseForm, QAResponseForm, AssignmentSubmissionForm,
     QAGradingForm, AssignmentGradingForm
 )
+from .analytics import get_exam_analytics
+from .autosave import apply_autosave
+from .deadlines import close_if_expired, is_past_deadline, seconds_left
+from .paper import attempt_questions, new_shuffle_seed
 from courses.models import Course, Batch
 from userss.models import CustomUser
 
@@ -275,6 +279,13 @@ def save_assignment_submission(request, attempt_id):
                 'message': 'Cannot modify a submitted assignment.'
             }, status=400)
         
+        if is_past_deadline(attempt):
+            return JsonResponse({
+                'success': False,
+                'expired': True,
+                'message': 'Time is up - submission can no longer be changed.'
+            }, status=409)
+        
         # Get or create assignment submission
         submission, created = AssignmentSubmission.objects.get_or_create(
             attempt=attempt,
@@ -622,6 +633,21 @@ def admin_exam_detail(request, exam_id):
     return render(request, 'exam/admin_exam_detail.html', context)
 
 
+@login_required
+def exam_analytics(request, exam_id):
+    """JSON: score distribution + item statistics of an exam (exams/analytics.py)"""
+    exam = get_object_or_404(Exam, id=exam_id)
+    
+    if request.user.role == 'instructor':
+        has_access, _ = _instructor_exam_access(request.user, exam)
+    else:
+        has_access = request.user.role == 'superadmin'
+    if not has_access:
+        return JsonResponse({'success': False, 'message': 'Access denied'}, status=403)
+    
+    return JsonResponse({'success': True, 'analytics': get_exam_analytics(exam)})
+
+
 # Update your existing assign_exam view to handle the form properly
 # views.py - Fixed version
 
@@ -1315,12 +1341,14 @@ def take_exam(request, exam_id):
         student=request.user,
         attempt_number=attempt_number,
         status='started',
+        deadline_at=exam.get_attempt_deadline(timezone.now()),
         exam_config={
             'title': exam.title,
             'total_marks': exam.total_marks,
             'timing_type': exam.timing_type,
             'time_per_question_minutes': exam.time_per_question_minutes,
             'total_exam_time_minutes': exam.total_exam_time_minutes,
+            'shuffle_seed': new_shuffle_seed(),  # Question / option order of this attempt (exams/paper.py)
         }
     )
     
@@ -1334,7 +1362,7 @@ def exam_interface(request, attempt_id):
         messages.error(request, 'Access denied.')
         return redirect('user_login')
     
-    attempt = get_object_or_404(ExamAttempt, id=attempt_id, student=request.user)
+    attempt = get_object_or_404(ExamAttempt.objects.select_related('exam'), id=attempt_id, student=request.user)
     
     # Check if attempt is still active
     if attempt.status not in ['started', 'in_progress']:
@@ -1343,6 +1371,11 @@ def exam_interface(request, attempt_id):
     
     exam = attempt.exam
     
+    # Time up while away (browser closed) - submit server-side
+    if close_if_expired(attempt):
+        messages.warning(request, '⏰ Time is up! Your exam was submitted automatically.')
+        return redirect('student_exams')
+    
     # Update status to in_progress if just started
     if attempt.status == 'started':
         attempt.status = 'in_progress'
@@ -1351,39 +1384,15 @@ def exam_interface(request, attempt_id):
     context = {
         'attempt': attempt,
         'exam': exam,
+        'seconds_left': seconds_left(attempt),
     }
     
     if exam.exam_type == 'mcq':
-        # Get MCQ questions
-        if exam.randomize_questions:
-            # If randomization is enabled, use random ordering
-            questions = exam.mcq_questions.filter(is_active=True).prefetch_related('options').order_by('?')
-        else:
-            # Use original order
-            questions = exam.mcq_questions.filter(is_active=True).prefetch_related('options').order_by('order')
-        
-        # Convert to list for easier manipulation
-        questions_list = list(questions)
-        
-        # Randomize options if enabled
-        if exam.randomize_options:
-            import random
-            for question in questions_list:
-                # Get all options for this question
-                options = list(question.options.all())
-                # Shuffle the options
-                random.shuffle(options)
-                # Assign shuffled options back to question
-                question.shuffled_options = options
-        else:
-            # Keep original order
-            for question in questions_list:
-                question.shuffled_options = question.options.all().order_by('order')
+        # Cached paper, ordered by this attempt's seed (stable across refreshes)
+        questions_list = attempt_questions(attempt, exam, 'mcq')
         
         # Get existing responses
-        responses = {}
-        for response in attempt.mcq_responses.all():
-            responses[response.question.id] = response.selected_option.id if response.selected_option else None
+        responses = dict(attempt.mcq_responses.values_list('question_id', 'selected_option_id'))
         
         context.update({
             'questions': questions_list,
@@ -1394,19 +1403,10 @@ def exam_interface(request, attempt_id):
         return render(request, 'exam/mcq_interface.html', context)
     
     elif exam.exam_type == 'qa':
-        # Get Q&A questions
-        if exam.randomize_questions:
-            questions = exam.qa_questions.filter(is_active=True).order_by('?')
-        else:
-            questions = exam.qa_questions.filter(is_active=True).order_by('order')
-        
-        # Convert to list
-        questions_list = list(questions)
+        questions_list = attempt_questions(attempt, exam, 'qa')
         
         # Get existing responses
-        responses = {}
-        for response in attempt.qa_responses.all():
-            responses[response.question.id] = response.answer_text
+        responses = dict(attempt.qa_responses.values_list('question_id', 'answer_text'))
         
         context.update({
             'questions': questions_list,
@@ -1435,32 +1435,65 @@ def exam_interface(request, attempt_id):
 
 
 
-@login_required
-@require_http_methods(["POST"])
-def save_mcq_response(request, attempt_id):
-    """Save MCQ response via AJAX"""
+def _open_attempt_for_autosave(request, attempt_id):
+    """``(attempt, error_response)`` - attempt loaded with only the autosave columns"""
     if request.user.role != 'student':
-        return JsonResponse({'success': False, 'message': 'Access denied'})
+        return None, JsonResponse({'success': False, 'message': 'Access denied'})
     
-    attempt = get_object_or_404(ExamAttempt, id=attempt_id, student=request.user)
+    attempt = get_object_or_404(
+        ExamAttempt.objects.only('id', 'exam_id', 'student_id', 'status', 'deadline_at'),
+        id=attempt_id, student=request.user
+    )
     
     if attempt.status not in ['started', 'in_progress']:
-        return JsonResponse({'success': False, 'message': 'Exam attempt not active'})
+        return None, JsonResponse({'success': False, 'message': 'Exam attempt not active'})
+    
+    if is_past_deadline(attempt):
+        return None, JsonResponse({'success': False, 'expired': True, 'message': 'Time is up - response not saved'}, status=409)
+    
+    return attempt, None
+
+
+@login_required
+@require_http_methods(["POST"])
+def autosave_responses(request, attempt_id):
+    """
+    Batched autosave for MCQ and Q&A answers (see exams/autosave.py)
+    Body: {"seq": n, "responses": [{"question_id", "option_id" | "answer_text"}, ...]}
+    """
+    attempt, error = _open_attempt_for_autosave(request, attempt_id)
+    if error:
+        return error
     
     try:
         data = json.loads(request.body)
-        question_id = data.get('question_id')
-        option_id = data.get('option_id')
-        
-        question = get_object_or_404(MCQQuestion, id=question_id, exam=attempt.exam)
-        option = get_object_or_404(MCQOption, id=option_id, question=question) if option_id else None
-        
-        # Save or update response
-        response, created = MCQResponse.objects.update_or_create(
-            attempt=attempt,
-            question=question,
-            defaults={'selected_option': option}
-        )
+        deltas = data.get('responses') or []
+        seq = data.get('seq')
+        if not isinstance(deltas, list) or (seq is not None and not isinstance(seq, int)):
+            raise ValueError('responses must be a list and seq an integer')
+    except (ValueError, AttributeError) as e:
+        return JsonResponse({'success': False, 'message': f'Invalid payload: {e}'}, status=400)
+    
+    result = apply_autosave(attempt, deltas, seq)
+    return JsonResponse(result, status=200 if result['success'] else 400)
+
+
+@login_required
+@require_http_methods(["POST"])
+def save_mcq_response(request, attempt_id):
+    """Save one MCQ response via AJAX (single-delta autosave)"""
+    attempt, error = _open_attempt_for_autosave(request, attempt_id)
+    if error:
+        return error
+    
+    try:
+        data = json.loads(request.body)
+        result = apply_autosave(attempt, [{
+            'question_id': data.get('question_id'),
+            'option_id': data.get('option_id'),
+        }])
+        if result['rejected']:
+            return JsonResponse({'success': False, 'message': result['rejected'][0]['reason']})
         
         return JsonResponse({'success': True, 'message': 'Response saved'})
         
@@ -1471,28 +1504,19 @@ def save_mcq_response(request, attempt_id):
 @login_required
 @require_http_methods(["POST"])
 def save_qa_response(request, attempt_id):
-    """Save Q&A response via AJAX"""
-    if request.user.role != 'student':
-        return JsonResponse({'success': False, 'message': 'Access denied'})
-    
-    attempt = get_object_or_404(ExamAttempt, id=attempt_id, student=request.user)
-    
-    if attempt.status not in ['started', 'in_progress']:
-        return JsonResponse({'success': False, 'message': 'Exam attempt not active'})
+    """Save one Q&A response via AJAX (single-delta autosave)"""
+    attempt, error = _open_attempt_for_autosave(request, attempt_id)
+    if error:
+        return error
     
     try:
         data = json.loads(request.body)
-        question_id = data.get('question_id')
-        answer_text = data.get('answer_text', '')
-        
-        question = get_object_or_404(QAQuestion, id=question_id, exam=attempt.exam)
-        
-        # Save or update response
-        response, created = QAResponse.objects.update_or_create(
-            attempt=attempt,
-            question=question,
-            defaults={'answer_text': answer_text}
-        )
+        result = apply_autosave(attempt, [{
+            'question_id': data.get('question_id'),
+            'answer_text': data.get('answer_text', ''),
+        }])
+        if result['rejected']:
+            return JsonResponse({'success': False, 'message': result['rejected'][0]['reason']})
         
         return JsonResponse({'success': True, 'message': 'Response saved'})
         
@@ -1520,6 +1544,14 @@ def submit_exam(request, attempt_id):
     
     exam = attempt.exam
     
+    # Submit after the deadline (+ grace) counts as the automatic submission
+    if close_if_expired(attempt):
+        if exam.exam_type == 'mcq' and exam.show_results_immediately:
+            messages.warning(request, '⏰ Time is up! Your exam was submitted automatically.')
+            return redirect('exam_result', attempt_id=attempt.id)
+        messages.warning(request, '⏰ Time is up! Your exam was submitted automatically. Results will be published soon.')
+        return redirect('student_exams')
+    
     if request.method == 'POST':
         # Assignment specific validation
         if exam.exam_type == 'assignment':
@@ -2842,21 +2874,10 @@ def get_instructor_students(instructor):
 
 
 # Add this view to your instructor_views.py
-# Add this view to your instructor_views.py
-
-@login_required
-def instructor_exam_detail(request, exam_id):
-    """View detailed exam information for instructor"""
-    if request.user.role != 'instructor':
-        messages.error(request, 'Access denied.')
-        return redirect('user_login')
-    
-    # Get exam - either created by instructor or assigned to instructor's students/batches/courses
-    exam = get_object_or_404(Exam, id=exam_id)
-    
-    # Check if instructor has access to this exam
+def _instructor_exam_access(user, exam):
+    """``(has_access, assignment_info)`` - instructor created the exam or it is assigned to their batches / courses / students"""
     has_access = False
-    is_creator = exam.created_by == request.user
+    is_creator = exam.created_by == user
     assignment_info = None
     
     if is_creator:
@@ -2865,7 +2886,7 @@ def instructor_exam_detail(request, exam_id):
         # Check if exam is assigned to instructor's students/batches/courses
         if Batch and Course and BatchEnrollment and Enrollment:
             # Check batch assignments
-            instructor_batches = Batch.objects.filter(instructor=request.user)
+            instructor_batches = Batch.objects.filter(instructor=user)
             batch_assignments = ExamAssignment.objects.filter(
                 exam=exam,
                 assignment_type='batch',
@@ -2879,7 +2900,7 @@ def instructor_exam_detail(request, exam_id):
             
             # Check course assignments
             if not has_access:
-                instructor_courses = Course.objects.filter(instructor=request.user)
+                instructor_courses = Course.objects.filter(instructor=user)
                 course_assignments = ExamAssignment.objects.filter(
                     exam=exam,
                     assignment_type='course',
@@ -2893,7 +2914,7 @@ def instructor_exam_detail(request, exam_id):
             
             # Check individual student assignments
             if not has_access:
-                instructor_students = get_instructor_students(request.user)
+                instructor_students = get_instructor_students(user)
                 individual_assignments = ExamAssignment.objects.filter(
                     exam=exam,
                     assignment_type='individual',
@@ -2905,6 +2926,25 @@ def instructor_exam_detail(request, exam_id):
                     has_access = True
                     assignment_info = f"Assigned to your student: {individual_assignments.student.get_full_name() or individual_assignments.student.username}"
     
+    return has_access, assignment_info
+
+
+# Add this view to your instructor_views.py
+
+@login_required
+def instructor_exam_detail(request, exam_id):
+    """View detailed exam information for instructor"""
+    if request.user.role != 'instructor':
+        messages.error(request, 'Access denied.')
+        return redirect('user_login')
+    
+    # Get exam - either created by instructor or assigned to instructor's students/batches/courses
+    exam = get_object_or_404(Exam, id=exam_id)
+    
+    # Check if instructor has access to this exam
+    is_creator = exam.created_by == request.user
+    has_access, assignment_info = _instructor_exam_access(request.user, exam)
+    
     if not has_access:
         messages.error(request, 'You do not have access to this exam.')
         return redirect('instructor_my_exams')
@@ -3,7 +3,11 @@ from django.contrib import admin
 # Register your models here.
 # fees/admin.py
 
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.contrib.admin import helpers
+from django.template.response import TemplateResponse
+from .assignments import assign_fee_to_group
+from .forms import BulkFeeAssignmentForm
 from .models import (
     FeeStructure, StudentFeeAssignment, PaymentRecord, 
     EMISchedule, BatchAccessControl, FeeDiscount,
@@ -39,6 +43,43 @@ class FeeStructureAdmin(admin.ModelAdmin):
             'classes': ('collapse',)
         })
     )
+    actions = ['assign_to_course_or_batch']
+    
+    @admin.action(description="Assign to every student of a course / batch")
+    def assign_to_course_or_batch(self, request, queryset):
+        if queryset.count() != 1:
+            self.message_user(request, "Select exactly one fee structure", level=messages.WARNING)
+            return None
+        fee_structure = queryset.get()
+        
+        form = BulkFeeAssignmentForm(
+            request.POST if 'apply' in request.POST else None,
+            fee_structure=fee_structure,
+        )
+        if form.is_valid():
+            result = assign_fee_to_group(
+                fee_structure,
+                course=form.cleaned_data['course'],
+                batch=form.cleaned_data['batch'],
+                assigned_by=request.user,
+                payment_start_date=form.cleaned_data['payment_start_date'],
+                total_amount=form.cleaned_data['total_amount'],
+            )
+            self.message_user(
+                request,
+                f"{fee_structure.name}: assigned to {result['created']} students, "
+                f"{result['skipped']} already had an assignment ({result['emi_rows']} EMI rows)",
+                level=messages.SUCCESS,
+            )
+            return None
+        
+        return TemplateResponse(request, 'admin/fees/bulk_assign_fee.html', {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'form': form,
+            'fee_structure': fee_structure,
+            'action_checkbox_name': helpers.ACTION_CHECKBOX_NAME,
+        })
 
 @admin.register(StudentFeeAssignment)
 class StudentFeeAssignmentAdmin(admin.ModelAdmin):
@@ -6,4 +6,7 @@ from django.apps import AppConfig
 class FeesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'fees'
-    verbose_name = 'Fees Management'
\ No newline at end of file
+    verbose_name = 'Fees Management'
+
+    def ready(self):
+        import fees.rollups  # Collection rollup maintenance on payment delete
@@ -0,0 +1,97 @@
+# fees/assignments.py - Bulk fee assignment
+"""
+Assign one ``FeeStructure`` to every student of a course or batch.
+
+All assignments and their EMI rows are written with ``bulk_create`` in one
+transaction (a handful of statements whatever the batch size) instead of
+``StudentFeeAssignment.save()`` + one ``EMISchedule.save()`` per installment.
+Students who already have an assignment for the course are skipped.
+"""
+
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.db import transaction
+
+from courses.models import BatchEnrollment, Enrollment
+
+from .models import EMISchedule, StudentFeeAssignment
+
+BATCH_SIZE = 500
+
+
+def target_student_ids(course=None, batch=None):
+    """Active students of ``batch`` (if given) or else of ``course``"""
+    if batch is not None:
+        return list(BatchEnrollment.objects.filter(
+            batch=batch, is_active=True
+        ).values_list('student_id', flat=True).distinct())
+    return list(Enrollment.objects.filter(
+        course=course, is_active=True
+    ).values_list('student_id', flat=True).distinct())
+
+
+def bulk_assign_fee(fee_structure, course, student_ids, assigned_by=None,
+                    payment_start_date=None, total_amount=None, today=None):
+    """
+    Create ``StudentFeeAssignment`` (+ EMI schedule) rows for ``student_ids``.
+
+    Returns ``{'created', 'skipped', 'emi_rows', 'assignment_ids'}``.
+    """
+    today = today or date.today()
+    payment_start_date = payment_start_date or today
+    total_amount = Decimal(str(total_amount if total_amount is not None else fee_structure.total_amount))
+
+    payment_end_date = None
+    if fee_structure.payment_type == 'emi':
+        # Same default as StudentFeeAssignment.save()
+        months = fee_structure.emi_duration_months or 12
+        payment_end_date = payment_start_date + timedelta(days=months * 30)
+
+    student_ids = list(dict.fromkeys(student_ids))
+
+    with transaction.atomic():
+        existing = set(StudentFeeAssignment.objects.filter(
+            course=course, student_id__in=student_ids
+        ).values_list('student_id', flat=True))
+        new_ids = [student_id for student_id in student_ids if student_id not in existing]
+
+        assignments = StudentFeeAssignment.objects.bulk_create([
+            StudentFeeAssignment(
+                student_id=student_id,
+                course=course,
+                fee_structure=fee_structure,
+                total_amount=total_amount,
+                amount_paid=Decimal('0.00'),
+                amount_pending=total_amount,
+                payment_start_date=payment_start_date,
+                payment_end_date=payment_end_date,
+                assigned_by=assigned_by,
+            )
+            for student_id in new_ids
+        ], batch_size=BATCH_SIZE)
+
+        emi_rows = []
+        for assignment in assignments:
+            emi_rows.extend(assignment.build_emi_schedule(today))
+        EMISchedule.objects.bulk_create(emi_rows, batch_size=BATCH_SIZE)
+
+        # bulk_create sends no post_save - refresh batch locks once, after commit
+        from courses.batch_locks import recompute_student_batch_locks
+        transaction.on_commit(lambda: recompute_student_batch_locks(new_ids))
+
+    return {
+        'created': len(assignments),
+        'skipped': len(existing),
+        'emi_rows': len(emi_rows),
+        'assignment_ids': [assignment.pk for assignment in assignments],
+    }
+
+
+def assign_fee_to_group(fee_structure, course=None, batch=None, **kwargs):
+    """``bulk_assign_fee`` for every active student of a course or batch"""
+    if batch is not None:
+        course = batch.course
+    return bulk_assign_fee(
+        fee_structure, course, target_student_ids(course, batch), **kwargs
+    )
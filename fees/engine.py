@@ -0,0 +1,260 @@
+# fees/engine.py - Set-based daily fee engine
+"""
+Daily fee tasks computed with a handful of aggregate queries and bulk
+``update()`` calls instead of per-assignment / per-EMI loops.
+
+Each phase selects the affected ids with one query (``Exists`` over
+``EMISchedule``) and writes them back in chunks, one short transaction per
+chunk. ``run_daily_tasks()`` drives all phases and records counts and per-phase
+timings in ``DailyTaskLog``.
+"""
+
+import logging
+import time
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, F, OuterRef, Q, Sum
+from django.utils import timezone
+
+from .models import DailyTaskLog, EMISchedule, FeeStructure, StudentFeeAssignment
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = getattr(settings, "FEE_ENGINE_CHUNK_SIZE", 1000)
+
+OPEN_EMI_STATUSES = ['pending', 'overdue']
+
+
+def _chunked_update(model, ids, guard=None, **updates):
+    """Apply ``update(**updates)`` to ``ids`` in chunks, one transaction each"""
+    updated = 0
+    for start in range(0, len(ids), CHUNK_SIZE):
+        chunk = ids[start:start + CHUNK_SIZE]
+        queryset = model.objects.filter(id__in=chunk)
+        if guard is not None:
+            # Re-check the selection condition - rows may have changed since
+            queryset = queryset.filter(guard)
+        with transaction.atomic():
+            updated += queryset.update(**updates)
+    return updated
+
+
+def overdue_emis_exist(cutoff):
+    """``Exists`` subquery: assignment has an unpaid EMI due before ``cutoff``"""
+    return Exists(
+        EMISchedule.objects.filter(
+            fee_assignment=OuterRef('pk'),
+            status__in=OPEN_EMI_STATUSES,
+            due_date__lt=cutoff,
+        )
+    )
+
+
+# ==================== PHASES ====================
+
+def mark_overdue_emis(today=None):
+    """Flip past-due pending EMIs to 'overdue' and refresh ``days_overdue``"""
+    today = today or date.today()
+
+    ids = list(
+        EMISchedule.objects.filter(status='pending', due_date__lt=today)
+        .values_list('id', flat=True)
+    )
+    flipped = _chunked_update(
+        EMISchedule, ids, guard=Q(status='pending'),
+        status='overdue', updated_at=timezone.now(),
+    )
+
+    # days_overdue only depends on due_date -> one UPDATE per distinct due date
+    due_dates = (
+        EMISchedule.objects.filter(status='overdue', due_date__lt=today)
+        .values_list('due_date', flat=True).distinct()
+    )
+    with transaction.atomic():
+        for due_date in due_dates:
+            EMISchedule.objects.filter(
+                status='overdue', due_date=due_date
+            ).exclude(
+                days_overdue=(today - due_date).days
+            ).update(days_overdue=(today - due_date).days)
+
+    return flipped
+
+
+def lock_overdue_assignments(today=None):
+    """
+    Lock active assignments with an unpaid EMI older than their grace period.
+
+    Same rule as ``StudentFeeAssignment.should_lock_course()``: an admin
+    unlock date that has not passed yet keeps the course open.
+    """
+    today = today or date.today()
+    now = timezone.now()
+    locked = 0
+
+    candidates = StudentFeeAssignment.objects.filter(
+        status='active',
+        is_course_locked=False,
+    ).exclude(unlock_date__gte=today)
+
+    # Grace period differs per fee structure - one query per distinct value
+    grace_values = (
+        FeeStructure.objects.filter(studentfeeassignment__in=candidates)
+        .values_list('grace_period_days', flat=True).distinct()
+    )
+    for grace_days in grace_values:
+        cutoff = today - timedelta(days=grace_days or 0)
+        ids = list(
+            candidates.filter(fee_structure__grace_period_days=grace_days)
+            .filter(overdue_emis_exist(cutoff))
+            .values_list('id', flat=True)
+        )
+        locked += _chunked_update(
+            StudentFeeAssignment, ids, guard=Q(is_course_locked=False),
+            is_course_locked=True, locked_at=now, updated_at=now,
+        )
+
+    logger.info(f"Fee engine: locked {locked} courses")
+    return locked
+
+
+def unlock_scheduled_assignments(today=None):
+    """Unlock locked assignments whose admin unlock date is today"""
+    today = today or date.today()
+    ids = list(
+        StudentFeeAssignment.objects.filter(is_course_locked=True, unlock_date=today)
+        .values_list('id', flat=True)
+    )
+    unlocked = _chunked_update(
+        StudentFeeAssignment, ids, guard=Q(is_course_locked=True),
+        is_course_locked=False, locked_at=None, updated_at=timezone.now(),
+    )
+    logger.info(f"Fee engine: unlocked {unlocked} courses")
+    return unlocked
+
+
+def apply_late_fees(today=None):
+    """
+    Add the fee structure's fixed ``late_fee_amount`` once to every overdue
+    EMI past its grace period (structures with no fixed late fee are skipped).
+    """
+    today = today or date.today()
+    now = timezone.now()
+    processed = 0
+    total_late_fee = 0
+
+    structures = FeeStructure.objects.filter(
+        late_fee_amount__gt=0
+    ).values_list('id', 'grace_period_days', 'late_fee_amount')
+
+    for structure_id, grace_days, late_fee_amount in structures:
+        cutoff = today - timedelta(days=grace_days or 0)
+        ids = list(EMISchedule.objects.filter(
+            fee_assignment__fee_structure_id=structure_id,
+            status='overdue',
+            due_date__lt=cutoff,
+            late_fee_applied=False,
+        ).values_list('id', flat=True))
+        if not ids:
+            continue
+
+        count = _chunked_update(
+            EMISchedule, ids, guard=Q(late_fee_applied=False),
+            amount=F('amount') + late_fee_amount, late_fee_applied=True, updated_at=now,
+        )
+        processed += count
+        total_late_fee += late_fee_amount * count
+
+    logger.info(f"Fee engine: applied late fees to {processed} EMIs")
+    return {'processed_count': processed, 'total_late_fee': total_late_fee}
+
+
+def total_overdue_amount(today=None):
+    today = today or date.today()
+    return EMISchedule.objects.filter(
+        status='overdue',
+        due_date__lt=today,
+    ).aggregate(total=Sum('amount'))['total'] or 0
+
+
+# ==================== DRIVER ====================
+
+def run_daily_tasks(run_date=None, force=False, log=None):
+    """
+    Run every daily fee phase and record results in ``DailyTaskLog``.
+
+    Returns ``(task_log, ran)`` - ``ran`` is False when today's run already
+    completed and ``force`` is not set. ``log`` is an optional callable for
+    progress lines (the management command passes ``self.stdout.write``).
+    """
+    from courses.batch_locks import recompute_batch_locks
+    from .utils import send_payment_reminders
+
+    run_date = run_date or date.today()
+    log = log or (lambda message: None)
+
+    task_log, created = DailyTaskLog.objects.get_or_create(
+        run_date=run_date,
+        defaults={'status': 'pending'}
+    )
+    if task_log.status == 'completed' and not force:
+        return task_log, False
+
+    task_log.status = 'running'
+    task_log.error_message = None
+    task_log.phase_timings = {}
+    task_log.save()
+
+    def timed(phase, func):
+        started = time.monotonic()
+        result = func()
+        task_log.phase_timings[phase] = round(time.monotonic() - started, 3)
+        return result
+
+    try:
+        log('Marking past-due EMIs as overdue...')
+        timed('mark_overdue', lambda: mark_overdue_emis(run_date))
+
+        log('Checking and locking courses for overdue payments...')
+        task_log.courses_locked = timed('lock', lambda: lock_overdue_assignments(run_date))
+
+        log('Checking and unlocking courses...')
+        task_log.courses_unlocked = timed('unlock', lambda: unlock_scheduled_assignments(run_date))
+
+        log('Processing late fees for overdue payments...')
+        late_fee_result = timed('late_fees', lambda: apply_late_fees(run_date))
+        task_log.late_fees_applied = late_fee_result['processed_count']
+
+        if run_date < date.today():
+            # Backdated (catch-up) run - reminders are about today's state and were
+            # queued by today's run, replaying them would send duplicates
+            log('Skipping payment reminders for a backdated run')
+            task_log.reminders_sent = 0
+        else:
+            log('Queueing payment reminders...')
+            task_log.reminders_sent = timed('reminders', send_payment_reminders)
+
+        task_log.total_overdue_amount = timed('overdue_total', lambda: total_overdue_amount(run_date))
+
+        log('Refreshing batch lock state...')
+        timed('batch_locks', lambda: recompute_batch_locks(today=run_date))
+
+        task_log.status = 'completed'
+        task_log.save()
+
+        logger.info(
+            f"Daily fee tasks completed for {run_date}: {task_log.courses_locked} locked, "
+            f"{task_log.courses_unlocked} unlocked, {task_log.late_fees_applied} late fees, "
+            f"{task_log.reminders_sent} reminders - timings {task_log.phase_timings}"
+        )
+
+    except Exception as e:
+        task_log.status = 'failed'
+        task_log.error_message = str(e)
+        task_log.save()
+        logger.error(f"Daily fee tasks failed: {str(e)}")
+        raise
+
+    return task_log, True
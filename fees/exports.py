@@ -0,0 +1,71 @@
+# fees/exports.py - Payment / overdue reports (see userss/export_engine.py)
+
+from datetime import date
+
+from userss.export_engine import CHUNK_SIZE, Export
+
+from .models import EMISchedule, PaymentRecord
+
+
+def payment_report(params):
+    payments = PaymentRecord.objects.filter(status='completed').select_related(
+        'fee_assignment__student',
+        'fee_assignment__course'
+    )
+    if params.get('date_from'):
+        payments = payments.filter(payment_date__gte=params['date_from'])
+    if params.get('date_to'):
+        payments = payments.filter(payment_date__lte=params['date_to'])
+    if params.get('course'):
+        payments = payments.filter(fee_assignment__course_id=params['course'])
+
+    header = [
+        'Date', 'Student Name', 'Student Email', 'Course',
+        'Amount', 'Payment Method', 'Transaction ID', 'Status'
+    ]
+
+    def rows():
+        for payment in payments.iterator(chunk_size=CHUNK_SIZE):
+            yield [
+                payment.payment_date,
+                payment.fee_assignment.student.get_full_name(),
+                payment.fee_assignment.student.email,
+                payment.fee_assignment.course.title,
+                payment.amount,
+                payment.get_payment_method_display(),
+                payment.transaction_id,
+                payment.get_status_display()
+            ]
+
+    return Export(f'payment_report_{date.today()}', header, rows(), queryset=payments, title='Payments')
+
+
+def overdue_report(params):
+    today = date.today()
+    overdue_emis = EMISchedule.objects.filter(
+        status='overdue',
+        due_date__lt=today
+    ).select_related(
+        'fee_assignment__student',
+        'fee_assignment__course'
+    ).order_by('due_date')
+
+    header = [
+        'Student Name', 'Student Email', 'Course', 'EMI Number',
+        'Amount', 'Due Date', 'Days Overdue', 'Late Fee Applied'
+    ]
+
+    def rows():
+        for emi in overdue_emis.iterator(chunk_size=CHUNK_SIZE):
+            yield [
+                emi.fee_assignment.student.get_full_name(),
+                emi.fee_assignment.student.email,
+                emi.fee_assignment.course.title,
+                emi.installment_number,
+                emi.amount,
+                emi.due_date,
+                (today - emi.due_date).days,
+                emi.late_fee_applied
+            ]
+
+    return Export(f'overdue_report_{today}', header, rows(), queryset=overdue_emis, title='Overdue EMIs')
@@ -208,6 +208,61 @@ class StudentFeeAssignmentForm(forms.ModelForm):
         
         return cleaned_data
 
+class BulkFeeAssignmentForm(forms.Form):
+    """Assign one fee structure to every student of a course or batch"""
+    
+    fee_structure = forms.ModelChoiceField(
+        queryset=FeeStructure.objects.filter(is_active=True).order_by('name'),
+        widget=forms.Select(attrs={'class': 'form-select'})
+    )
+    course = forms.ModelChoiceField(
+        queryset=Course.objects.all().order_by('title'),
+        required=False,
+        widget=forms.Select(attrs={'class': 'form-select'})
+    )
+    batch = forms.ModelChoiceField(
+        queryset=Batch.objects.select_related('course').order_by('name'),
+        required=False,
+        widget=forms.Select(attrs={'class': 'form-select'}),
+        help_text="Only this batch's active students (overrides course)"
+    )
+    payment_start_date = forms.DateField(
+        initial=date.today,
+        widget=forms.DateInput(attrs={'class': 'form-control', 'type': 'date'})
+    )
+    total_amount = forms.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        required=False,
+        min_value=0,
+        widget=forms.NumberInput(attrs={'class': 'form-control', 'step': '0.01'}),
+        help_text="Leave empty to use the fee structure total"
+    )
+    
+    def __init__(self, *args, fee_structure=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fee_structure is not None:
+            # Admin action: structure already picked on the changelist
+            self.fields['fee_structure'].required = False
+            self.fields['fee_structure'].widget = forms.HiddenInput()
+            self.fixed_fee_structure = fee_structure
+        else:
+            self.fixed_fee_structure = None
+    
+    def clean(self):
+        cleaned_data = super().clean()
+        if self.fixed_fee_structure is not None:
+            cleaned_data['fee_structure'] = self.fixed_fee_structure
+        
+        if not cleaned_data.get('course') and not cleaned_data.get('batch'):
+            raise ValidationError("Select a course or a batch")
+        
+        fee_structure = cleaned_data.get('fee_structure')
+        if fee_structure and fee_structure.payment_type == 'emi' and not fee_structure.emi_duration_months:
+            raise ValidationError(f"{fee_structure.name} is an EMI plan without a duration")
+        
+        return cleaned_data
+
 class PaymentRecordForm(forms.ModelForm):
     """Form for recording payments"""
     
@@ -0,0 +1,39 @@
+# fees/management/commands/rebuild_fee_rollups.py
+
+from datetime import datetime
+
+from django.core.management.base import BaseCommand
+
+from fees.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = 'Recompute the fee collection rollups (FeeCollectionRollup) from PaymentRecord'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--from',
+            dest='date_from',
+            help='First date (YYYY-MM-DD) to rebuild - rounded down to the 1st of its month',
+        )
+        parser.add_argument(
+            '--to',
+            dest='date_to',
+            help='Last date (YYYY-MM-DD) to rebuild - rounded up to the end of its month',
+        )
+
+    def handle(self, *args, **options):
+        date_from = date_to = None
+        if options['date_from']:
+            date_from = datetime.strptime(options['date_from'], '%Y-%m-%d').date()
+        if options['date_to']:
+            date_to = datetime.strptime(options['date_to'], '%Y-%m-%d').date()
+
+        scope = f"{date_from or 'beginning'} to {date_to or 'today'}"
+        self.stdout.write(f'Rebuilding fee collection rollups ({scope})...')
+
+        day_rows, month_rows = rebuild_rollups(date_from, date_to)
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Rollups rebuilt: {day_rows} daily rows, {month_rows} monthly rows')
+        )
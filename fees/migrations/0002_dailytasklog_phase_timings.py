@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 07:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fees', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dailytasklog',
+            name='phase_timings',
+            field=models.JSONField(blank=True, default=dict, help_text='Seconds spent per task phase'),
+        ),
+    ]
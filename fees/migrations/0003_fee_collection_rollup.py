@@ -0,0 +1,67 @@
+# Generated by Django 5.2.18 on 2026-10-17 07:50
+
+import django.db.models.deletion
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def backfill_rollups(apps, schema_editor):
+    """Build the rollups for all existing completed payments"""
+    PaymentRecord = apps.get_model('fees', 'PaymentRecord')
+    FeeCollectionRollup = apps.get_model('fees', 'FeeCollectionRollup')
+
+    days = PaymentRecord.objects.filter(status='completed').values(
+        'payment_date', 'fee_assignment__course_id', 'payment_method'
+    ).annotate(count=Count('id'), total=Sum('amount')).order_by()
+
+    rows = []
+    months = defaultdict(lambda: [0, Decimal('0.00')])
+    for row in days:
+        key = (row['fee_assignment__course_id'], row['payment_method'])
+        rows.append(FeeCollectionRollup(
+            period='day', period_start=row['payment_date'], course_id=key[0], payment_method=key[1],
+            payment_count=row['count'], total_amount=row['total'],
+        ))
+        bucket = months[(row['payment_date'].replace(day=1),) + key]
+        bucket[0] += row['count']
+        bucket[1] += row['total']
+
+    for (period_start, course_id, payment_method), (count, total) in months.items():
+        rows.append(FeeCollectionRollup(
+            period='month', period_start=period_start, course_id=course_id, payment_method=payment_method,
+            payment_count=count, total_amount=total,
+        ))
+    FeeCollectionRollup.objects.bulk_create(rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0004_batchenrollment_lock_state'),
+        ('fees', '0002_dailytasklog_phase_timings'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeeCollectionRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('day', 'Day'), ('month', 'Month')], max_length=5)),
+                ('period_start', models.DateField(help_text='The day, or the 1st of the month')),
+                ('payment_method', models.CharField(choices=[('online', 'Online Payment'), ('cash', 'Cash'), ('cheque', 'Cheque'), ('bank_transfer', 'Bank Transfer'), ('upi', 'UPI'), ('card', 'Credit/Debit Card'), ('other', 'Other')], max_length=20)),
+                ('payment_count', models.IntegerField(default=0)),
+                ('total_amount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='fee_collection_rollups', to='courses.course')),
+            ],
+            options={
+                'ordering': ['-period_start'],
+                'indexes': [models.Index(fields=['period', 'period_start'], name='fee_rollup_period_idx')],
+                'constraints': [models.UniqueConstraint(fields=('period', 'period_start', 'course', 'payment_method'), name='fee_rollup_unique_bucket')],
+            },
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-17 07:57
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def mark_completed_allocated(apps, schema_editor):
+    # Completed payments were already added to their assignments by the old save()
+    PaymentRecord = apps.get_model('fees', 'PaymentRecord')
+    PaymentRecord.objects.filter(status='completed').update(allocated_at=F('updated_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fees', '0003_fee_collection_rollup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='paymentrecord',
+            name='allocated_at',
+            field=models.DateTimeField(blank=True, editable=False, help_text='When the amount was applied to the assignment / EMIs (once)', null=True),
+        ),
+        migrations.AddField(
+            model_name='paymentrecord',
+            name='idempotency_key',
+            field=models.CharField(blank=True, help_text='Form token / gateway event id - a retry with the same key is ignored', max_length=100, null=True, unique=True),
+        ),
+        migrations.RunPython(mark_completed_allocated, migrations.RunPython.noop),
+    ]
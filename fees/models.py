@@ -3,7 +3,7 @@ from django.db import models
 # Create your models here.
 # fees/models.py - Complete Fees Management System
 
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth import get_user_model
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.utils import timezone
@@ -161,35 +161,51 @@ class StudentFeeAssignment(models.Model):
         if is_new and self.fee_structure.payment_type == 'emi':
             self.create_emi_schedule()
     
-    def create_emi_schedule(self):
-        """Create EMI schedule for this assignment"""
+    def build_emi_schedule(self, today=None):
+        """Unsaved EMISchedule rows for this assignment (down payment + EMIs)"""
         if self.fee_structure.payment_type != 'emi':
-            return
-        
-        self.emi_schedules.all().delete()
+            return []
         
+        today = today or date.today()
         duration = self.fee_structure.emi_duration_months
         emi_amount = self.fee_structure.emi_amount
         start_date = self.payment_start_date
         
+        rows = []
         if self.fee_structure.down_payment > 0:
-            EMISchedule.objects.create(
+            rows.append(EMISchedule(
                 fee_assignment=self,
                 installment_number=0,
                 due_date=start_date,
                 amount=self.fee_structure.down_payment,
                 installment_type='down_payment'
-            )
+            ))
         
         for i in range(1, duration + 1):
-            due_date = start_date + timedelta(days=i * 30)
-            EMISchedule.objects.create(
+            rows.append(EMISchedule(
                 fee_assignment=self,
                 installment_number=i,
-                due_date=due_date,
+                due_date=start_date + timedelta(days=i * 30),
                 amount=emi_amount,
                 installment_type='emi'
-            )
+            ))
+        
+        # bulk_create skips save() - apply its overdue check here
+        for row in rows:
+            row.refresh_overdue(today)
+        return rows
+    
+    def create_emi_schedule(self):
+        """Create EMI schedule for this assignment"""
+        if self.fee_structure.payment_type != 'emi':
+            return
+        
+        self.emi_schedules.all().delete()
+        EMISchedule.objects.bulk_create(self.build_emi_schedule())
+        
+        # No post_save per row any more - refresh batch locks once
+        from courses.batch_locks import schedule_student_recompute
+        schedule_student_recompute(self.student_id)
     
     def get_completion_percentage(self):
         """Calculate payment completion percentage"""
@@ -303,11 +319,16 @@ class EMISchedule(models.Model):
     def __str__(self):
         return f"{self.fee_assignment.student.get_full_name()} - EMI {self.installment_number}"
     
+    def refresh_overdue(self, today=None):
+        """Pending EMI past its due date -> overdue (with days_overdue)"""
+        today = today or date.today()
+        if self.status == 'pending' and self.due_date < today:
+            self.days_overdue = (today - self.due_date).days
+            self.status = 'overdue'
+    
     def save(self, *args, **kwargs):
         # Calculate days overdue
-        if self.status == 'pending' and self.due_date < date.today():
-            self.days_overdue = (date.today() - self.due_date).days
-            self.status = 'overdue'
+        self.refresh_overdue()
         
         super().save(*args, **kwargs)
     
@@ -317,10 +338,12 @@ class EMISchedule(models.Model):
         self.paid_date = payment_date or date.today()
         self.save()
         
-        # Update fee assignment amount paid
-        assignment = self.fee_assignment
-        assignment.amount_paid += self.amount
-        assignment.save()
+        # Update fee assignment amount paid (F() - no lost update under concurrency)
+        StudentFeeAssignment.objects.filter(pk=self.fee_assignment_id).update(
+            amount_paid=models.F('amount_paid') + self.amount,
+            amount_pending=models.F('amount_pending') - self.amount,
+            updated_at=timezone.now(),
+        )
     
     def calculate_late_fee(self):
         """Calculate late fee if overdue"""
@@ -367,6 +390,7 @@ class DailyTaskLog(models.Model):
     # Additional info
     total_overdue_amount = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     error_message = models.TextField(blank=True, null=True)
+    phase_timings = models.JSONField(default=dict, blank=True, help_text="Seconds spent per task phase")
     
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -423,6 +447,14 @@ class PaymentRecord(models.Model):
     
     # Status
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    allocated_at = models.DateTimeField(
+        null=True, blank=True, editable=False,
+        help_text="When the amount was applied to the assignment / EMIs (once)"
+    )
+    idempotency_key = models.CharField(
+        max_length=100, unique=True, null=True, blank=True,
+        help_text="Form token / gateway event id - a retry with the same key is ignored"
+    )
     
     # Admin Notes
     notes = models.TextField(blank=True, help_text="Admin notes about this payment")
@@ -445,62 +477,70 @@ class PaymentRecord(models.Model):
         return f"{self.fee_assignment.student.get_full_name()} - ${self.amount} ({self.payment_date})"
     
     def save(self, *args, **kwargs):
+        from .rollups import get_rollup_state, record_payment_change
+        
         # Generate receipt number if not provided
         if not self.receipt_number and self.status == 'completed':
             self.receipt_number = f"RCP{self.payment_date.strftime('%Y%m%d')}{self.id or '001'}"
         
-        super().save(*args, **kwargs)
+        # Row save + rollup delta commit together; the locked read makes a
+        # concurrent edit of the same payment wait instead of applying the same delta
+        with transaction.atomic():
+            # What this payment contributed to the collection rollups before the save
+            previous = get_rollup_state(self.pk, lock=True) if self.pk else None
+            
+            super().save(*args, **kwargs)
+            
+            record_payment_change(previous, self)
         
-        # Update fee assignment if payment is completed
-        if self.status == 'completed':
+        # Apply to the fee assignment once, when the payment is completed
+        if self.status == 'completed' and self.allocated_at is None:
             self.update_fee_assignment()
     
     def update_fee_assignment(self):
-        """Update fee assignment with this payment"""
-        from decimal import Decimal
+        """Allocate this payment to its assignment / EMIs (see fees/payments.py)"""
+        from .payments import allocate_payment
         
-        assignment = self.fee_assignment
-        
-        # Update assignment's amount_paid
-        assignment.amount_paid = Decimal(str(assignment.amount_paid or 0)) + self.amount
-        assignment.save()
-        
-        # Mark corresponding EMI as paid if linked
-        if self.emi_schedule:
-            emi = self.emi_schedule
-            # Update EMI's amount_paid
-            emi.amount_paid = Decimal(str(emi.amount_paid or 0)) + self.amount
-            
-            # If fully paid, mark as paid
-            if emi.amount_paid >= emi.amount:
-                emi.status = 'paid'
-                emi.paid_date = self.payment_date
-            
-            emi.save()
-        else:
-            # If no specific EMI linked, try to auto-assign to pending EMIs
-            pending_emis = assignment.emi_schedules.filter(
-                status__in=['pending', 'overdue']
-            ).order_by('installment_number')
-            
-            remaining_amount = self.amount
-            for emi in pending_emis:
-                if remaining_amount <= 0:
-                    break
-                
-                emi_remaining = emi.amount - (emi.amount_paid or Decimal('0.00'))
-                if emi_remaining <= 0:
-                    continue
-                
-                payment_for_emi = min(remaining_amount, emi_remaining)
-                emi.amount_paid = (emi.amount_paid or Decimal('0.00')) + payment_for_emi
-                
-                if emi.amount_paid >= emi.amount:
-                    emi.status = 'paid'
-                    emi.paid_date = self.payment_date
-                
-                emi.save()
-                remaining_amount -= payment_for_emi
+        return allocate_payment(self)
+
+
+class FeeCollectionRollup(models.Model):
+    """
+    Completed payments pre-aggregated per day / month, course and payment
+    method. Maintained incrementally by ``PaymentRecord.save()`` (see
+    fees/rollups.py), rebuilt with ``manage.py rebuild_fee_rollups``.
+    """
+    
+    PERIOD_CHOICES = [
+        ('day', 'Day'),
+        ('month', 'Month'),
+    ]
+    
+    period = models.CharField(max_length=5, choices=PERIOD_CHOICES)
+    period_start = models.DateField(help_text="The day, or the 1st of the month")
+    course = models.ForeignKey('courses.Course', on_delete=models.CASCADE, related_name='fee_collection_rollups')
+    payment_method = models.CharField(max_length=20, choices=PaymentRecord.PAYMENT_METHOD_CHOICES)
+    
+    payment_count = models.IntegerField(default=0)
+    total_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        ordering = ['-period_start']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['period', 'period_start', 'course', 'payment_method'],
+                name='fee_rollup_unique_bucket',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['period', 'period_start'], name='fee_rollup_period_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.period} {self.period_start} - {self.course_id}/{self.payment_method}: {self.total_amount}"
+
 
 class BatchAccessControl(models.Model):
     """Control access to specific batches for fee defaulters"""
@@ -552,9 +592,9 @@ class BatchAccessControl(models.Model):
     def __str__(self):
         return f"{self.student.get_full_name()} - {self.batch.name} ({self.access_type})"
     
-    def is_access_allowed(self):
+    def is_access_allowed(self, today=None):
         """Check if student can access this batch"""
-        today = date.today()
+        today = today or date.today()
         
         # Check admin override first
         if self.override_access:
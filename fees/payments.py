@@ -0,0 +1,120 @@
+# fees/payments.py - Payment allocation
+"""
+Applies a completed ``PaymentRecord`` to its fee assignment exactly once.
+
+- the payment row is claimed with a conditional UPDATE on ``allocated_at``,
+  so re-saving a completed payment (or two processes racing) never counts
+  it twice
+- the assignment and its open EMIs are locked with ``select_for_update``,
+  the amount is spread over the installments in memory (linked EMI first,
+  then oldest first) and written back with one ``bulk_update``
+- assignment totals move with ``F()`` expressions, never read-modify-write
+
+``create_payment()`` takes an ``idempotency_key`` (form token, gateway
+event id ...): a retry with the same key returns the original payment.
+"""
+
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import EMISchedule, PaymentRecord, StudentFeeAssignment
+
+OPEN_EMI_STATUSES = ['pending', 'overdue']
+
+
+def spread_amount(amount, emis, payment_date, first_emi_id=None):
+    """
+    Allocate ``amount`` over ``emis`` (in place). Returns ``(changed, left)``:
+    the EMIs that changed and the part of the amount no EMI could take.
+    """
+    if first_emi_id:
+        emis = sorted(emis, key=lambda emi: emi.pk != first_emi_id)
+
+    changed = []
+    remaining = Decimal(str(amount))
+    for emi in emis:
+        if remaining <= 0:
+            break
+        emi_remaining = emi.amount - (emi.amount_paid or Decimal('0.00'))
+        if emi_remaining <= 0:
+            continue
+
+        portion = min(remaining, emi_remaining)
+        emi.amount_paid = (emi.amount_paid or Decimal('0.00')) + portion
+        if emi.amount_paid >= emi.amount:
+            emi.status = 'paid'
+            emi.paid_date = payment_date
+        changed.append(emi)
+        remaining -= portion
+
+    return changed, remaining
+
+
+def allocate_payment(payment):
+    """
+    Apply a completed payment to its assignment and EMIs.
+
+    Returns False if it was already allocated (or is not completed).
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        claimed = PaymentRecord.objects.filter(
+            pk=payment.pk, status='completed', allocated_at__isnull=True
+        ).update(allocated_at=now)
+        if not claimed:
+            return False
+        payment.allocated_at = now
+
+        assignment = StudentFeeAssignment.objects.select_for_update().get(pk=payment.fee_assignment_id)
+        emis = list(
+            EMISchedule.objects.select_for_update().filter(
+                fee_assignment=assignment, status__in=OPEN_EMI_STATUSES
+            ).order_by('installment_number')
+        )
+
+        # Anything no EMI can take stays on the assignment totals (advance)
+        changed, _ = spread_amount(payment.amount, emis, payment.payment_date, payment.emi_schedule_id)
+        for emi in changed:
+            emi.updated_at = now
+        EMISchedule.objects.bulk_update(changed, ['amount_paid', 'status', 'paid_date', 'updated_at'])
+
+        StudentFeeAssignment.objects.filter(pk=assignment.pk).update(
+            amount_paid=F('amount_paid') + payment.amount,
+            amount_pending=F('amount_pending') - payment.amount,
+            updated_at=now,
+        )
+
+    # Neither update sends post_save - refresh the student's batch locks
+    from courses.batch_locks import schedule_student_recompute
+    schedule_student_recompute(assignment.student_id)
+    return True
+
+
+def create_payment(idempotency_key=None, **fields):
+    """
+    Create a payment (allocated by ``PaymentRecord.save()`` if completed).
+
+    Returns ``(payment, created)`` - with a known ``idempotency_key`` the
+    existing payment is returned and nothing is written.
+    """
+    if idempotency_key:
+        existing = PaymentRecord.objects.filter(idempotency_key=idempotency_key).first()
+        if existing:
+            return existing, False
+    payment = PaymentRecord(idempotency_key=idempotency_key or None, **fields)
+    return save_payment(payment)
+
+
+def save_payment(payment):
+    """Save a new payment, returning the original one on a duplicate idempotency key"""
+    try:
+        with transaction.atomic():
+            payment.save()
+        return payment, True
+    except IntegrityError:
+        if not payment.idempotency_key:
+            raise
+        return PaymentRecord.objects.get(idempotency_key=payment.idempotency_key), False
@@ -0,0 +1,247 @@
+# fees/rollups.py - Fee collection rollups
+"""
+Completed payments pre-aggregated into ``FeeCollectionRollup`` buckets:
+one row per (day | month, course, payment method).
+
+``PaymentRecord.save()`` moves a payment's contribution between buckets
+with ``F()`` updates (status / amount / date / method changes included) and
+deleting a payment removes it, so dashboards and reports read O(months) rows
+instead of scanning ``PaymentRecord``. ``rebuild_rollups()`` (``manage.py
+rebuild_fee_rollups``) recomputes any date range from the payments table.
+"""
+
+from collections import defaultdict
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from .models import FeeCollectionRollup, PaymentRecord, StudentFeeAssignment
+
+
+def month_start(day):
+    return day.replace(day=1)
+
+
+def add_months(day, months):
+    """1st of the month ``months`` away from ``day``'s month"""
+    index = day.year * 12 + day.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+# ==================== INCREMENTAL MAINTENANCE ====================
+
+def _contribution(status, amount, payment_date, payment_method, course_id):
+    if status != 'completed' or not amount:
+        return None
+    return (payment_date, course_id, payment_method, Decimal(str(amount)))
+
+
+def get_rollup_state(payment_id, lock=False):
+    """
+    Rollup contribution of a saved payment, read from the DB (None if none).
+    ``lock`` takes a row lock (call inside ``transaction.atomic()``).
+    """
+    payments = PaymentRecord.objects.select_for_update() if lock else PaymentRecord.objects
+    row = payments.filter(pk=payment_id).values_list(
+        'status', 'amount', 'payment_date', 'payment_method', 'fee_assignment__course_id'
+    ).first()
+    return _contribution(*row) if row else None
+
+
+def _bump(payment_date, course_id, payment_method, count, amount):
+    for period, period_start in (('day', payment_date), ('month', month_start(payment_date))):
+        bucket = FeeCollectionRollup.objects.filter(
+            period=period, period_start=period_start,
+            course_id=course_id, payment_method=payment_method,
+        )
+        changes = {
+            'payment_count': F('payment_count') + count,
+            'total_amount': F('total_amount') + amount,
+        }
+        if bucket.update(**changes):
+            continue
+        try:
+            with transaction.atomic():
+                FeeCollectionRollup.objects.create(
+                    period=period, period_start=period_start,
+                    course_id=course_id, payment_method=payment_method,
+                    payment_count=count, total_amount=amount,
+                )
+        except IntegrityError:
+            # Created concurrently - add to it instead
+            bucket.update(**changes)
+
+
+def record_payment_change(previous, payment):
+    """Move a payment's contribution from ``previous`` to its current state"""
+    current = _contribution(
+        payment.status, payment.amount, payment.payment_date,
+        payment.payment_method, payment.fee_assignment.course_id,
+    )
+    if previous == current:
+        return
+    if previous:
+        payment_date, course_id, payment_method, amount = previous
+        _bump(payment_date, course_id, payment_method, -1, -amount)
+    if current:
+        payment_date, course_id, payment_method, amount = current
+        _bump(payment_date, course_id, payment_method, 1, amount)
+
+
+@receiver(post_delete, sender=PaymentRecord)
+def payment_deleted(sender, instance, **kwargs):
+    course_id = StudentFeeAssignment.objects.filter(
+        pk=instance.fee_assignment_id
+    ).values_list('course_id', flat=True).first()
+    if course_id is None:
+        # Assignment row already gone - run rebuild_fee_rollups to resync
+        return
+    contribution = _contribution(
+        instance.status, instance.amount, instance.payment_date, instance.payment_method, course_id
+    )
+    if contribution:
+        payment_date, course_id, payment_method, amount = contribution
+        _bump(payment_date, course_id, payment_method, -1, -amount)
+
+
+# ==================== BACKFILL ====================
+
+def rebuild_rollups(date_from=None, date_to=None):
+    """
+    Recompute rollups from ``PaymentRecord`` (whole months around the range).
+    Returns ``(day_rows, month_rows)`` written.
+    """
+    payments = PaymentRecord.objects.filter(status='completed')
+    rollups = FeeCollectionRollup.objects.all()
+    if date_from:
+        date_from = month_start(date_from)
+        payments = payments.filter(payment_date__gte=date_from)
+        rollups = rollups.filter(period_start__gte=date_from)
+    if date_to:
+        date_to = add_months(date_to, 1) - timedelta(days=1)
+        payments = payments.filter(payment_date__lte=date_to)
+        rollups = rollups.filter(period_start__lte=date_to)
+
+    days = payments.values(
+        'payment_date', 'fee_assignment__course_id', 'payment_method'
+    ).annotate(
+        count=Count('id'), total=Sum('amount')
+    ).order_by()
+
+    day_rows = []
+    months = defaultdict(lambda: [0, Decimal('0.00')])
+    for row in days:
+        key = (row['fee_assignment__course_id'], row['payment_method'])
+        day_rows.append(FeeCollectionRollup(
+            period='day', period_start=row['payment_date'],
+            course_id=key[0], payment_method=key[1],
+            payment_count=row['count'], total_amount=row['total'],
+        ))
+        bucket = months[(month_start(row['payment_date']),) + key]
+        bucket[0] += row['count']
+        bucket[1] += row['total']
+
+    month_rows = [
+        FeeCollectionRollup(
+            period='month', period_start=period_start,
+            course_id=course_id, payment_method=payment_method,
+            payment_count=count, total_amount=total,
+        )
+        for (period_start, course_id, payment_method), (count, total) in months.items()
+    ]
+
+    with transaction.atomic():
+        rollups.delete()
+        FeeCollectionRollup.objects.bulk_create(day_rows + month_rows, batch_size=1000)
+
+    return len(day_rows), len(month_rows)
+
+
+# ==================== READS ====================
+
+def _range_filter(date_from, date_to):
+    """
+    Q over the fewest rows covering [date_from, date_to]: month rows for whole
+    months, day rows for the partial months at either end.
+    """
+    first_full = date_from if date_from.day == 1 else add_months(date_from, 1)
+    after_last_full = month_start(date_to + timedelta(days=1))
+
+    if first_full >= after_last_full:
+        # No whole month inside the range
+        return Q(period='day', period_start__range=[date_from, date_to])
+
+    return (
+        Q(period='month', period_start__gte=first_full, period_start__lt=after_last_full)
+        | Q(period='day', period_start__gte=date_from, period_start__lt=first_full)
+        | Q(period='day', period_start__gte=after_last_full, period_start__lte=date_to)
+    )
+
+
+def collection_rows(date_from, date_to, course=None):
+    rows = FeeCollectionRollup.objects.filter(_range_filter(date_from, date_to))
+    if course:
+        rows = rows.filter(course=course)
+    return rows
+
+
+def collection_summary(date_from, date_to, course=None):
+    """``{'count', 'total'}`` of completed payments in the range"""
+    totals = collection_rows(date_from, date_to, course).aggregate(
+        count=Sum('payment_count'), total=Sum('total_amount')
+    )
+    return {
+        'count': totals['count'] or 0,
+        'total': totals['total'] or Decimal('0.00'),
+    }
+
+
+def method_breakdown(date_from, date_to, course=None):
+    return list(
+        collection_rows(date_from, date_to, course).values('payment_method').annotate(
+            count=Sum('payment_count'), total=Sum('total_amount')
+        ).filter(count__gt=0).order_by('-total')
+    )
+
+
+def daily_collections(date_from, date_to, course=None):
+    rows = FeeCollectionRollup.objects.filter(
+        period='day', period_start__range=[date_from, date_to]
+    )
+    if course:
+        rows = rows.filter(course=course)
+    return list(
+        rows.values(day=F('period_start')).annotate(
+            count=Sum('payment_count'), total=Sum('total_amount')
+        ).filter(count__gt=0).order_by('day')
+    )
+
+
+def day_total(day):
+    return FeeCollectionRollup.objects.filter(
+        period='day', period_start=day
+    ).aggregate(total=Sum('total_amount'))['total'] or Decimal('0.00')
+
+
+def monthly_collections(months=6, today=None):
+    """Last ``months`` calendar months (oldest first), for dashboard charts"""
+    today = today or date.today()
+    first = add_months(today, -(months - 1))
+    totals = dict(
+        FeeCollectionRollup.objects.filter(
+            period='month', period_start__gte=first, period_start__lte=today
+        ).values_list('period_start').annotate(total=Sum('total_amount')).order_by()
+    )
+
+    data = []
+    for offset in range(months):
+        period_start = add_months(first, offset)
+        data.append({
+            'month': period_start.strftime('%b %Y'),
+            'amount': float(totals.get(period_start, 0)),
+        })
+    return data
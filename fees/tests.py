@@ -1,3 +1,229 @@
+# fees/tests.py - Payment allocation / idempotency, collection rollups
+
+from datetime import date
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
 from django.test import TestCase
 
-# Create your tests here.
+from courses.models import Course, CourseCategory
+from .models import EMISchedule, FeeCollectionRollup, FeeStructure, PaymentRecord, StudentFeeAssignment
+from .payments import allocate_payment, create_payment, save_payment
+from .rollups import _range_filter, rebuild_rollups
+
+User = get_user_model()
+
+
+class PaymentAllocationTests(TestCase):
+    """A completed payment is applied to the assignment / EMIs exactly once"""
+
+    @classmethod
+    def setUpTestData(cls):
+        admin = User.objects.create_user(username='fees_admin', password='x', role='superadmin')
+        cls.student = User.objects.create_user(username='fees_student', password='x', role='student')
+        category = CourseCategory.objects.create(name='Fees Tests', slug='fees-tests')
+        cls.course = Course.objects.create(
+            title='Fees Course', course_code='FEE101', description='-', short_description='-',
+            learning_outcomes='-', category=category, instructor=admin,
+        )
+        # 3 EMIs of 1000, no down payment
+        cls.structure = FeeStructure.objects.create(
+            name='3 month EMI', code='EMI_3M_TEST', total_amount=Decimal('3000.00'),
+            payment_type='emi', emi_duration_months=3, down_payment=Decimal('0.00'),
+        )
+
+    def setUp(self):
+        self.assignment = StudentFeeAssignment.objects.create(
+            student=self.student, course=self.course, fee_structure=self.structure,
+            total_amount=Decimal('3000.00'), payment_start_date=date.today(),
+        )
+        self.emis = list(self.assignment.emi_schedules.order_by('installment_number'))
+
+    def pay(self, amount, idempotency_key=None, **fields):
+        fields.setdefault('status', 'completed')
+        return create_payment(
+            idempotency_key=idempotency_key,
+            fee_assignment=self.assignment,
+            amount=Decimal(amount),
+            payment_method='upi',
+            payment_date=date.today(),
+            **fields
+        )
+
+    def assertTotals(self, paid, pending):
+        self.assignment.refresh_from_db()
+        self.assertEqual(self.assignment.amount_paid, Decimal(paid))
+        self.assertEqual(self.assignment.amount_pending, Decimal(pending))
+
+    def emi_state(self):
+        return [
+            (emi.amount_paid, emi.status)
+            for emi in EMISchedule.objects.filter(fee_assignment=self.assignment).order_by('installment_number')
+        ]
+
+    def test_schedule_created(self):
+        self.assertEqual([emi.amount for emi in self.emis], [Decimal('1000.00')] * 3)
+
+    def test_same_idempotency_key_counts_once(self):
+        first, created = self.pay('1500.00', idempotency_key='gateway-evt-1')
+        again, created_again = self.pay('1500.00', idempotency_key='gateway-evt-1')
+
+        self.assertTrue(created)
+        self.assertFalse(created_again)
+        self.assertEqual(again.pk, first.pk)
+        self.assertEqual(PaymentRecord.objects.filter(fee_assignment=self.assignment).count(), 1)
+        self.assertTotals('1500.00', '1500.00')
+
+    def test_duplicate_key_race_returns_original(self):
+        # Second writer got past the lookup - the unique key catches it
+        first, _ = self.pay('1000.00', idempotency_key='form-token-1')
+        duplicate = PaymentRecord(
+            idempotency_key='form-token-1', fee_assignment=self.assignment, amount=Decimal('1000.00'),
+            payment_method='upi', payment_date=date.today(), status='completed',
+        )
+        payment, created = save_payment(duplicate)
+
+        self.assertFalse(created)
+        self.assertEqual(payment.pk, first.pk)
+        self.assertTotals('1000.00', '2000.00')
+
+    def test_resaving_completed_payment_does_not_reallocate(self):
+        payment, _ = self.pay('1000.00')
+        payment.notes = 'edited'
+        payment.save()
+        PaymentRecord.objects.get(pk=payment.pk).save()  # retried webhook with a fresh instance
+
+        self.assertFalse(allocate_payment(payment))
+        self.assertTotals('1000.00', '2000.00')
+        self.assertEqual(self.emi_state()[0], (Decimal('1000.00'), 'paid'))
+
+    def test_pending_payment_allocated_once_when_completed(self):
+        payment, _ = self.pay('500.00', status='pending')
+        self.assertTotals('0.00', '3000.00')
+
+        payment.status = 'completed'
+        payment.save()
+        payment.save()
+        self.assertTotals('500.00', '2500.00')
+
+    def test_overflow_spreads_over_open_emis(self):
+        self.pay('1500.00')
+
+        self.assertEqual(self.emi_state(), [
+            (Decimal('1000.00'), 'paid'),
+            (Decimal('500.00'), 'pending'),
+            (Decimal('0.00'), 'pending'),
+        ])
+        self.assertTotals('1500.00', '1500.00')
+
+    def test_linked_emi_is_paid_first(self):
+        self.pay('1200.00', emi_schedule=self.emis[1])
+
+        self.assertEqual(self.emi_state(), [
+            (Decimal('200.00'), 'pending'),
+            (Decimal('1000.00'), 'paid'),
+            (Decimal('0.00'), 'pending'),
+        ])
+        self.assertTotals('1200.00', '1800.00')
+
+    def test_amount_beyond_schedule_stays_on_assignment(self):
+        self.pay('3500.00')
+
+        self.assertEqual([status for _, status in self.emi_state()], ['paid', 'paid', 'paid'])
+        self.assertTotals('3500.00', '-500.00')
+
+
+class FeeRollupTests(TestCase):
+    """Incremental rollup maintenance ends where ``rebuild_rollups()`` does"""
+
+    @classmethod
+    def setUpTestData(cls):
+        admin = User.objects.create_user(username='rollup_admin', password='x', role='superadmin')
+        student = User.objects.create_user(username='rollup_student', password='x', role='student')
+        category = CourseCategory.objects.create(name='Rollup Tests', slug='rollup-tests')
+        course = Course.objects.create(
+            title='Rollup Course', course_code='ROL101', description='-', short_description='-',
+            learning_outcomes='-', category=category, instructor=admin,
+        )
+        structure = FeeStructure.objects.create(
+            name='Rollup EMI', code='EMI_ROLLUP_TEST', total_amount=Decimal('3000.00'),
+            payment_type='emi', emi_duration_months=3, down_payment=Decimal('0.00'),
+        )
+        cls.assignment = StudentFeeAssignment.objects.create(
+            student=student, course=course, fee_structure=structure,
+            total_amount=Decimal('3000.00'), payment_start_date=date(2026, 1, 1),
+        )
+
+    def setUp(self):
+        # Two payments in the same buckets, so a move leaves the other one behind
+        self.payment = self.pay('1000.00')
+        self.other = self.pay('400.00')
+
+    def pay(self, amount, **fields):
+        fields.setdefault('payment_date', date(2026, 1, 31))
+        payment, _ = create_payment(
+            fee_assignment=self.assignment, amount=Decimal(amount),
+            payment_method='upi', status='completed', **fields
+        )
+        return payment
+
+    def rollup_rows(self):
+        # Buckets emptied by a move stay as zero rows - a rebuild doesn't write them
+        return sorted(
+            FeeCollectionRollup.objects.exclude(payment_count=0).values_list(
+                'period', 'period_start', 'course_id', 'payment_method', 'payment_count', 'total_amount'
+            )
+        )
+
+    def assertMatchesRebuild(self):
+        incremental = self.rollup_rows()
+        rebuild_rollups()
+        self.assertEqual(incremental, self.rollup_rows())
+
+    def test_new_payments(self):
+        self.assertEqual(
+            FeeCollectionRollup.objects.get(period='month', period_start=date(2026, 1, 1)).total_amount,
+            Decimal('1400.00'),
+        )
+        self.assertMatchesRebuild()
+
+    def test_completed_to_refunded(self):
+        self.payment.status = 'refunded'
+        self.payment.save()
+        self.assertMatchesRebuild()
+
+    def test_amount_edit(self):
+        self.payment.amount = Decimal('750.00')
+        self.payment.save()
+        self.assertMatchesRebuild()
+
+    def test_date_moved_to_next_month(self):
+        self.payment.payment_date = date(2026, 2, 1)
+        self.payment.save()
+        self.assertEqual(
+            FeeCollectionRollup.objects.get(period='month', period_start=date(2026, 2, 1)).payment_count, 1
+        )
+        self.assertMatchesRebuild()
+
+    def test_method_change(self):
+        self.payment.payment_method = 'cash'
+        self.payment.save()
+        self.assertMatchesRebuild()
+
+    def test_delete(self):
+        self.payment.delete()
+        self.assertMatchesRebuild()
+
+    def test_range_filter_from_mid_month(self):
+        # Jan 31 (day rows), Feb - Mar (month rows), Apr 1 - 10 (day rows)
+        self.pay('100.00', payment_date=date(2026, 1, 30))  # before the range
+        self.pay('200.00', payment_date=date(2026, 2, 14))
+        self.pay('300.00', payment_date=date(2026, 4, 10))
+        self.pay('500.00', payment_date=date(2026, 4, 11))  # after the range
+
+        rows = FeeCollectionRollup.objects.filter(_range_filter(date(2026, 1, 31), date(2026, 4, 10)))
+        self.assertEqual(
+            sorted(rows.values_list('period', 'period_start')),
+            [('day', date(2026, 1, 31)), ('day', date(2026, 4, 10)), ('month', date(2026, 2, 1))],
+        )
+        self.assertEqual(sum(row.total_amount for row in rows), Decimal('1900.00'))
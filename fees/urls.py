@@ -40,6 +40,11 @@ urlpatterns = [
         views.assign_fee_to_student,
         name="assign_fee_to_student",
     ),
+    path(
+        "admin/student-fees/bulk-assign/",
+        views.bulk_assign_fee_api,
+        name="bulk_assign_fee_api",
+    ),
     path(
         "admin/student-fees/<int:assignment_id>/",
         views.student_fee_detail,
@@ -1,6 +1,6 @@
 # fees/utils.py - Helper Functions for Fees Management
 
-from django.db.models import Sum, Count, Q
+from django.db.models import Sum, Count, F, Q
 from django.core.mail import send_mail
 from django.conf import settings
 from django.utils import timezone
@@ -12,6 +12,7 @@ from .models import (
     StudentFeeAssignment, EMISchedule, PaymentRecord, 
     PaymentReminder, FeeStructure
 )
+from . import rollups
 
 logger = logging.getLogger(__name__)
 
@@ -30,7 +31,14 @@ def calculate_overdue_amount(student=None, course=None):
         overdue_emis = overdue_emis.filter(fee_assignment__course=course)
     
     # Update status to overdue
+    affected_students = list(
+        overdue_emis.filter(status='pending').order_by()
+        .values_list('fee_assignment__student_id', flat=True).distinct()
+    )
     overdue_emis.update(status='overdue')
+    if affected_students:
+        from courses.batch_locks import recompute_student_batch_locks
+        recompute_student_batch_locks(affected_students)
     
     total_overdue = overdue_emis.aggregate(total=Sum('amount'))['total'] or Decimal('0.00')
     
@@ -42,48 +50,25 @@ def calculate_overdue_amount(student=None, course=None):
 
 
 def check_and_lock_courses():
-    """Check all students and lock courses if payments are overdue"""
-    
-    locked_count = 0
-    
-    # Get all active fee assignments
-    assignments = StudentFeeAssignment.objects.filter(
-        status='active',
-        is_course_locked=False
-    )
-    
-    for assignment in assignments:
-        if assignment.should_lock_course():
-            assignment.lock_course()
-            locked_count += 1
-            
-            # Log the action
-            logger.info(f"Course locked for student {assignment.student.get_full_name()} "
-                       f"in course {assignment.course.title} due to overdue payments")
+    """Lock courses with overdue payments past the grace period (set-based)"""
+    from .engine import mark_overdue_emis, lock_overdue_assignments
     
-    return locked_count
+    mark_overdue_emis()
+    return lock_overdue_assignments()
 
 
 def auto_unlock_courses():
-    """Auto-unlock courses based on unlock_date"""
-    
-    unlocked_count = 0
+    """Auto-unlock courses whose admin unlock date is today (set-based)"""
+    from .engine import unlock_scheduled_assignments
     
-    # Get locked assignments with unlock dates
-    assignments = StudentFeeAssignment.objects.filter(
-        is_course_locked=True,
-        unlock_date__lte=date.today()
-    )
-    
-    for assignment in assignments:
-        assignment.unlock_course()
-        unlocked_count += 1
-        
-        # Log the action
-        logger.info(f"Course auto-unlocked for student {assignment.student.get_full_name()} "
-                   f"in course {assignment.course.title}")
+    return unlock_scheduled_assignments()
+
+
+def calculate_late_fees_for_overdue():
+    """Apply late fees to overdue EMIs past the grace period (set-based)"""
+    from .engine import apply_late_fees
     
-    return unlocked_count
+    return apply_late_fees()
 
 
 def send_payment_reminder(assignment, reminder_type='overdue'):
@@ -230,35 +215,37 @@ def generate_fee_report(report_params):
         
         if student:
             payments = payments.filter(fee_assignment__student=student)
-        
-        # Summary data
-        total_payments = payments.count()
-        total_amount = payments.aggregate(total=Sum('amount'))['total'] or Decimal('0.00')
-        
-        # Payment method breakdown
-        method_breakdown = payments.values('payment_method').annotate(
-            count=Count('id'),
-            total=Sum('amount')
-        ).order_by('-total')
-        
-        # Daily collection data
-        daily_collections = payments.extra(
-            select={'day': 'DATE(payment_date)'}
-        ).values('day').annotate(
-            count=Count('id'),
-            total=Sum('amount')
-        ).order_by('day')
+            
+            # Rollups have no per-student buckets - aggregate this student's payments
+            totals = payments.aggregate(count=Count('id'), total=Sum('amount'))
+            total_payments = totals['count']
+            total_amount = totals['total'] or Decimal('0.00')
+            method_breakdown = list(payments.values('payment_method').annotate(
+                count=Count('id'),
+                total=Sum('amount')
+            ).order_by('-total'))
+            daily_collections = list(payments.values(day=F('payment_date')).annotate(
+                count=Count('id'),
+                total=Sum('amount')
+            ).order_by('day'))
+        else:
+            # Summary data from the collection rollups (fees/rollups.py)
+            totals = rollups.collection_summary(date_from, date_to, course)
+            total_payments = totals['count']
+            total_amount = totals['total']
+            method_breakdown = rollups.method_breakdown(date_from, date_to, course)
+            daily_collections = rollups.daily_collections(date_from, date_to, course)
         
         report_data['data'] = {
-            'payments': payments.values(
+            'payments': list(payments.values(
                 'payment_date', 'amount', 'payment_method',
                 'fee_assignment__student__first_name',
                 'fee_assignment__student__last_name',
                 'fee_assignment__course__title',
                 'transaction_id', 'status'
-            ),
-            'method_breakdown': list(method_breakdown),
-            'daily_collections': list(daily_collections)
+            )),
+            'method_breakdown': method_breakdown,
+            'daily_collections': daily_collections
         }
         
         report_data['summary'] = {
@@ -583,84 +570,61 @@ def process_bulk_payment_update(form_data, user):
         }
 
 
-def calculate_late_fees_for_overdue():
-    """Calculate and apply late fees for all overdue EMIs"""
-    
-    overdue_emis = EMISchedule.objects.filter(
-        status='overdue',
-        late_fee_applied=0,
-        due_date__lt=date.today()
-    )
-    
-    total_late_fee = Decimal('0.00')
-    processed_count = 0
-    
-    for emi in overdue_emis:
-        late_fee = emi.calculate_late_fee()
-        if late_fee > 0:
-            total_late_fee += late_fee
-            processed_count += 1
-    
-    return {
-        'processed_count': processed_count,
-        'total_late_fee': total_late_fee
-    }
-
-
-def get_dashboard_stats():
+def get_dashboard_stats(today=None):
     """Get key statistics for fees dashboard"""
     
-    today = date.today()
+    today = today or date.today()
     
-    # Active assignments
-    active_assignments = StudentFeeAssignment.objects.filter(status='active')
-    
-    # Total amounts
-    total_assigned = active_assignments.aggregate(total=Sum('total_amount'))['total'] or Decimal('0.00')
-    total_collected = active_assignments.aggregate(total=Sum('amount_paid'))['total'] or Decimal('0.00')
+    # Assignment totals - one aggregate
+    active = Q(status='active')
+    assignment_totals = StudentFeeAssignment.objects.aggregate(
+        active_assignments=Count('id', filter=active),
+        total_assigned=Sum('total_amount', filter=active),
+        total_collected=Sum('amount_paid', filter=active),
+        locked_courses=Count('id', filter=active & Q(is_course_locked=True)),
+        locked_assignments=Count('id', filter=Q(is_course_locked=True)),
+    )
+    total_assigned = assignment_totals['total_assigned'] or Decimal('0.00')
+    total_collected = assignment_totals['total_collected'] or Decimal('0.00')
     total_pending = total_assigned - total_collected
     
     # Collection rate
     collection_rate = (total_collected / total_assigned * 100) if total_assigned > 0 else 0
     
-    # Today's collections
-    today_collections = PaymentRecord.objects.filter(
-        payment_date=today,
-        status='completed'
-    ).aggregate(total=Sum('amount'))['total'] or Decimal('0.00')
+    # Today's collections (collection rollups)
+    today_collections = rollups.day_total(today)
     
     # Overdue information
-    overdue_emis = EMISchedule.objects.filter(
+    overdue = EMISchedule.objects.filter(
         status='overdue',
         due_date__lt=today
+    ).aggregate(
+        count=Count('id'),
+        amount=Sum('amount'),
+        students=Count('fee_assignment__student', distinct=True),
     )
     
-    overdue_amount = overdue_emis.aggregate(total=Sum('amount'))['total'] or Decimal('0.00')
-    overdue_students = overdue_emis.values('fee_assignment__student').distinct().count()
-    
-    # Locked courses
-    locked_courses = active_assignments.filter(is_course_locked=True).count()
-    
     # Upcoming due payments (next 7 days)
-    upcoming_emis = EMISchedule.objects.filter(
+    upcoming = EMISchedule.objects.filter(
         status='pending',
         due_date__gte=today,
         due_date__lte=today + timedelta(days=7)
-    )
-    
-    upcoming_amount = upcoming_emis.aggregate(total=Sum('amount'))['total'] or Decimal('0.00')
+    ).aggregate(count=Count('id'), amount=Sum('amount'))
     
     return {
+        'active_assignments': assignment_totals['active_assignments'],
         'total_assigned': total_assigned,
         'total_collected': total_collected,
         'total_pending': total_pending,
         'collection_rate': round(float(collection_rate), 2),
         'today_collections': today_collections,
-        'overdue_amount': overdue_amount,
-        'overdue_students': overdue_students,
-        'locked_courses': locked_courses,
-        'upcoming_amount': upcoming_amount,
-        'upcoming_payments': upcoming_emis.count()
+        'overdue_emis': overdue['count'],
+        'overdue_amount': overdue['amount'] or Decimal('0.00'),
+        'overdue_students': overdue['students'],
+        'locked_courses': assignment_totals['locked_courses'],
+        'locked_assignments': assignment_totals['locked_assignments'],
+        'upcoming_amount': upcoming['amount'] or Decimal('0.00'),
+        'upcoming_payments': upcoming['count']
     }
 
 
@@ -712,110 +676,28 @@ import logging
 
 logger = logging.getLogger(__name__)
 
-def check_and_lock_courses():
-    """Check overdue payments and lock courses automatically"""
-    today = date.today()
-    locked_count = 0
-    
-    # Get all assignments with overdue EMIs
-    overdue_assignments = StudentFeeAssignment.objects.filter(
-        status='active',
-        is_course_locked=False,
-        emi_schedules__status='overdue',
-        emi_schedules__due_date__lt=today
-    ).distinct()
-    
-    for assignment in overdue_assignments:
-        # Check grace period
-        grace_period = assignment.fee_structure.grace_period_days or 0
-        
-        # Get the oldest overdue EMI
-        oldest_overdue = assignment.emi_schedules.filter(
-            status='overdue',
-            due_date__lt=today
-        ).order_by('due_date').first()
-        
-        if oldest_overdue:
-            days_overdue = (today - oldest_overdue.due_date).days
-            
-            if days_overdue > grace_period:
-                assignment.lock_course()
-                locked_count += 1
-                logger.info(f"Locked course for student {assignment.student.email} - {days_overdue} days overdue")
-    
-    return locked_count
-
-def auto_unlock_courses():
-    """Auto-unlock courses based on unlock dates"""
-    today = date.today()
-    unlocked_count = 0
-    
-    # Get assignments that should be unlocked today
-    assignments_to_unlock = StudentFeeAssignment.objects.filter(
-        is_course_locked=True,
-        unlock_date=today
-    )
-    
-    for assignment in assignments_to_unlock:
-        assignment.unlock_course()
-        unlocked_count += 1
-        logger.info(f"Auto-unlocked course for student {assignment.student.email}")
-    
-    return unlocked_count
-
-def calculate_late_fees_for_overdue():
-    """Calculate and apply late fees for overdue EMIs"""
-    today = date.today()
-    processed_count = 0
-    
-    # Get overdue EMIs that haven't had late fees applied
-    overdue_emis = EMISchedule.objects.filter(
-        status='overdue',
-        due_date__lt=today,
-        late_fee_applied=False
-    )
-    
-    for emi in overdue_emis:
-        fee_structure = emi.fee_assignment.fee_structure
-        
-        # Check if late fee should be applied
-        if fee_structure.late_fee_amount > 0:
-            days_overdue = (today - emi.due_date).days
-            
-            # Apply late fee after grace period
-            grace_period = fee_structure.grace_period_days or 0
-            
-            if days_overdue > grace_period:
-                # Add late fee to EMI amount
-                emi.amount += fee_structure.late_fee_amount
-                emi.late_fee_applied = True
-                emi.save()
-                
-                processed_count += 1
-                logger.info(f"Applied late fee of ${fee_structure.late_fee_amount} to EMI {emi.id}")
-    
-    return {'processed_count': processed_count}
-
 def send_payment_reminders():
-    """Send payment reminders to students with upcoming or overdue EMIs"""
+    """Queue payment reminders for students with upcoming or overdue EMIs"""
+    from userss.email_queue import build_email, queue_emails
+    
     today = date.today()
-    reminder_count = 0
     
-    # Get EMIs due in next 3 days or overdue
+    # Get EMIs due in next 3 days or overdue, skipping ones reminded today
     upcoming_emis = EMISchedule.objects.filter(
         status__in=['pending', 'overdue'],
         due_date__lte=today + timedelta(days=3)
+    ).exclude(
+        last_reminder_sent=today
     ).select_related('fee_assignment__student', 'fee_assignment__course')
     
+    outbound = []
+    reminded_ids = []
+    
     for emi in upcoming_emis:
         try:
             student = emi.fee_assignment.student
             course = emi.fee_assignment.course
             
-            # Check if reminder was already sent today
-            if hasattr(emi, 'last_reminder_sent') and emi.last_reminder_sent == today:
-                continue
-            
             # Determine reminder type
             if emi.due_date < today:
                 subject = f"Overdue Payment Reminder - {course.title}"
@@ -852,32 +734,26 @@ Please ensure timely payment to continue your course access.
 Thank you.
 """
             
-            # Send email
-            send_mail(
-                subject=subject,
-                message=message,
-                from_email=settings.DEFAULT_FROM_EMAIL,
-                recipient_list=[student.email],
-                fail_silently=True
-            )
-            
-            # Update reminder sent date
-            emi.last_reminder_sent = today
-            emi.save(update_fields=['last_reminder_sent'])
-            
-            reminder_count += 1
-            logger.info(f"Sent payment reminder to {student.email} for EMI {emi.id}")
+            if student.email:
+                outbound.append(build_email(
+                    student.email,
+                    subject,
+                    message,
+                    recipient_user=student,
+                    source='fee_reminder',
+                ))
+            reminded_ids.append(emi.id)
             
         except Exception as e:
-            logger.error(f"Failed to send reminder for EMI {emi.id}: {str(e)}")
+            logger.error(f"Failed to build reminder for EMI {emi.id}: {str(e)}")
             continue
     
-    return reminder_count
-
-def generate_fee_report(report_data):
-    """Generate comprehensive fee reports"""
-    # Implementation for generating reports
-    pass
+    # Queue all reminders with one insert and stamp the EMIs with one update
+    queue_emails(outbound)
+    EMISchedule.objects.filter(id__in=reminded_ids).update(last_reminder_sent=today)
+    
+    logger.info(f"Queued {len(outbound)} payment reminders")
+    return len(reminded_ids)
 
 def process_bulk_payment_update(form_data, user):
     """Process bulk payment updates"""
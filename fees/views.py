@@ -7,11 +7,13 @@ from django.core.paginator import Paginator
 from django.db.models import Q, Sum, Count, Avg
 from django.http import JsonResponse, HttpResponse
 from django.utils import timezone
+from django.urls import reverse
 from django.views.decorators.http import require_http_methods
 from django.views.decorators.csrf import csrf_exempt
 from django.contrib.auth import get_user_model
 from datetime import date, timedelta
 import json
+import uuid
 
 from .models import (
     FeeStructure, StudentFeeAssignment, PaymentRecord, 
@@ -20,13 +22,20 @@ from .models import (
 from .forms import (
     FeeStructureForm, StudentFeeAssignmentForm, PaymentRecordForm,
     QuickPaymentForm, BatchAccessControlForm, FeeDiscountForm,
-    FeeReportForm, BulkPaymentUpdateForm, FeeFilterForm
+    FeeReportForm, BulkPaymentUpdateForm, FeeFilterForm,
+    BulkFeeAssignmentForm
 )
 from courses.models import Course, Batch
+from courses.batch_locks import recompute_student_batch_locks
 from .utils import (
     calculate_overdue_amount, send_payment_reminder,
-    generate_fee_report, process_bulk_payment_update
+    generate_fee_report, process_bulk_payment_update,
+    get_dashboard_stats
 )
+from .rollups import monthly_collections
+from .assignments import assign_fee_to_group, bulk_assign_fee, target_student_ids
+from .payments import create_payment, save_payment
+from userss.export_engine import export_response
 
 User = get_user_model()
 
@@ -36,54 +45,17 @@ def check_admin_permission(user):
 
 # ==================== ADMIN DASHBOARD ====================
 
-# fees/views.py - Updated admin_fees_dashboard with automatic execution
-
 @login_required
 def admin_fees_dashboard(request):
-    """Main fees management dashboard with automatic daily tasks"""
+    """Main fees management dashboard (daily tasks run in the scheduler, see scheduler/tasks.py)"""
     if not check_admin_permission(request.user):
         messages.error(request, "You don't have permission to access fees management")
         return redirect('admin_dashboard')
     
-    # Auto-run daily tasks when dashboard is accessed
-    tasks_auto_run = False
-    daily_task_info = None
-    
-    try:
-        # Check and run daily tasks automatically
-        tasks_auto_run, daily_task_info = auto_run_daily_tasks()
-        if tasks_auto_run:
-            messages.success(request, "Daily tasks completed automatically!")
-    except Exception as e:
-        logger.error(f"Auto daily tasks failed: {e}")
-    
-    # Get dashboard statistics
-    today = date.today()
-    
-    # Total statistics
-    total_assignments = StudentFeeAssignment.objects.filter(status='active').count()
-    total_amount = StudentFeeAssignment.objects.filter(status='active').aggregate(
-        total=Sum('total_amount'))['total'] or 0
-    collected_amount = StudentFeeAssignment.objects.filter(status='active').aggregate(
-        collected=Sum('amount_paid'))['collected'] or 0
-    pending_amount = total_amount - collected_amount
-    
-    # Today's collections
-    today_collections = PaymentRecord.objects.filter(
-        payment_date=today,
-        status='completed'
-    ).aggregate(total=Sum('amount'))['total'] or 0
-    
-    # Overdue payments
-    overdue_emis = EMISchedule.objects.filter(
-        status='overdue',
-        due_date__lt=today
-    ).count()
-    
-    overdue_amount = EMISchedule.objects.filter(
-        status='overdue',
-        due_date__lt=today
-    ).aggregate(total=Sum('amount'))['total'] or 0
+    # Get dashboard statistics (collections come from the rollup table)
+    stats = get_dashboard_stats()
+    total_amount = stats['total_assigned']
+    collected_amount = stats['total_collected']
     
     # Recent payments
     recent_payments = PaymentRecord.objects.filter(
@@ -93,146 +65,34 @@ def admin_fees_dashboard(request):
         'fee_assignment__course'
     ).order_by('-payment_date')[:10]
     
-    # Students with locked courses
-    locked_students = StudentFeeAssignment.objects.filter(
-        is_course_locked=True
-    ).count()
-    
-    # Monthly collection chart data (last 6 months)
-    monthly_data = []
-    for i in range(6):
-        month_date = today.replace(day=1) - timedelta(days=i*30)
-        month_collection = PaymentRecord.objects.filter(
-            payment_date__year=month_date.year,
-            payment_date__month=month_date.month,
-            status='completed'
-        ).aggregate(total=Sum('amount'))['total'] or 0
-        
-        monthly_data.append({
-            'month': month_date.strftime('%b %Y'),
-            'amount': float(month_collection)
-        })
+    # Monthly collection chart data (last 6 calendar months)
+    monthly_data = monthly_collections(6)
     
-    monthly_data.reverse()
-    
-    # Get daily task information if not already fetched
-    if not daily_task_info:
-        daily_task_info = get_daily_task_info()
+    # Daily task results (written by the scheduler)
+    daily_task_info = get_daily_task_info()
     
     # Recent system activity
     recent_activity = get_recent_system_activity()
     
     context = {
-        'total_assignments': total_assignments,
+        'total_assignments': stats['active_assignments'],
         'total_amount': total_amount,
         'collected_amount': collected_amount,
-        'pending_amount': pending_amount,
+        'pending_amount': stats['total_pending'],
         'collection_percentage': round((collected_amount / total_amount * 100) if total_amount > 0 else 0, 1),
-        'today_collections': today_collections,
-        'overdue_emis': overdue_emis,
-        'overdue_amount': overdue_amount,
+        'today_collections': stats['today_collections'],
+        'overdue_emis': stats['overdue_emis'],
+        'overdue_amount': stats['overdue_amount'],
         'recent_payments': recent_payments,
-        'locked_students': locked_students,
+        'locked_students': stats['locked_assignments'],
         'monthly_data': json.dumps(monthly_data),
         'daily_task_info': daily_task_info,
         'recent_activity': recent_activity,
-        'tasks_auto_run': tasks_auto_run,
     }
     
     return render(request, 'fees/admin_dashboard.html', context)
 
 
-def auto_run_daily_tasks():
-    """Automatically run daily tasks if not done today"""
-    from .models import DailyTaskLog
-    from .utils import check_and_lock_courses, auto_unlock_courses, calculate_late_fees_for_overdue, send_payment_reminders
-    
-    today = date.today()
-    
-    # Check if already run today
-    existing_log = DailyTaskLog.objects.filter(
-        run_date=today,
-        status='completed'
-    ).first()
-    
-    if existing_log:
-        # Already completed today, just return the info
-        return False, {
-            'last_run_time': existing_log.run_time,
-            'courses_locked_today': existing_log.courses_locked,
-            'courses_unlocked_today': existing_log.courses_unlocked,
-            'late_fees_applied_today': existing_log.late_fees_applied,
-            'reminders_sent_today': existing_log.reminders_sent,
-            'status': existing_log.status,
-            'error_message': existing_log.error_message
-        }
-    
-    # Create new log entry
-    task_log = DailyTaskLog.objects.create(
-        run_date=today,
-        status='running'
-    )
-    
-    try:
-        logger.info("Starting automatic daily fee tasks...")
-        
-        # 1. Lock courses for overdue payments
-        locked_count = check_and_lock_courses()
-        task_log.courses_locked = locked_count
-        
-        # 2. Auto-unlock courses
-        unlocked_count = auto_unlock_courses()
-        task_log.courses_unlocked = unlocked_count
-        
-        # 3. Calculate late fees
-        late_fee_result = calculate_late_fees_for_overdue()
-        task_log.late_fees_applied = late_fee_result.get('processed_count', 0)
-        
-        # 4. Send reminders
-        reminder_count = send_payment_reminders()
-        task_log.reminders_sent = reminder_count
-        
-        # 5. Calculate total overdue amount
-        overdue_amount = EMISchedule.objects.filter(
-            status='overdue',
-            due_date__lt=today
-        ).aggregate(total=Sum('amount'))['total'] or 0
-        task_log.total_overdue_amount = overdue_amount
-        
-        # Mark as completed
-        task_log.status = 'completed'
-        task_log.save()
-        
-        logger.info(f"Automatic daily tasks completed: {locked_count} locked, {unlocked_count} unlocked, {task_log.late_fees_applied} late fees, {reminder_count} reminders")
-        
-        return True, {
-            'last_run_time': task_log.run_time,
-            'courses_locked_today': locked_count,
-            'courses_unlocked_today': unlocked_count,
-            'late_fees_applied_today': task_log.late_fees_applied,
-            'reminders_sent_today': reminder_count,
-            'status': 'completed',
-            'error_message': None
-        }
-        
-    except Exception as e:
-        task_log.status = 'failed'
-        task_log.error_message = str(e)
-        task_log.save()
-        
-        logger.error(f"Automatic daily tasks failed: {str(e)}")
-        
-        return False, {
-            'last_run_time': task_log.run_time,
-            'courses_locked_today': 0,
-            'courses_unlocked_today': 0,
-            'late_fees_applied_today': 0,
-            'reminders_sent_today': 0,
-            'status': 'failed',
-            'error_message': str(e)
-        }
-    
-
 # fees/views.py में ये functions add करें
 
 def get_daily_task_info():
@@ -563,8 +423,42 @@ def assign_fee_to_student(request):
     return render(request, 'fees/student_fee_assignment_form.html', context)
 
 
+@login_required
+@require_http_methods(["POST"])
+def bulk_assign_fee_api(request):
+    """
+    Assign a fee structure to every active student of a course / batch.
 
-
+    POST (form or JSON): fee_structure, course | batch, payment_start_date,
+    total_amount (optional). Existing assignments are skipped.
+    """
+    if not check_admin_permission(request.user):
+        return JsonResponse({'success': False, 'message': 'Access denied'}, status=403)
+    
+    data = request.POST
+    if request.content_type == 'application/json':
+        try:
+            data = json.loads(request.body or '{}')
+        except ValueError:
+            return JsonResponse({'success': False, 'message': 'Invalid JSON'}, status=400)
+    
+    form = BulkFeeAssignmentForm(data)
+    if not form.is_valid():
+        return JsonResponse({'success': False, 'errors': form.errors}, status=400)
+    
+    result = assign_fee_to_group(
+        form.cleaned_data['fee_structure'],
+        course=form.cleaned_data['course'],
+        batch=form.cleaned_data['batch'],
+        assigned_by=request.user,
+        payment_start_date=form.cleaned_data['payment_start_date'],
+        total_amount=form.cleaned_data['total_amount'],
+    )
+    return JsonResponse({
+        'success': True,
+        'message': f"Fee assigned to {result['created']} students ({result['skipped']} already assigned)",
+        **result,
+    })
 
 
 @login_required
@@ -671,8 +565,12 @@ def record_payment(request):
         if form.is_valid():
             payment = form.save(commit=False)
             payment.recorded_by = request.user
-            payment.save()
-            messages.success(request, f"Payment of ${payment.amount} recorded successfully!")
+            payment.idempotency_key = request.POST.get('idempotency_key') or None
+            payment, created = save_payment(payment)
+            if created:
+                messages.success(request, f"Payment of ${payment.amount} recorded successfully!")
+            else:
+                messages.info(request, f"Payment of ${payment.amount} was already recorded (duplicate submit ignored)")
             return redirect('fees:manage_student_fees')
         else:
             # Debug form errors
@@ -691,6 +589,8 @@ def record_payment(request):
     context = {
         'form': form,
         'title': 'Record Payment',
+        # One token per rendered form - a double submit reuses it
+        'idempotency_key': request.POST.get('idempotency_key') or uuid.uuid4().hex,
     }
     
     return render(request, 'fees/payment_form.html', context)
@@ -1039,7 +939,8 @@ def quick_payment(request, assignment_id):
             
             if amount > 0:
                 # Create payment record
-                payment = PaymentRecord.objects.create(
+                payment, created = create_payment(
+                    idempotency_key=request.POST.get('idempotency_key'),
                     fee_assignment=assignment,
                     amount=amount,
                     payment_method=payment_method,
@@ -1050,7 +951,10 @@ def quick_payment(request, assignment_id):
                     recorded_by=request.user
                 )
                 
-                messages.success(request, f"Payment of ${amount} recorded successfully!")
+                if created:
+                    messages.success(request, f"Payment of ${amount} recorded successfully!")
+                else:
+                    messages.info(request, f"Payment of ${payment.amount} was already recorded (duplicate submit ignored)")
                 return redirect('fees:student_fee_detail', assignment_id=assignment.id)
             else:
                 messages.error(request, "Invalid payment amount")
@@ -1062,6 +966,7 @@ def quick_payment(request, assignment_id):
         'form': form,
         'assignment': assignment,
         'title': f'Quick Payment - {assignment.student.get_full_name()}',
+        'idempotency_key': request.POST.get('idempotency_key') or uuid.uuid4().hex,
     }
     
     return render(request, 'fees/quick_payment_form.html', context)
@@ -1146,7 +1051,12 @@ def overdue_payments(request):
     ).order_by('due_date')
     
     # Update status to overdue
+    affected_students = list(
+        overdue_emis.filter(status='pending').order_by()
+        .values_list('fee_assignment__student_id', flat=True).distinct()
+    )
     overdue_emis.update(status='overdue')
+    recompute_student_batch_locks(affected_students)
     
     # Group by student for better display
     student_overdue = {}
@@ -1560,99 +1470,34 @@ def run_daily_fee_tasks(request):
 
 @login_required
 def export_payment_report(request):
-    """Export payment report to CSV"""
+    """Export payment report (CSV / XLSX, streamed - big ones run in background)"""
     if not check_admin_permission(request.user):
         messages.error(request, "Access denied")
         return redirect('admin_dashboard')
-    
-    import csv
-    from django.http import HttpResponse
-    
-    # Get parameters from request
-    date_from = request.GET.get('date_from')
-    date_to = request.GET.get('date_to')
-    course_id = request.GET.get('course')
-    
-    # Build queryset
-    payments = PaymentRecord.objects.filter(status='completed').select_related(
-        'fee_assignment__student',
-        'fee_assignment__course'
+
+    params = {
+        'date_from': request.GET.get('date_from', ''),
+        'date_to': request.GET.get('date_to', ''),
+        'course': request.GET.get('course', ''),
+    }
+    return export_response(
+        request, 'fees.payments', params,
+        file_format=request.GET.get('format', 'csv'),
+        fallback_url=reverse('fees:admin_fees_dashboard'),
     )
-    
-    if date_from:
-        payments = payments.filter(payment_date__gte=date_from)
-    if date_to:
-        payments = payments.filter(payment_date__lte=date_to)
-    if course_id:
-        payments = payments.filter(fee_assignment__course_id=course_id)
-    
-    # Create CSV response
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = f'attachment; filename="payment_report_{date.today()}.csv"'
-    
-    writer = csv.writer(response)
-    writer.writerow([
-        'Date', 'Student Name', 'Student Email', 'Course', 
-        'Amount', 'Payment Method', 'Transaction ID', 'Status'
-    ])
-    
-    for payment in payments:
-        writer.writerow([
-            payment.payment_date,
-            payment.fee_assignment.student.get_full_name(),
-            payment.fee_assignment.student.email,
-            payment.fee_assignment.course.title,
-            payment.amount,
-            payment.get_payment_method_display(),
-            payment.transaction_id,
-            payment.get_status_display()
-        ])
-    
-    return response
 
 @login_required
 def export_overdue_report(request):
-    """Export overdue payments report to CSV"""
+    """Export overdue payments report (CSV / XLSX)"""
     if not check_admin_permission(request.user):
         messages.error(request, "Access denied")
         return redirect('admin_dashboard')
-    
-    import csv
-    from django.http import HttpResponse
-    
-    # Get overdue EMIs
-    overdue_emis = EMISchedule.objects.filter(
-        status='overdue',
-        due_date__lt=date.today()
-    ).select_related(
-        'fee_assignment__student',
-        'fee_assignment__course'
-    ).order_by('due_date')
-    
-    # Create CSV response
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = f'attachment; filename="overdue_report_{date.today()}.csv"'
-    
-    writer = csv.writer(response)
-    writer.writerow([
-        'Student Name', 'Student Email', 'Course', 'EMI Number',
-        'Amount', 'Due Date', 'Days Overdue', 'Late Fee Applied'
-    ])
-    
-    for emi in overdue_emis:
-        days_overdue = (date.today() - emi.due_date).days
-        writer.writerow([
-            emi.fee_assignment.student.get_full_name(),
-            emi.fee_assignment.student.email,
-            emi.fee_assignment.course.title,
-            emi.installment_number,
-            emi.amount,
-            emi.due_date,
-            days_overdue,
-            emi.late_fee_applied
-        ])
-    
-    return response
+
+    return export_response(
+        request, 'fees.overdue', {},
+        file_format=request.GET.get('format', 'csv'),
+        fallback_url=reverse('fees:admin_fees_dashboard'),
+    )
 
 # ==================== API ENDPOINTS FOR AJAX ====================
 
@@ -2134,6 +1979,8 @@ def handle_unlock_course(request, reason):
             override_reason=reason,
             override_until=datetime.strptime(unlock_until, '%Y-%m-%d').date() if unlock_until else None
         )
+        # update() sends no signals - refresh the stored batch lock state
+        recompute_student_batch_locks([student.id])
         
         return JsonResponse({
             'success': True,
@@ -2351,26 +2198,23 @@ def bulk_course_action(request):
 def bulk_lock_course(course, reason, admin_user):
     """Lock course for all enrolled students"""
     try:
-        enrollments = Enrollment.objects.filter(course=course, is_active=True)
-        count = 0
-        
-        for enrollment in enrollments:
-            fee_assignment, created = StudentFeeAssignment.objects.get_or_create(
-                student=enrollment.student,
-                course=course,
-                defaults={
-                    'fee_structure_id': 1,
-                    'total_amount': course.price,
-                    'amount_paid': 0,
-                    'amount_pending': course.price,
-                    'payment_start_date': date.today(),
-                    'assigned_by': admin_user
-                }
+        student_ids = target_student_ids(course)
+        missing = set(student_ids) - set(StudentFeeAssignment.objects.filter(
+            course=course, student_id__in=student_ids
+        ).values_list('student_id', flat=True))
+        if missing:
+            # Students without a fee assignment get the default plan first
+            bulk_assign_fee(
+                FeeStructure.objects.get(pk=1), course, missing,
+                assigned_by=admin_user, total_amount=course.price,
             )
-            
-            if not fee_assignment.is_course_locked:
-                fee_assignment.lock_course()
-                count += 1
+        
+        to_lock = StudentFeeAssignment.objects.filter(
+            course=course, student_id__in=student_ids, is_course_locked=False
+        )
+        locked_ids = list(to_lock.values_list('student_id', flat=True))
+        count = to_lock.update(is_course_locked=True, locked_at=timezone.now(), updated_at=timezone.now())
+        recompute_student_batch_locks(locked_ids)
         
         return JsonResponse({
             'success': True,
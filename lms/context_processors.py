@@ -44,9 +44,9 @@ def instructor_permissions(request):
     
     if request.user.is_authenticated and request.user.role == 'instructor':
         try:
-            # Get instructor's permissions
-            permissions = request.user.get_instructor_permissions()
-            permission_codes = [p.permission.code for p in permissions]
+            # Get instructor's permissions (shared per-request snapshot)
+            from userss.permissions import get_request_permission_codes
+            permission_codes = sorted(get_request_permission_codes(request))
             
             context.update({
                 'instructor_permissions': permission_codes,
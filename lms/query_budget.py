@@ -0,0 +1,200 @@
+# lms/query_budget.py
+"""
+Opt-in per-view query instrumentation.
+
+``QueryBudgetMiddleware`` wraps every request in ``connection.execute_wrapper``
+and records, per resolved URL name: query count, DB time, duplicate query
+fingerprints (N+1 patterns) and total response time. Records go into an
+in-process ring buffer (``QUERY_INSTRUMENTATION_BUFFER_SIZE``) that the
+superadmin "Query Report" page aggregates. Views listed in ``QUERY_BUDGETS``
+(or ``QUERY_BUDGET_DEFAULT``) log a warning when a request goes over budget.
+
+Enable with ``QUERY_INSTRUMENTATION_ENABLED = True`` - the middleware removes
+itself otherwise. The buffer is per worker process.
+"""
+
+import logging
+import re
+import threading
+import time
+from collections import Counter, deque
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+BUFFER_SIZE = getattr(settings, "QUERY_INSTRUMENTATION_BUFFER_SIZE", 500)
+# Fingerprints repeated at least this often in one request are reported
+DUPLICATE_THRESHOLD = 2
+TOP_DUPLICATES = 5
+
+_records = deque(maxlen=BUFFER_SIZE)
+_records_lock = threading.Lock()
+
+_IN_LIST_RE = re.compile(r"\(\s*(?:%s|\?)(?:\s*,\s*(?:%s|\?))*\s*\)")
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r"\b\d+(?:\.\d+)?\b")
+_SPACE_RE = re.compile(r"\s+")
+
+
+def is_enabled():
+    return getattr(settings, "QUERY_INSTRUMENTATION_ENABLED", False)
+
+
+def get_budget(view_name, url_name):
+    """Query budget for a view (namespaced name first, then bare url name)"""
+    budgets = getattr(settings, "QUERY_BUDGETS", {})
+    if view_name in budgets:
+        return budgets[view_name]
+    if url_name in budgets:
+        return budgets[url_name]
+    return getattr(settings, "QUERY_BUDGET_DEFAULT", None)
+
+
+def fingerprint(sql):
+    """SQL with literals and IN lists collapsed, so N+1 loops share one key"""
+    sql = _IN_LIST_RE.sub("(...)", sql)
+    sql = _STRING_RE.sub("?", sql)
+    sql = _NUMBER_RE.sub("?", sql)
+    return _SPACE_RE.sub(" ", sql).strip()
+
+
+class QueryRecorder:
+    """``execute_wrapper`` callable collecting one request's queries"""
+
+    def __init__(self):
+        self.count = 0
+        self.db_time = 0.0
+        self.fingerprints = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - start
+            self.count += 1
+            self.fingerprints[fingerprint(sql)] += 1
+
+    @property
+    def duplicates(self):
+        """Queries that repeated an earlier fingerprint"""
+        return sum(n - 1 for n in self.fingerprints.values() if n >= DUPLICATE_THRESHOLD)
+
+    def top_duplicates(self, limit=TOP_DUPLICATES):
+        return [
+            (sql, n) for sql, n in self.fingerprints.most_common(limit)
+            if n >= DUPLICATE_THRESHOLD
+        ]
+
+
+class QueryBudgetMiddleware:
+    def __init__(self, get_response):
+        if not is_enabled():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        recorder = QueryRecorder()
+        start = time.perf_counter()
+        with connection.execute_wrapper(recorder):
+            response = self.get_response(request)
+        duration = time.perf_counter() - start
+
+        match = getattr(request, "resolver_match", None)
+        if match is not None:
+            record_request(request, response, match, recorder, duration)
+        return response
+
+
+def record_request(request, response, match, recorder, duration):
+    view_name = match.view_name
+    budget = get_budget(view_name, match.url_name)
+    over_budget = budget is not None and recorder.count > budget
+    top_duplicates = recorder.top_duplicates()
+
+    record = {
+        "timestamp": timezone.now(),
+        "view_name": view_name,
+        "path": request.path,
+        "method": request.method,
+        "status": response.status_code,
+        "queries": recorder.count,
+        "duplicates": recorder.duplicates,
+        "db_ms": recorder.db_time * 1000,
+        "duration_ms": duration * 1000,
+        "budget": budget,
+        "over_budget": over_budget,
+        "top_duplicates": top_duplicates,
+    }
+    with _records_lock:
+        _records.append(record)
+
+    if over_budget:
+        worst = f" | most repeated ({top_duplicates[0][1]}x): {top_duplicates[0][0][:200]}" if top_duplicates else ""
+        logger.warning(
+            f"⚠️ Query budget exceeded: {view_name} ran {recorder.count} queries "
+            f"(budget {budget}, {recorder.duplicates} duplicates, "
+            f"{recorder.db_time * 1000:.1f} ms DB) {request.method} {request.path}{worst}"
+        )
+    return record
+
+
+# ==================== REPORT ====================
+
+def get_records():
+    with _records_lock:
+        return list(_records)
+
+
+def clear_records():
+    with _records_lock:
+        _records.clear()
+
+
+def get_view_stats(records=None):
+    """Per-view aggregates of the buffer, worst average query count first"""
+    records = get_records() if records is None else records
+    stats = {}
+    for record in records:
+        row = stats.get(record["view_name"])
+        if row is None:
+            row = stats[record["view_name"]] = {
+                "view_name": record["view_name"],
+                "budget": record["budget"],
+                "requests": 0,
+                "total_queries": 0,
+                "max_queries": 0,
+                "total_duplicates": 0,
+                "total_db_ms": 0.0,
+                "total_duration_ms": 0.0,
+                "max_duration_ms": 0.0,
+                "violations": 0,
+                "duplicate_fingerprints": Counter(),
+            }
+        row["requests"] += 1
+        row["total_queries"] += record["queries"]
+        row["max_queries"] = max(row["max_queries"], record["queries"])
+        row["total_duplicates"] += record["duplicates"]
+        row["total_db_ms"] += record["db_ms"]
+        row["total_duration_ms"] += record["duration_ms"]
+        row["max_duration_ms"] = max(row["max_duration_ms"], record["duration_ms"])
+        row["violations"] += record["over_budget"]
+        for sql, n in record["top_duplicates"]:
+            row["duplicate_fingerprints"][sql] = max(row["duplicate_fingerprints"][sql], n)
+
+    rows = []
+    for row in stats.values():
+        requests = row["requests"]
+        row["avg_queries"] = row["total_queries"] / requests
+        row["avg_duplicates"] = row["total_duplicates"] / requests
+        row["avg_db_ms"] = row["total_db_ms"] / requests
+        row["avg_duration_ms"] = row["total_duration_ms"] / requests
+        row["top_duplicates"] = row.pop("duplicate_fingerprints").most_common(TOP_DUPLICATES)
+        rows.append(row)
+
+    rows.sort(key=lambda r: r["avg_queries"], reverse=True)
+    return rows
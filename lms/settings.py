@@ -53,6 +53,7 @@ INSTALLED_APPS = [
     "attendance",
     'certificates',
     'tinymce',
+    'scheduler',
 ]
 
 TINYMCE_DEFAULT_CONFIG = {
@@ -72,6 +73,7 @@ CKEDITOR_CONFIGS = {
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    "lms.query_budget.QueryBudgetMiddleware",  # No-op unless QUERY_INSTRUMENTATION_ENABLED
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -120,6 +122,22 @@ DATABASES = {
 }
 
 
+# ==================== CACHE ====================
+# LocMemCache by default; point CACHE_BACKEND/CACHE_LOCATION at a shared cache
+# (Redis/Memcached) in production so invalidations reach every worker.
+CACHES = {
+    "default": {
+        "BACKEND": os.getenv(
+            "CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"
+        ),
+        "LOCATION": os.getenv("CACHE_LOCATION", "lms-default"),
+    }
+}
+
+# Seconds an instructor's permission snapshot stays cached
+INSTRUCTOR_PERMISSION_CACHE_TIMEOUT = 300
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 AUTH_PASSWORD_VALIDATORS = [
@@ -225,6 +243,21 @@ LOGGING = {
             "level": "INFO",
             "propagate": True,
         },
+        "lms.query_budget": {
+            "handlers": ["console"],
+            "level": "WARNING",
+            "propagate": False,
+        },
+        "attendance": {
+            "handlers": ["console"],
+            "level": "INFO",
+            "propagate": False,
+        },
+        "zoom": {
+            "handlers": ["console"],
+            "level": "INFO",
+            "propagate": False,
+        },
     },
 }
 
@@ -232,6 +265,66 @@ LOGGING = {
 EMAIL_DAILY_LIMIT_DEFAULT = 5
 EMAIL_DAILY_LIMIT_MAX = 50
 
+# Outbound email queue (userss.email_queue / manage.py process_email_queue)
+EMAIL_QUEUE_BATCH_SIZE = 100  # Emails per SMTP connection
+EMAIL_QUEUE_MAX_ATTEMPTS = 5
+EMAIL_QUEUE_RETRY_BASE_SECONDS = 60  # Backoff: 1, 2, 4, 8 ... minutes
+
+# Query instrumentation (lms.query_budget) - superadmin page: /query-report/
+QUERY_INSTRUMENTATION_ENABLED = False
+QUERY_INSTRUMENTATION_BUFFER_SIZE = 500  # Last N requests kept per process
+QUERY_BUDGET_DEFAULT = None  # Budget for views not listed below (None = no budget)
+QUERY_BUDGETS = {
+    "student_courses": 20,
+    "browse_courses": 20,
+    "attendance:student_my_attendance": 25,
+}
+
+# Student dashboard / sidebar counters (userss.student_stats)
+STUDENT_STATS_CACHE_TIMEOUT = 300
+
+# Student tracking middleware (courses.activity)
+STUDENT_ACTIVITY_CACHE_TIMEOUT = 300  # Cached login-log / device state
+STUDENT_ACTIVITY_FLUSH_SECONDS = 60  # DeviceSession.last_login write-behind interval
+
+# Scheduled tasks (scheduler.runner / manage.py run_scheduler)
+SCHEDULER_CATCH_UP_DAYS = 7  # Daily tasks: max missed days re-run after downtime
+SCHEDULER_RUN_RETENTION_DAYS = 30  # TaskRun history kept
+
+# Certificate PDF pipeline (certificates.pipeline / manage.py process_certificate_jobs)
+CERTIFICATE_RENDER_WORKERS = None  # None = one process per CPU core
+CERTIFICATE_RENDER_CHUNK_SIZE = 50  # Progress is saved after every chunk
+
+# Server-side exam timer (exams.deadlines) - sweeper runs as scheduled task exams.auto_submit
+EXAM_DEADLINE_GRACE_SECONDS = 30  # Late autosaves accepted / sweep delay after the deadline
+EXAM_SWEEP_BATCH_SIZE = 500
+EXAM_ANSWER_KEY_CACHE_TIMEOUT = 60 * 60  # Cached answer key per exam (dropped on question edits)
+EXAM_PAPER_CACHE_TIMEOUT = 60 * 60  # Student-facing exam paper (versioned, bumped on question edits)
+EXAM_GRADE_BATCH_SIZE = 1000  # Attempt ids per UPDATE of exams.grading (regrade_exam)
+EXAM_ANALYTICS_CACHE_TIMEOUT = 15 * 60  # Item statistics per exam (dropped when attempts get graded)
+
+# Attendance - auto-absent job (attendance.utils, scheduled task attendance.mark_absent), QR check-in (attendance.checkin)
+# and the per-student AttendanceSummary rollup (attendance.summary)
+ATTENDANCE_ABSENT_BATCH_SIZE = 1000  # Absent rows per bulk INSERT
+ATTENDANCE_CHECKIN_CACHE_TIMEOUT = 10 * 60  # QR check-in: cached session metadata + enrolled ids
+ATTENDANCE_SUMMARY_BATCH_SIZE = 1000  # AttendanceSummary rows per recount upsert
+
+# Zoom API client (zoom.client) - shared token, pooled connections, retries on 429 / 5xx
+ZOOM_API_BASE_URL = "https://api.zoom.us/v2"  # Point both URLs at a local stub server for testing
+ZOOM_OAUTH_TOKEN_URL = "https://zoom.us/oauth/token"
+ZOOM_API_TIMEOUT = 30  # Seconds per HTTP request
+ZOOM_POOL_SIZE = 10  # Keep-alive connections per host
+ZOOM_MAX_RETRIES = 3
+ZOOM_BACKOFF_BASE_SECONDS = 1  # Backoff: 1, 2, 4 ... seconds (when Zoom sends no Retry-After)
+ZOOM_MAX_RETRY_WAIT_SECONDS = 30  # Longer Retry-After (daily quota) -> give up instead of waiting
+ZOOM_TOKEN_REFRESH_MARGIN = 5 * 60  # Refresh the cached token this long before it expires
+ZOOM_METRICS_BUFFER_SIZE = 500  # Last N Zoom calls kept per process for call_summary()
+
+# CSV / XLSX exports (userss.export_engine) - big ones become background ExportJobs
+EXPORT_CHUNK_SIZE = 2000  # Rows fetched per DB round trip
+EXPORT_BACKGROUND_THRESHOLD = 20000  # More rows than this -> background job + email
+EXPORT_FILE_RETENTION_DAYS = 7  # Background export files kept in MEDIA_ROOT/exports/
+
 # File Upload Settings
 FILE_UPLOAD_MAX_MEMORY_SIZE = 50 * 1024 * 1024  # 50MB
 DATA_UPLOAD_MAX_MEMORY_SIZE = 100 * 1024 * 1024  # 100MB
@@ -240,8 +333,12 @@ DATA_UPLOAD_MAX_MEMORY_SIZE = 100 * 1024 * 1024  # 100MB
 # lms/settings.py - Find CRONJOBS (or add if not exists)
 
 CRONJOBS = [
-    # ✅ Check every 5 minutes for ended sessions
-    ("*/5 * * * *", "attendance.utils.mark_absent_for_ended_sessions"),
+    # ✅ Scheduled tasks (fee daily tasks, auto-absent, exam auto-submit, Zoom recordings, export jobs) - see scheduler/tasks.py
+    ("* * * * *", "scheduler.runner.run_due_tasks"),
+    # ✅ Drain the outbound email queue every minute
+    ("* * * * *", "userss.email_queue.process_email_queue"),
+    # ✅ Render PDFs of pending certificate issue jobs
+    ("* * * * *", "certificates.pipeline.process_certificate_jobs"),
 ]
 
 # ✅ Cron job settings
@@ -0,0 +1,21 @@
+# scheduler/admin.py
+
+from django.contrib import admin
+from .models import TaskLease, TaskRun
+
+
+@admin.register(TaskLease)
+class TaskLeaseAdmin(admin.ModelAdmin):
+    list_display = ['name', 'owner', 'expires_at', 'last_started_at', 'last_success_at', 'last_run_date']
+    search_fields = ['name', 'owner']
+    readonly_fields = ['last_started_at', 'last_finished_at', 'last_success_at']
+
+
+@admin.register(TaskRun)
+class TaskRunAdmin(admin.ModelAdmin):
+    list_display = ['task_name', 'run_date', 'status', 'started_at', 'duration_seconds', 'owner']
+    list_filter = ['status', 'task_name', 'started_at']
+    search_fields = ['task_name', 'error_message']
+    readonly_fields = ['task_name', 'run_date', 'status', 'owner', 'started_at', 'finished_at',
+                       'duration_seconds', 'result', 'error_message']
+    date_hierarchy = 'started_at'
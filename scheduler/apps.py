@@ -0,0 +1,10 @@
+from django.apps import AppConfig
+
+
+class SchedulerConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'scheduler'
+    verbose_name = 'Scheduled Tasks'
+
+    def ready(self):
+        import scheduler.tasks  # Registers the scheduled jobs
@@ -0,0 +1,81 @@
+# management/commands/run_scheduler.py
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from scheduler.models import TaskLease
+from scheduler.registry import get_tasks
+from scheduler.runner import run_due_tasks
+
+
+class Command(BaseCommand):
+    help = 'Run due scheduled tasks (fee daily tasks, auto-absent, Zoom recording sync) under a DB lease'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--task',
+            action='append',
+            dest='tasks',
+            help='Only run this task (repeatable)',
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Run even if not due (a lease held elsewhere is still respected)',
+        )
+        parser.add_argument(
+            '--list',
+            action='store_true',
+            help='Show registered tasks and their lease state, then exit',
+        )
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Keep running and check for due tasks (long-lived scheduler)',
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=30.0,
+            help='Seconds to wait between checks in --loop mode',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            tasks = get_tasks(options['tasks'])
+        except KeyError as e:
+            raise CommandError(e.args[0])
+
+        if options['list']:
+            leases = {lease.name: lease for lease in TaskLease.objects.all()}
+            for task in tasks:
+                lease = leases.get(task.name)
+                state = 'never run'
+                if lease:
+                    state = (
+                        f"last start: {timezone.localtime(lease.last_started_at):%Y-%m-%d %H:%M}"
+                        if lease.last_started_at else 'never started'
+                    )
+                    if lease.last_run_date:
+                        state += f", last day: {lease.last_run_date}"
+                    if lease.is_held:
+                        state += f", RUNNING on {lease.owner}"
+                self.stdout.write(f"{task!r} - {state}")
+            return
+
+        names = [task.name for task in tasks]
+        while True:
+            runs = run_due_tasks(names=names, force=options['force'])
+            for run in runs:
+                style = self.style.SUCCESS if run.status == 'success' else self.style.ERROR
+                day = f" [{run.run_date}]" if run.run_date else ''
+                detail = run.error_message if run.status == 'failed' else run.result
+                self.stdout.write(style(f"{run.task_name}{day}: {run.status} in {run.duration_seconds}s - {detail}"))
+            if not runs and not options['loop']:
+                self.stdout.write('No tasks due')
+
+            if not options['loop']:
+                break
+            options['force'] = False
+            time.sleep(options['sleep'])
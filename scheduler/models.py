@@ -0,0 +1,64 @@
+# scheduler/models.py
+from django.db import models
+
+
+class TaskLease(models.Model):
+    """
+    One row per registered task: the DB lease that prevents two schedulers
+    (cron + a --loop worker, two servers...) from running it at the same
+    time, plus the bookkeeping used to decide when it is due again.
+    """
+
+    name = models.CharField(max_length=100, unique=True)
+
+    # Lease - held while owner is set and expires_at is in the future
+    owner = models.CharField(max_length=100, blank=True)
+    expires_at = models.DateTimeField(null=True, blank=True)
+
+    last_started_at = models.DateTimeField(null=True, blank=True)
+    last_finished_at = models.DateTimeField(null=True, blank=True)
+    last_success_at = models.DateTimeField(null=True, blank=True)
+    # Daily tasks: last date that ran successfully (catch-up starts after it)
+    last_run_date = models.DateField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['name']
+
+    def __str__(self):
+        return self.name
+
+    @property
+    def is_held(self):
+        from django.utils import timezone
+        return bool(self.owner) and self.expires_at is not None and self.expires_at > timezone.now()
+
+
+class TaskRun(models.Model):
+    """Metrics of one scheduled task run"""
+
+    STATUS_CHOICES = [
+        ('running', 'Running'),
+        ('success', 'Success'),
+        ('failed', 'Failed'),
+    ]
+
+    task_name = models.CharField(max_length=100, db_index=True)
+    run_date = models.DateField(null=True, blank=True, help_text="Date processed (daily tasks only)")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='running')
+    owner = models.CharField(max_length=100, blank=True)
+
+    started_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    duration_seconds = models.FloatField(default=0)
+
+    result = models.JSONField(default=dict, blank=True)
+    error_message = models.TextField(blank=True)
+
+    class Meta:
+        ordering = ['-started_at']
+        indexes = [
+            models.Index(fields=['task_name', '-started_at'], name='taskrun_name_started_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.task_name} - {self.status} ({self.started_at:%Y-%m-%d %H:%M})"
@@ -0,0 +1,52 @@
+# scheduler/registry.py
+"""
+Registry of scheduled tasks.
+
+Two kinds of task:
+
+- interval tasks: ``func()`` runs every ``interval_minutes``
+- daily tasks: ``func(run_date)`` runs once per calendar day (after
+  ``daily_at``). Days missed while no scheduler was running are caught up in
+  order, at most ``catch_up_days`` back.
+"""
+
+from datetime import timedelta
+
+TASKS = {}
+
+
+class ScheduledTask:
+    def __init__(self, name, func, interval_minutes=None, daily_at=None,
+                 catch_up_days=0, lease_seconds=15 * 60, retry_minutes=15):
+        if (interval_minutes is None) == (daily_at is None):
+            raise ValueError(f"Task {name}: set exactly one of interval_minutes / daily_at")
+        self.name = name
+        self.func = func
+        self.interval = timedelta(minutes=interval_minutes) if interval_minutes else None
+        self.daily_at = daily_at
+        self.catch_up_days = catch_up_days
+        self.lease_seconds = lease_seconds
+        # Daily tasks: wait this long before retrying a failed day
+        self.retry_after = timedelta(minutes=retry_minutes)
+
+    @property
+    def is_daily(self):
+        return self.daily_at is not None
+
+    def __repr__(self):
+        schedule = f"daily at {self.daily_at:%H:%M}" if self.is_daily else f"every {self.interval}"
+        return f"<ScheduledTask {self.name} ({schedule})>"
+
+
+def register(name, func, **options):
+    TASKS[name] = ScheduledTask(name, func, **options)
+    return TASKS[name]
+
+
+def get_tasks(names=None):
+    if not names:
+        return list(TASKS.values())
+    unknown = set(names) - set(TASKS)
+    if unknown:
+        raise KeyError(f"Unknown scheduled task(s): {', '.join(sorted(unknown))}")
+    return [TASKS[name] for name in names]
@@ -0,0 +1,181 @@
+# scheduler/runner.py
+"""
+Runs due scheduled tasks under a DB lease.
+
+``run_due_tasks()`` is safe to call from any number of places at once
+(django_crontab every minute, ``manage.py run_scheduler --loop`` on another
+server ...): a task only runs in the process that wins its ``TaskLease`` row
+with a conditional UPDATE, and a lease left behind by a crashed process
+simply expires after ``lease_seconds``.
+"""
+
+import json
+import logging
+import os
+import socket
+import time
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import TaskLease, TaskRun
+from .registry import get_tasks
+
+logger = logging.getLogger(__name__)
+
+RUN_RETENTION_DAYS = getattr(settings, "SCHEDULER_RUN_RETENTION_DAYS", 30)
+
+OWNER_PREFIX = f"{socket.gethostname()}:{os.getpid()}"
+
+
+# ==================== LEASE ====================
+
+def acquire_lease(task, now=None):
+    """Returns the lease token, or None if another process holds the task"""
+    now = now or timezone.now()
+    TaskLease.objects.get_or_create(name=task.name)
+
+    token = f"{OWNER_PREFIX}:{uuid.uuid4().hex[:8]}"
+    acquired = TaskLease.objects.filter(name=task.name).filter(
+        Q(expires_at__isnull=True) | Q(expires_at__lte=now)
+    ).update(owner=token, expires_at=now + timedelta(seconds=task.lease_seconds))
+    return token if acquired else None
+
+
+def extend_lease(task, token):
+    return TaskLease.objects.filter(name=task.name, owner=token).update(
+        expires_at=timezone.now() + timedelta(seconds=task.lease_seconds)
+    )
+
+
+def release_lease(task, token):
+    TaskLease.objects.filter(name=task.name, owner=token).update(
+        owner='', expires_at=None, last_finished_at=timezone.now()
+    )
+
+
+# ==================== DUE CHECKS ====================
+
+def pending_run_dates(task, lease, now):
+    """Dates a daily task still has to process, oldest first"""
+    local_now = timezone.localtime(now)
+    last_due = local_now.date()
+    if local_now.time() < task.daily_at:
+        last_due -= timedelta(days=1)
+
+    if lease.last_run_date is None:
+        # First run ever - nothing to catch up
+        return [last_due]
+
+    first = max(lease.last_run_date + timedelta(days=1), last_due - timedelta(days=task.catch_up_days))
+    return [first + timedelta(days=n) for n in range((last_due - first).days + 1)]
+
+
+def is_due(task, lease, now):
+    if task.is_daily:
+        if not pending_run_dates(task, lease, now):
+            return False
+        # Failed day: don't hammer it every minute
+        return lease.last_started_at is None or now - lease.last_started_at >= task.retry_after
+    return lease.last_started_at is None or now - lease.last_started_at >= task.interval
+
+
+# ==================== RUN ====================
+
+def _json_safe(result):
+    if result is None:
+        return {}
+    if not isinstance(result, dict):
+        result = {'value': result}
+    return json.loads(json.dumps(result, cls=DjangoJSONEncoder))
+
+
+def _run_once(task, token, run_date=None):
+    """Execute the task function once and record a TaskRun"""
+    run = TaskRun.objects.create(task_name=task.name, run_date=run_date, owner=token)
+    started = time.monotonic()
+    try:
+        result = task.func(run_date) if task.is_daily else task.func()
+        run.status = 'success'
+        run.result = _json_safe(result)
+    except Exception as e:
+        logger.exception(f"Scheduled task {task.name} failed")
+        run.status = 'failed'
+        run.error_message = str(e) or e.__class__.__name__
+    run.finished_at = timezone.now()
+    run.duration_seconds = round(time.monotonic() - started, 3)
+    run.save()
+    return run
+
+
+def run_task(task, force=False, now=None):
+    """
+    Run one task if it is due (or ``force``) and the lease is free.
+
+    Returns the list of TaskRun rows created (empty if skipped).
+    """
+    now = now or timezone.now()
+    token = acquire_lease(task, now)
+    if token is None:
+        logger.info(f"Scheduled task {task.name}: lease held elsewhere, skipping")
+        return []
+
+    runs = []
+    try:
+        # Re-read under the lease - another process may have just finished it
+        lease = TaskLease.objects.get(name=task.name)
+        if not force and not is_due(task, lease, now):
+            return runs
+
+        TaskLease.objects.filter(pk=lease.pk).update(last_started_at=now)
+
+        if not task.is_daily:
+            run = _run_once(task, token)
+            runs.append(run)
+            if run.status == 'success':
+                TaskLease.objects.filter(pk=lease.pk).update(last_success_at=run.finished_at)
+            return runs
+
+        run_dates = pending_run_dates(task, lease, now) or [timezone.localtime(now).date()]
+        for run_date in run_dates:
+            extend_lease(task, token)
+            run = _run_once(task, token, run_date)
+            runs.append(run)
+            if run.status != 'success':
+                # Retry this day later, keep later days queued behind it
+                break
+            TaskLease.objects.filter(pk=lease.pk).update(
+                last_run_date=run_date, last_success_at=run.finished_at
+            )
+        return runs
+    finally:
+        release_lease(task, token)
+
+
+def prune_task_runs():
+    cutoff = timezone.now() - timedelta(days=RUN_RETENTION_DAYS)
+    return TaskRun.objects.filter(started_at__lt=cutoff).delete()[0]
+
+
+def run_due_tasks(names=None, force=False):
+    """
+    Run every due registered task (or only ``names``). Returns the TaskRuns.
+
+    Also usable as a django_crontab job.
+    """
+    runs = []
+    for task in get_tasks(names):
+        task_runs = run_task(task, force=force)
+        for run in task_runs:
+            logger.info(
+                f"Scheduled task {run.task_name}{f' [{run.run_date}]' if run.run_date else ''}: "
+                f"{run.status} in {run.duration_seconds}s"
+            )
+        runs.extend(task_runs)
+
+    prune_task_runs()
+    return runs
@@ -0,0 +1,89 @@
+# scheduler/tasks.py
+"""
+Scheduled jobs of the LMS (registered when the app loads).
+
+Each wrapper returns a small JSON-able dict that is stored as the run's
+metrics in ``TaskRun.result``. Raise to mark a run as failed.
+"""
+
+from datetime import time
+
+from django.conf import settings
+
+from .registry import register
+
+CATCH_UP_DAYS = getattr(settings, "SCHEDULER_CATCH_UP_DAYS", 7)
+
+
+def fee_daily_tasks(run_date):
+    """Lock / unlock / late fees / reminders - results also land in DailyTaskLog"""
+    from fees.engine import run_daily_tasks
+
+    task_log, ran = run_daily_tasks(run_date=run_date)
+    return {
+        'ran': ran,
+        'courses_locked': task_log.courses_locked,
+        'courses_unlocked': task_log.courses_unlocked,
+        'late_fees_applied': task_log.late_fees_applied,
+        'reminders_queued': task_log.reminders_sent,
+        'total_overdue_amount': task_log.total_overdue_amount,
+        'phase_timings': task_log.phase_timings,
+    }
+
+
+def mark_absent_for_ended_sessions():
+    from attendance.utils import mark_absent_for_ended_sessions as mark_absent
+
+    return {'marked_absent': mark_absent()}
+
+
+def sync_zoom_recordings():
+    from zoom.utils import sync_zoom_recordings as sync_recordings
+
+    success, message = sync_recordings()
+    if not success:
+        raise RuntimeError(message)
+    return {'message': message}
+
+
+def auto_submit_expired_exams():
+    from exams.deadlines import auto_submit_expired_attempts
+
+    return {'auto_submitted': auto_submit_expired_attempts()}
+
+
+def process_export_jobs():
+    from userss.export_engine import process_export_jobs as process_exports
+
+    return {'jobs_processed': process_exports()}
+
+
+register(
+    'fees.daily_tasks',
+    fee_daily_tasks,
+    daily_at=time(0, 5),
+    catch_up_days=CATCH_UP_DAYS,
+    lease_seconds=60 * 60,
+)
+register(
+    'attendance.mark_absent',
+    mark_absent_for_ended_sessions,
+    interval_minutes=5,
+)
+register(
+    'zoom.sync_recordings',
+    sync_zoom_recordings,
+    interval_minutes=60,
+    lease_seconds=30 * 60,
+)
+register(
+    'exams.auto_submit',
+    auto_submit_expired_exams,
+    interval_minutes=1,
+)
+register(
+    'userss.export_jobs',
+    process_export_jobs,
+    interval_minutes=1,
+    lease_seconds=60 * 60,
+)
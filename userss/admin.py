@@ -4,7 +4,9 @@ from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
 from .models import (
     CustomUser, UserProfile, UserActivityLog,
-    EmailLimitSet, EmailTemplate, EmailLog, DailyEmailSummary, EmailTemplateType
+    EmailLimitSet, EmailTemplate, EmailLog, DailyEmailSummary, EmailTemplateType,
+    OutboundEmail,
+    ExportJob,
     # Removed Course and Enrollment from import
 )
 
@@ -176,6 +178,37 @@ class DailyEmailSummaryAdmin(admin.ModelAdmin):
     def has_change_permission(self, request, obj=None):
         return False
 
+# Outbound Email Queue Admin
+@admin.register(OutboundEmail)
+class OutboundEmailAdmin(admin.ModelAdmin):
+    list_display = ('recipient_email', 'subject_preview', 'source', 'status', 'attempts', 'next_attempt_at', 'sent_at')
+    list_filter = ('status', 'source', 'created_at')
+    search_fields = ('recipient_email', 'subject')
+    readonly_fields = ('created_at', 'sent_at', 'locked_at', 'attempts', 'last_error')
+    actions = ['retry_now']
+    
+    def subject_preview(self, obj):
+        return obj.subject[:40] + '...' if len(obj.subject) > 40 else obj.subject
+    subject_preview.short_description = 'Subject'
+    
+    def retry_now(self, request, queryset):
+        from datetime import timedelta
+        from django.db.models import Q
+        from django.utils import timezone
+        from .email_queue import STALE_LOCK_SECONDS
+        
+        now = timezone.now()
+        # Rows a worker is sending right now are left alone (re-queueing them would send twice);
+        # only 'sending' rows whose lock went stale are picked up
+        stale = now - timedelta(seconds=STALE_LOCK_SECONDS)
+        updated = queryset.filter(
+            Q(status__in=['queued', 'failed']) | Q(status='sending', locked_at__lt=stale)
+        ).update(
+            status='queued', attempts=0, next_attempt_at=now, locked_at=None
+        )
+        self.message_user(request, f'{updated} emails re-queued.')
+    retry_now.short_description = 'Re-queue selected emails now'
+
 # Email Limit Set Admin
 @admin.register(EmailLimitSet)
 class EmailLimitSetAdmin(admin.ModelAdmin):
@@ -204,4 +237,11 @@ admin.site.register(CustomUser, CustomUserAdmin)
 # Admin site customization
 admin.site.site_header = "LMS Administration"
 admin.site.site_title = "LMS Admin Portal"
-admin.site.index_title = "Welcome to LMS Administration Portal"
\ No newline at end of file
+admin.site.index_title = "Welcome to LMS Administration Portal"
+
+@admin.register(ExportJob)
+class ExportJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'export_name', 'file_format', 'status', 'row_count', 'created_by', 'created_at', 'finished_at')
+    list_filter = ('status', 'export_name', 'file_format')
+    search_fields = ('created_by__username', 'created_by__email')
+    readonly_fields = ('created_at', 'started_at', 'finished_at', 'row_count', 'error_message', 'download_url')
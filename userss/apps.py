@@ -12,6 +12,8 @@ class UserssConfig(AppConfig):
         Yeh method tab run hoga jab Django completely load ho jayega
         Yahan database access safe hai! ✅
         """
+        import userss.permissions  # Connects permission cache invalidation signals
+        import userss.student_stats  # Student counter cache invalidation signals
         self.update_email_settings()
     
     def update_email_settings(self):
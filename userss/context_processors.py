@@ -14,15 +14,12 @@ def instructor_navigation(request):
 def student_context(request):
     """Global context for student sidebar counts"""
     if request.user.is_authenticated and request.user.role == 'student':
-        from courses.models import Enrollment, BatchEnrollment
+        from userss.student_stats import get_student_stats
         
-        enrolled_courses_count = Enrollment.objects.filter(
-            student=request.user,
-            is_active=True
-        ).count()
+        stats = get_student_stats(request.user, request)
         
         return {
-            'enrolled_courses_count': enrolled_courses_count,
+            'enrolled_courses_count': stats['total_enrollments'],
         }
     
     return {'enrolled_courses_count': 0}
@@ -59,9 +56,12 @@ def instructor_permissions(request):
         'profile_setting': 'has_profile_setting_permission',
     }
     
-    # Generate permission flags
+    # Generate permission flags from the per-request snapshot (single query)
+    from userss.permissions import get_request_permission_codes
+    permission_codes = get_request_permission_codes(request)
+    
     permission_flags = {}
     for perm_code, template_var in permission_mapping.items():
-        permission_flags[template_var] = request.user.has_instructor_permission(perm_code)
+        permission_flags[template_var] = perm_code in permission_codes
     
     return permission_flags
\ No newline at end of file
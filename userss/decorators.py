@@ -4,6 +4,8 @@ from django.shortcuts import redirect
 from django.contrib import messages
 from django.http import Http404
 
+from .permissions import request_has_permission
+
 
 def instructor_permission_required(permission_code):
     """
@@ -26,7 +28,7 @@ def instructor_permission_required(permission_code):
                 return redirect("admin_dashboard")
 
             # Check if instructor has permission
-            if not request.user.has_instructor_permission(permission_code):
+            if not request_has_permission(request, permission_code):
                 messages.error(
                     request,
                     f'You do not have permission to access this feature. Contact admin for "{permission_code}" permission.',
@@ -0,0 +1,263 @@
+# userss/email_queue.py
+"""
+Outbound email queue.
+
+Views and cron jobs only INSERT rows into ``OutboundEmail`` (one bulk insert
+per request). The ``process_email_queue`` worker drains the queue in batches,
+reusing a single SMTP connection per batch, retries failures with exponential
+backoff and writes ``EmailLog`` / ``DailyEmailSummary`` in bulk.
+"""
+
+import logging
+import time
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import DailyEmailSummary, EmailLimitSet, EmailLog, OutboundEmail
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = getattr(settings, "EMAIL_QUEUE_BATCH_SIZE", 100)
+MAX_ATTEMPTS = getattr(settings, "EMAIL_QUEUE_MAX_ATTEMPTS", 5)
+RETRY_BASE_SECONDS = getattr(settings, "EMAIL_QUEUE_RETRY_BASE_SECONDS", 60)
+RETRY_MAX_SECONDS = getattr(settings, "EMAIL_QUEUE_RETRY_MAX_SECONDS", 6 * 60 * 60)
+# Rows stuck in 'sending' longer than this (crashed worker) are re-queued
+STALE_LOCK_SECONDS = getattr(settings, "EMAIL_QUEUE_STALE_LOCK_SECONDS", 15 * 60)
+
+
+# ==================== PRODUCER API ====================
+
+def build_email(recipient_email, subject, message, **kwargs):
+    """Unsaved OutboundEmail row - pass a list of these to queue_emails()"""
+    return OutboundEmail(
+        recipient_email=recipient_email,
+        subject=subject[:200],
+        email_body=message,
+        max_attempts=kwargs.pop("max_attempts", MAX_ATTEMPTS),
+        **kwargs,
+    )
+
+
+def queue_emails(emails, batch_size=500):
+    """Bulk-insert OutboundEmail rows, returns the number queued"""
+    emails = list(emails)
+    if not emails:
+        return 0
+    OutboundEmail.objects.bulk_create(emails, batch_size=batch_size)
+    return len(emails)
+
+
+def queue_email(recipient_email, subject, message, **kwargs):
+    """Queue a single email (same keyword arguments as build_email)"""
+    email = build_email(recipient_email, subject, message, **kwargs)
+    email.save()
+    return email
+
+
+# ==================== DAILY LIMIT ====================
+
+def get_daily_summary():
+    """Today's DailyEmailSummary (created with the active limit if missing)"""
+    email_limit_setting = EmailLimitSet.objects.filter(is_active=True).first()
+    email_limit = email_limit_setting.email_limit_per_day if email_limit_setting else 50
+
+    daily_summary, created = DailyEmailSummary.objects.get_or_create(
+        date=date.today(),
+        defaults={"daily_limit": email_limit},
+    )
+    return daily_summary, email_limit_setting is not None
+
+
+def get_remaining_quota():
+    """Emails that may still be sent today, None when no limit is configured"""
+    daily_summary, limit_enabled = get_daily_summary()
+    if not limit_enabled:
+        return None
+    return max(0, daily_summary.daily_limit - daily_summary.total_emails_sent)
+
+
+# ==================== WORKER ====================
+
+def retry_delay(attempts):
+    """Exponential backoff: base, 2x base, 4x base ... capped at RETRY_MAX_SECONDS"""
+    return min(RETRY_BASE_SECONDS * (2 ** max(0, attempts - 1)), RETRY_MAX_SECONDS)
+
+
+def release_stale_locks():
+    """Re-queue rows left in 'sending' by a worker that died mid-batch"""
+    cutoff = timezone.now() - timedelta(seconds=STALE_LOCK_SECONDS)
+    return OutboundEmail.objects.filter(
+        status="sending", locked_at__lt=cutoff
+    ).update(status="queued", locked_at=None)
+
+
+def claim_batch(limit):
+    """Atomically move up to ``limit`` due rows from 'queued' to 'sending'"""
+    now = timezone.now()
+    with transaction.atomic():
+        ids = list(
+            OutboundEmail.objects.select_for_update(skip_locked=True)
+            .filter(status="queued", next_attempt_at__lte=now)
+            .order_by("next_attempt_at", "id")
+            .values_list("id", flat=True)[:limit]
+        )
+        if not ids:
+            return []
+        # status filter keeps two workers on backends without row locks
+        # (SQLite) from claiming the same rows twice
+        OutboundEmail.objects.filter(id__in=ids, status="queued").update(
+            status="sending", locked_at=now
+        )
+    return list(
+        OutboundEmail.objects.filter(id__in=ids, status="sending", locked_at=now)
+        .order_by("next_attempt_at", "id")
+    )
+
+
+def _to_message(email, connection):
+    return EmailMessage(
+        subject=email.subject,
+        body=email.email_body,
+        from_email=email.from_email or settings.DEFAULT_FROM_EMAIL,
+        to=[email.recipient_email],
+        connection=connection,
+    )
+
+
+def _record_results(sent, failed, retried):
+    """Bulk-write queue state, EmailLog rows and the daily summary"""
+    now = timezone.now()
+
+    with transaction.atomic():
+        if sent:
+            OutboundEmail.objects.filter(id__in=[e.id for e in sent]).update(
+                status="sent", sent_at=now, locked_at=None, last_error=""
+            )
+        if failed or retried:
+            OutboundEmail.objects.bulk_update(
+                failed + retried,
+                ["status", "attempts", "next_attempt_at", "locked_at", "last_error"],
+            )
+
+        # Retries are not final - only log delivered and permanently failed mails
+        EmailLog.objects.bulk_create([
+            EmailLog(
+                recipient_email=email.recipient_email,
+                recipient_user_id=email.recipient_user_id,
+                template_used_id=email.template_used_id,
+                template_type_used_id=email.template_type_used_id,
+                subject=email.subject,
+                email_body=email.email_body,
+                is_sent_successfully=email.status == "sent",
+                error_message=email.last_error or None,
+                sent_by_id=email.sent_by_id,
+            )
+            for email in sent + failed
+        ])
+
+        if sent or failed:
+            daily_summary, _ = get_daily_summary()
+            DailyEmailSummary.objects.filter(pk=daily_summary.pk).update(
+                total_emails_sent=F("total_emails_sent") + len(sent) + len(failed),
+                successful_emails=F("successful_emails") + len(sent),
+                failed_emails=F("failed_emails") + len(failed),
+            )
+
+
+def send_batch(emails):
+    """
+    Send claimed rows over ONE SMTP connection.
+
+    Messages go out one per ``send_messages`` call on the open connection so a
+    single bad address only fails its own row, not the whole batch.
+    """
+    sent, failed, retried = [], [], []
+    now = timezone.now()
+
+    connection = get_connection(fail_silently=False)
+    connection_error = None
+    try:
+        connection.open()
+    except Exception as e:
+        # SMTP server unreachable - every row in the batch gets retried
+        logger.error(f"Email queue: could not open SMTP connection: {e}")
+        connection_error = e
+
+    try:
+        for email in emails:
+            try:
+                if connection_error is not None:
+                    raise connection_error
+                connection.send_messages([_to_message(email, connection)])
+                email.status = "sent"
+                email.sent_at = now
+                email.last_error = ""
+                sent.append(email)
+            except Exception as e:
+                email.attempts += 1
+                email.locked_at = None
+                email.last_error = str(e)
+                if email.attempts >= email.max_attempts:
+                    email.status = "failed"
+                    failed.append(email)
+                else:
+                    email.status = "queued"
+                    email.next_attempt_at = now + timedelta(seconds=retry_delay(email.attempts))
+                    retried.append(email)
+    finally:
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    _record_results(sent, failed, retried)
+    return sent, failed, retried
+
+
+def process_email_queue(batch_size=None, max_batches=None):
+    """
+    Drain due queue rows batch by batch while today's email limit allows it.
+
+    Returns a dict of counters. Also usable as a django_crontab job.
+    """
+    batch_size = batch_size or BATCH_SIZE
+    stats = {"sent": 0, "failed": 0, "retried": 0, "batches": 0, "deferred_by_limit": False}
+    started = time.monotonic()
+
+    released = release_stale_locks()
+    if released:
+        logger.warning(f"Email queue: re-queued {released} stale 'sending' rows")
+
+    while max_batches is None or stats["batches"] < max_batches:
+        limit = batch_size
+        remaining = get_remaining_quota()
+        if remaining is not None:
+            if remaining <= 0:
+                # Leave the rest queued - picked up once the daily counter resets
+                stats["deferred_by_limit"] = True
+                break
+            limit = min(limit, remaining)
+
+        emails = claim_batch(limit)
+        if not emails:
+            break
+
+        sent, failed, retried = send_batch(emails)
+        stats["sent"] += len(sent)
+        stats["failed"] += len(failed)
+        stats["retried"] += len(retried)
+        stats["batches"] += 1
+
+    stats["duration_seconds"] = round(time.monotonic() - started, 3)
+    if stats["batches"]:
+        logger.info(
+            f"Email queue: sent={stats['sent']} failed={stats['failed']} "
+            f"retried={stats['retried']} batches={stats['batches']} "
+            f"in {stats['duration_seconds']}s"
+        )
+    return stats
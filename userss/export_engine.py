@@ -0,0 +1,308 @@
+# userss/export_engine.py
+"""
+Shared CSV / XLSX export engine.
+
+An export is described by a builder function (``<app>/exports.py``) that
+takes a dict of string params and returns an ``Export``: file name, header
+and a row generator fed by ``QuerySet.iterator(chunk_size=...)``. Rows are
+written as they are produced, never collected in a list:
+
+- CSV goes out as a ``StreamingHttpResponse``
+- XLSX is written by openpyxl in write-only mode to a temp file and streamed
+- big exports (``EXPORT_BACKGROUND_THRESHOLD`` rows, or ``?background=1``)
+  become an ``ExportJob``: the worker writes the file under
+  ``MEDIA_ROOT/exports/`` and emails the requester a download link.
+"""
+
+import csv
+import logging
+import os
+import tempfile
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib import messages
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.shortcuts import redirect
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.http import url_has_allowed_host_and_scheme
+from django.utils.module_loading import import_string
+
+from .models import ExportJob
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = getattr(settings, "EXPORT_CHUNK_SIZE", 2000)
+BACKGROUND_THRESHOLD = getattr(settings, "EXPORT_BACKGROUND_THRESHOLD", 20000)
+FILE_RETENTION_DAYS = getattr(settings, "EXPORT_FILE_RETENTION_DAYS", 7)
+# A 'running' job without progress for this long belongs to a dead worker
+STALE_JOB_SECONDS = getattr(settings, "EXPORT_JOB_STALE_SECONDS", 60 * 60)
+
+EXPORT_DIR = 'exports'
+
+# Export name -> builder (also the allowlist for background jobs)
+EXPORT_BUILDERS = {
+    'fees.payments': 'fees.exports.payment_report',
+    'fees.overdue': 'fees.exports.overdue_report',
+    'userss.students': 'userss.exports.student_export',
+    'courses.login_logs': 'courses.exports.login_log_export',
+}
+
+CONTENT_TYPES = {
+    'csv': 'text/csv',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+
+class Export:
+    """What to write: ``rows`` is an iterable of lists, consumed once"""
+
+    def __init__(self, filename, header, rows, queryset=None, title=None):
+        self.filename = filename
+        self.header = header
+        self.rows = rows
+        # Used for the background threshold (one COUNT query)
+        self.queryset = queryset
+        self.title = title or filename
+
+    def count(self):
+        return self.queryset.count() if self.queryset is not None else None
+
+
+def build_export(name, params):
+    if name not in EXPORT_BUILDERS:
+        raise ValueError(f"Unknown export: {name}")
+    return import_string(EXPORT_BUILDERS[name])(params)
+
+
+# ==================== WRITERS ====================
+
+class Echo:
+    """File-like object whose write() just returns the line (csv -> generator)"""
+
+    def write(self, value):
+        return value
+
+
+def iter_csv(export):
+    writer = csv.writer(Echo())
+    yield writer.writerow(export.header)
+    for row in export.rows:
+        yield writer.writerow(row)
+
+
+def write_csv(export, fileobj):
+    """Write the export to an open text file, returns the data row count"""
+    writer = csv.writer(fileobj)
+    writer.writerow(export.header)
+    count = 0
+    for row in export.rows:
+        writer.writerow(row)
+        count += 1
+    return count
+
+
+def write_xlsx(export, fileobj):
+    """openpyxl write-only workbook, rows are flushed as they are appended"""
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Font, PatternFill
+    from openpyxl.utils import get_column_letter
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(title=export.title[:31])
+
+    # Column widths must be set before the first row in write-only mode
+    for index, label in enumerate(export.header, start=1):
+        ws.column_dimensions[get_column_letter(index)].width = min(max(len(str(label)) + 2, 14), 50)
+
+    header_font = Font(bold=True, color="FFFFFF")
+    header_fill = PatternFill(start_color="6366F1", end_color="6366F1", fill_type="solid")
+    header = []
+    for label in export.header:
+        cell = WriteOnlyCell(ws, value=label)
+        cell.font = header_font
+        cell.fill = header_fill
+        header.append(cell)
+    ws.append(header)
+
+    count = 0
+    for row in export.rows:
+        ws.append(row)
+        count += 1
+
+    wb.save(fileobj)
+    return count
+
+
+# ==================== HTTP ====================
+
+def csv_response(export):
+    response = StreamingHttpResponse(iter_csv(export), content_type=CONTENT_TYPES['csv'])
+    response['Content-Disposition'] = f'attachment; filename="{export.filename}.csv"'
+    return response
+
+
+def xlsx_response(export):
+    # Anonymous temp file: removed as soon as FileResponse closes it
+    tmp = tempfile.TemporaryFile()
+    write_xlsx(export, tmp)
+    tmp.seek(0)
+    return FileResponse(
+        tmp, as_attachment=True, filename=f"{export.filename}.xlsx",
+        content_type=CONTENT_TYPES['xlsx'],
+    )
+
+
+def redirect_back(request, fallback_url='/'):
+    """Redirect to the Referer if it points at this site, else to ``fallback_url``"""
+    referer = request.META.get('HTTP_REFERER')
+    if referer and url_has_allowed_host_and_scheme(
+        referer, allowed_hosts={request.get_host()}, require_https=request.is_secure()
+    ):
+        return redirect(referer)
+    return redirect(fallback_url)
+
+
+def export_response(request, name, params, file_format='csv', fallback_url='/'):
+    """
+    Stream the export, or queue it as an ExportJob when it is large (or the
+    request asks for ``background=1``) and redirect back with a message.
+    """
+    # file_format ends up in the job's file path - only known formats
+    if file_format not in CONTENT_TYPES:
+        return HttpResponse("Invalid format", status=400)
+
+    export = build_export(name, params)
+
+    background = request.GET.get('background') == '1'
+    if not background and BACKGROUND_THRESHOLD:
+        row_count = export.count()
+        background = row_count is not None and row_count > BACKGROUND_THRESHOLD
+
+    if background:
+        job = queue_export(request, name, params, file_format)
+        messages.info(
+            request,
+            f"Large export queued (#{job.pk}). You will get an email at {request.user.email} when it is ready."
+        )
+        return redirect_back(request, fallback_url)
+
+    if file_format == 'xlsx':
+        return xlsx_response(export)
+    return csv_response(export)
+
+
+# ==================== BACKGROUND JOBS ====================
+
+def queue_export(request, name, params, file_format='csv'):
+    job = ExportJob.objects.create(
+        export_name=name,
+        params=params,
+        file_format=file_format,
+        created_by=request.user,
+    )
+    job.download_url = request.build_absolute_uri(reverse('download_export_job', args=[job.pk]))
+    job.save(update_fields=['download_url'])
+    return job
+
+
+def claim_next_job():
+    """Atomically move the oldest pending job to 'running'"""
+    for job_id in ExportJob.objects.filter(status='pending').order_by('created_at').values_list('id', flat=True)[:5]:
+        claimed = ExportJob.objects.filter(id=job_id, status='pending').update(
+            status='running', started_at=timezone.now()
+        )
+        if claimed:
+            return ExportJob.objects.select_related('created_by').get(id=job_id)
+    return None
+
+
+def run_export_job(job):
+    if job.file_format not in CONTENT_TYPES:
+        raise ValueError(f"Unknown export format: {job.file_format!r}")
+    export = build_export(job.export_name, job.params)
+    relative = f"{EXPORT_DIR}/{job.pk}_{export.filename}.{job.file_format}"
+    path = os.path.join(settings.MEDIA_ROOT, relative)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    tmp_path = f"{path}.tmp"
+    if job.file_format == 'xlsx':
+        with open(tmp_path, 'wb') as fileobj:
+            row_count = write_xlsx(export, fileobj)
+    else:
+        with open(tmp_path, 'w', newline='', encoding='utf-8') as fileobj:
+            row_count = write_csv(export, fileobj)
+    os.replace(tmp_path, path)
+
+    job.file.name = relative
+    job.row_count = row_count
+    job.status = 'completed'
+    job.finished_at = timezone.now()
+    job.save(update_fields=['file', 'row_count', 'status', 'finished_at'])
+
+
+def notify_export_ready(job):
+    from .email_queue import queue_email
+
+    user = job.created_by
+    if not user or not user.email:
+        return
+    if job.status == 'completed':
+        subject = f"Your export is ready ({job.row_count} rows)"
+        message = (
+            f"Hi {user.get_full_name() or user.username},\n\n"
+            f"Your {job.get_export_label()} export ({job.file_format.upper()}, {job.row_count} rows) is ready:\n"
+            f"{job.download_url}\n\n"
+            f"The file will be available for {FILE_RETENTION_DAYS} days."
+        )
+    else:
+        subject = "Your export failed"
+        message = (
+            f"Hi {user.get_full_name() or user.username},\n\n"
+            f"Your {job.get_export_label()} export could not be generated: {job.error_message}"
+        )
+    queue_email(user.email, subject, message, recipient_user=user, source='export_job')
+
+
+def cleanup_expired_exports():
+    """Delete export files older than FILE_RETENTION_DAYS"""
+    cutoff = timezone.now() - timedelta(days=FILE_RETENTION_DAYS)
+    expired = ExportJob.objects.filter(status='completed', finished_at__lt=cutoff).exclude(file='')
+    count = 0
+    for job in expired:
+        job.file.delete(save=False)
+        job.status = 'expired'
+        job.save(update_fields=['file', 'status'])
+        count += 1
+    return count
+
+
+def process_export_jobs(max_jobs=None):
+    """
+    Run pending export jobs one after another. Returns the number of jobs run.
+
+    Registered as a scheduled task (scheduler/tasks.py).
+    """
+    stale_cutoff = timezone.now() - timedelta(seconds=STALE_JOB_SECONDS)
+    ExportJob.objects.filter(status='running', started_at__lt=stale_cutoff).update(status='pending')
+
+    processed = 0
+    while max_jobs is None or processed < max_jobs:
+        job = claim_next_job()
+        if job is None:
+            break
+        try:
+            run_export_job(job)
+        except Exception as e:
+            logger.exception(f"Export job #{job.pk} failed")
+            job.status = 'failed'
+            job.error_message = str(e) or e.__class__.__name__
+            job.finished_at = timezone.now()
+            job.save(update_fields=['status', 'error_message', 'finished_at'])
+        notify_export_ready(job)
+        processed += 1
+
+    cleanup_expired_exports()
+    return processed
@@ -0,0 +1,65 @@
+# userss/exports.py - Student export (see userss/export_engine.py)
+
+from django.db.models import Prefetch
+
+from courses.models import BatchEnrollment, Enrollment
+
+from .export_engine import CHUNK_SIZE, Export
+
+
+def student_enrollments(params):
+    """Instructor's enrollments with student + active batch enrollments prefetched"""
+    enrollments = Enrollment.objects.filter(
+        course__instructor_id=params['instructor_id']
+    ).select_related('student', 'course').prefetch_related(
+        Prefetch(
+            'student__batch_enrollments',
+            queryset=BatchEnrollment.objects.filter(is_active=True).select_related('batch').order_by('id'),
+            to_attr='active_batch_enrollments',
+        )
+    )
+    if params.get('course'):
+        enrollments = enrollments.filter(course_id=params['course'])
+    if params.get('status'):
+        enrollments = enrollments.filter(status=params['status'])
+    return enrollments
+
+
+def batch_name(enrollment, default='Direct Enrollment'):
+    """First active batch of the student in this course (no extra query)"""
+    for batch_enrollment in enrollment.student.active_batch_enrollments:
+        if batch_enrollment.batch.course_id == enrollment.course_id:
+            return batch_enrollment.batch.name
+    return default
+
+
+def student_export(params):
+    fields = params.get('fields') or []
+    enrollments = student_enrollments(params)
+
+    header = ['Student ID', 'Full Name', 'Email']
+    if 'contact' in fields:
+        header.extend(['Phone Number'])
+    if 'enrollment' in fields:
+        header.extend(['Course', 'Batch', 'Enrolled Date', 'Status'])
+    if 'progress' in fields:
+        header.extend(['Progress %'])
+
+    def rows():
+        for enrollment in enrollments.iterator(chunk_size=CHUNK_SIZE):
+            student = enrollment.student
+            row = [student.id, student.get_full_name(), student.email]
+            if 'contact' in fields:
+                row.append(student.phone_number or 'N/A')
+            if 'enrollment' in fields:
+                row.extend([
+                    enrollment.course.course_code,
+                    batch_name(enrollment),
+                    enrollment.enrolled_at.strftime('%Y-%m-%d'),
+                    enrollment.get_status_display(),
+                ])
+            if 'progress' in fields:
+                row.append(f"{enrollment.progress_percentage}%")
+            yield row
+
+    return Export('students_export', header, rows(), queryset=enrollments, title='Students Data')
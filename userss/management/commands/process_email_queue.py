@@ -0,0 +1,56 @@
+# management/commands/process_email_queue.py
+import time
+
+from django.core.management.base import BaseCommand
+
+from userss.email_queue import BATCH_SIZE, process_email_queue
+
+
+class Command(BaseCommand):
+    help = 'Send queued outbound emails (one SMTP connection per batch, with retry/backoff)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=BATCH_SIZE,
+            help='Emails sent per SMTP connection',
+        )
+        parser.add_argument(
+            '--max-batches',
+            type=int,
+            default=None,
+            help='Stop after this many batches (default: drain the queue)',
+        )
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Keep running and poll the queue (long-lived worker)',
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=5.0,
+            help='Seconds to wait between polls in --loop mode',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            stats = process_email_queue(
+                batch_size=options['batch_size'],
+                max_batches=options['max_batches'],
+            )
+
+            if stats['batches'] or not options['loop']:
+                self.stdout.write(
+                    self.style.SUCCESS(
+                        f"Sent: {stats['sent']}, Failed: {stats['failed']}, "
+                        f"Retrying: {stats['retried']} ({stats['duration_seconds']}s)"
+                    )
+                )
+            if stats['deferred_by_limit'] and not options['loop']:
+                self.stdout.write(self.style.WARNING('Daily email limit reached - remaining emails deferred'))
+
+            if not options['loop']:
+                break
+            time.sleep(options['sleep'])
@@ -46,14 +46,17 @@ class CustomUser(AbstractUser):
         if self.role != 'instructor':
             return False
         
-        try:
-            instructor_profile = self.instructor_profile
-            return instructor_profile.permissions.filter(
-                permission__code=permission_code,
-                is_active=True
-            ).exists()
-        except:
-            return False
+        return permission_code in self.get_instructor_permission_codes()
+    
+    def get_instructor_permission_codes(self):
+        """Get cached snapshot of active, non-expired permission codes"""
+        from .permissions import get_permission_codes
+        
+        codes = getattr(self, '_instructor_permission_codes', None)
+        if codes is None:
+            codes = get_permission_codes(self)
+            self._instructor_permission_codes = codes
+        return codes
     
     def get_instructor_permissions(self):
         """Get all active permissions for instructor"""
@@ -391,7 +394,109 @@ class DailyEmailSummary(models.Model):
 
     class Meta:
         ordering = ["-date"]
-        
+
+
+class OutboundEmail(models.Model):
+    """Persistent outbound mail queue - drained by the process_email_queue worker"""
+
+    STATUS_CHOICES = (
+        ("queued", "Queued"),
+        ("sending", "Sending"),
+        ("sent", "Sent"),
+        ("failed", "Failed"),
+    )
+
+    recipient_email = models.EmailField()
+    recipient_user = models.ForeignKey(
+        CustomUser, on_delete=models.SET_NULL, null=True, blank=True,
+        related_name="queued_emails"
+    )
+    from_email = models.CharField(
+        max_length=255, blank=True, help_text="Empty = DEFAULT_FROM_EMAIL at send time"
+    )
+    subject = models.CharField(max_length=200)
+    email_body = models.TextField()
+    template_used = models.ForeignKey(
+        EmailTemplate, on_delete=models.SET_NULL, null=True, blank=True
+    )
+    template_type_used = models.ForeignKey(
+        EmailTemplateType, on_delete=models.SET_NULL, null=True, blank=True
+    )
+    sent_by = models.ForeignKey(
+        CustomUser, on_delete=models.SET_NULL, null=True, blank=True,
+        related_name="queued_outbound_emails"
+    )
+    source = models.CharField(
+        max_length=50, blank=True, help_text="Feature that queued it, e.g. 'bulk_email'"
+    )
+
+    # Delivery state
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default="queued")
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.recipient_email} - {self.subject[:40]} ({self.status})"
+
+    class Meta:
+        ordering = ["next_attempt_at", "id"]
+        indexes = [
+            models.Index(fields=["status", "next_attempt_at"]),
+        ]
+        verbose_name = "Outbound Email"
+        verbose_name_plural = "Outbound Email Queue"
+
+
+class ExportJob(models.Model):
+    """Large CSV / XLSX export written in the background (userss/export_engine.py)"""
+
+    STATUS_CHOICES = (
+        ("pending", "Pending"),
+        ("running", "Running"),
+        ("completed", "Completed"),
+        ("failed", "Failed"),
+        ("expired", "Expired"),
+    )
+    FORMAT_CHOICES = (
+        ("csv", "CSV"),
+        ("xlsx", "Excel (XLSX)"),
+    )
+
+    export_name = models.CharField(max_length=50, help_text="Key of EXPORT_BUILDERS, e.g. 'fees.payments'")
+    params = models.JSONField(default=dict, blank=True)
+    file_format = models.CharField(max_length=4, choices=FORMAT_CHOICES, default="csv")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default="pending")
+
+    file = models.FileField(upload_to="exports/", blank=True)
+    row_count = models.PositiveIntegerField(default=0)
+    download_url = models.CharField(max_length=500, blank=True)
+    error_message = models.TextField(blank=True)
+
+    created_by = models.ForeignKey(
+        CustomUser, on_delete=models.CASCADE, related_name="export_jobs"
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"#{self.pk} {self.export_name} ({self.status})"
+
+    def get_export_label(self):
+        return self.export_name.split(".")[-1].replace("_", " ")
+
+    class Meta:
+        ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["status", "created_at"]),
+        ]
+
 
 
 # Add this model to your existing models.py
@@ -0,0 +1,148 @@
+# userss/permissions.py
+"""
+Instructor permission snapshot.
+
+All active, non-expired permission codes of an instructor are loaded with ONE
+query, kept in a versioned cache and memoized on the request, so context
+processors, decorators and views share the same snapshot instead of running
+one ``exists()`` per permission code.
+"""
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import InstructorPermission, InstructorPermissionAssignment
+
+CACHE_TIMEOUT = getattr(settings, "INSTRUCTOR_PERMISSION_CACHE_TIMEOUT", 300)
+
+# Bumped when any InstructorPermission changes (code rename, deletion)
+GLOBAL_VERSION_KEY = "instructor_perms:version"
+# Bumped when one instructor's assignments change
+USER_VERSION_KEY = "instructor_perms:version:{user_id}"
+SNAPSHOT_KEY = "instructor_perms:{global_version}:{user_version}:{user_id}"
+
+REQUEST_ATTR = "_instructor_permission_codes"
+
+
+def _snapshot_key(user_id):
+    user_version_key = USER_VERSION_KEY.format(user_id=user_id)
+    versions = cache.get_many([GLOBAL_VERSION_KEY, user_version_key])
+    return SNAPSHOT_KEY.format(
+        global_version=versions.get(GLOBAL_VERSION_KEY, 1),
+        user_version=versions.get(user_version_key, 1),
+        user_id=user_id,
+    )
+
+
+def _load_snapshot(user_id):
+    """Single query: codes of all valid assignments + earliest expiry"""
+    now = timezone.now()
+    rows = InstructorPermissionAssignment.objects.filter(
+        instructor__user_id=user_id,
+        is_active=True,
+    ).filter(
+        Q(expires_at__isnull=True) | Q(expires_at__gt=now)
+    ).values_list("permission__code", "expires_at")
+
+    codes = set()
+    expires_at = None
+    for code, expiry in rows:
+        codes.add(code)
+        if expiry and (expires_at is None or expiry < expires_at):
+            expires_at = expiry
+
+    return {"codes": frozenset(codes), "expires_at": expires_at}
+
+
+def get_permission_codes(user):
+    """
+    Return a frozenset of the instructor's valid permission codes.
+
+    Non-instructors get an empty set (superadmins are handled by the callers,
+    same as ``CustomUser.has_instructor_permission``).
+    """
+    if not getattr(user, "is_authenticated", False) or user.role != "instructor":
+        return frozenset()
+
+    key = _snapshot_key(user.pk)
+    snapshot = cache.get(key)
+    now = timezone.now()
+
+    # A cached snapshot is stale once its earliest permission has expired
+    if snapshot is None or (snapshot["expires_at"] and snapshot["expires_at"] <= now):
+        snapshot = _load_snapshot(user.pk)
+        timeout = CACHE_TIMEOUT
+        if snapshot["expires_at"]:
+            seconds_left = int((snapshot["expires_at"] - now).total_seconds())
+            timeout = max(1, min(timeout, seconds_left))
+        cache.set(key, snapshot, timeout)
+
+    return snapshot["codes"]
+
+
+def get_request_permission_codes(request):
+    """Permission codes for ``request.user``, memoized on the request"""
+    codes = getattr(request, REQUEST_ATTR, None)
+    if codes is None:
+        user = request.user
+        if user.is_authenticated and user.role == "instructor":
+            # Shares the memo kept on the user instance by the model helpers
+            codes = user.get_instructor_permission_codes()
+        else:
+            codes = frozenset()
+        setattr(request, REQUEST_ATTR, codes)
+    return codes
+
+
+def request_has_permission(request, permission_code):
+    """Request-level equivalent of ``CustomUser.has_instructor_permission``"""
+    user = request.user
+    if not user.is_authenticated:
+        return False
+    if user.role == "superadmin":
+        return True
+    if user.role != "instructor":
+        return False
+    return permission_code in get_request_permission_codes(request)
+
+
+def invalidate_instructor_permissions(user_id):
+    """Invalidate the cached snapshot of one instructor"""
+    key = USER_VERSION_KEY.format(user_id=user_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 2, None)
+
+
+def invalidate_all_instructor_permissions():
+    """Invalidate every cached snapshot (permission definitions changed)"""
+    try:
+        cache.incr(GLOBAL_VERSION_KEY)
+    except ValueError:
+        cache.set(GLOBAL_VERSION_KEY, 2, None)
+
+
+# ==================== CACHE INVALIDATION SIGNALS ====================
+# NOTE: QuerySet.update() does not send signals - views that bulk-update
+# assignments must call invalidate_instructor_permissions() themselves.
+
+@receiver(post_save, sender=InstructorPermissionAssignment)
+@receiver(post_delete, sender=InstructorPermissionAssignment)
+def assignment_changed(sender, instance, **kwargs):
+    try:
+        user_id = instance.instructor.user_id
+    except Exception:
+        invalidate_all_instructor_permissions()
+        return
+    invalidate_instructor_permissions(user_id)
+
+
+@receiver(post_save, sender=InstructorPermission)
+@receiver(post_delete, sender=InstructorPermission)
+def permission_changed(sender, instance, **kwargs):
+    invalidate_all_instructor_permissions()
@@ -2,11 +2,11 @@
 
 from django.db.models.signals import post_save
 from django.dispatch import receiver
-from django.core.mail import send_mail
 from django.conf import settings
 from django.utils import timezone
 from datetime import date
 from .models import CustomUser, UserProfile, UserActivityLog, EmailLimitSet, EmailLog, DailyEmailSummary, EmailTemplate, EmailTemplateType
+from .email_queue import queue_email
 
 def check_daily_email_limit():
     """Check if daily email limit is reached"""
@@ -93,71 +93,23 @@ Please contact your administrator for login credentials.
 Best regards,
 LMS Team"""
         
-        # Send email
-        send_mail(
-            subject=subject,
-            message=message,
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            recipient_list=[user.email],
-            fail_silently=False,
-        )
-        
-        # Log successful email
-        EmailLog.objects.create(
-            recipient_email=user.email,
+        # Queue email - the process_email_queue worker sends it and writes
+        # EmailLog / DailyEmailSummary once delivery succeeds or finally fails
+        queue_email(
+            user.email,
+            subject,
+            message,
             recipient_user=user,
             template_used=template,
-            template_type_used=template_type_used,  # Now properly defined
-            subject=subject,
-            email_body=message,
-            is_sent_successfully=True
+            template_type_used=template_type_used,
+            source='welcome',
         )
         
-        # Update daily summary
-        today = date.today()
-        email_limit = 50  # Default
-        if EmailLimitSet.objects.filter(is_active=True).exists():
-            email_limit = EmailLimitSet.objects.filter(is_active=True).first().email_limit_per_day
-            
-        daily_summary, created = DailyEmailSummary.objects.get_or_create(
-            date=today,
-            defaults={'daily_limit': email_limit}
-        )
-        daily_summary.total_emails_sent += 1
-        daily_summary.successful_emails += 1
-        daily_summary.save()
-        
-        print(f"Welcome email sent successfully to {user.email}")
+        print(f"Welcome email queued for {user.email}")
         return True
         
     except Exception as e:
-        # Log failed email
-        EmailLog.objects.create(
-            recipient_email=user.email,
-            recipient_user=user,
-            template_used=template if template else None,
-            template_type_used=template_type_used if template_type_used else None,
-            subject=subject if 'subject' in locals() else "Welcome to LMS",
-            email_body=message if 'message' in locals() else "",
-            is_sent_successfully=False,
-            error_message=str(e)
-        )
-        
-        # Update daily summary for failed email
-        today = date.today()
-        email_limit = 50  # Default
-        if EmailLimitSet.objects.filter(is_active=True).exists():
-            email_limit = EmailLimitSet.objects.filter(is_active=True).first().email_limit_per_day
-            
-        daily_summary, created = DailyEmailSummary.objects.get_or_create(
-            date=today,
-            defaults={'daily_limit': email_limit}
-        )
-        daily_summary.total_emails_sent += 1
-        daily_summary.failed_emails += 1
-        daily_summary.save()
-        
-        print(f"Failed to send email to {user.email}: {str(e)}")
+        print(f"Failed to queue welcome email for {user.email}: {str(e)}")
         return False
 
 @receiver(post_save, sender=CustomUser)
@@ -0,0 +1,138 @@
+# userss/student_stats.py
+"""
+Student dashboard counters.
+
+All enrollment / batch / exam / attendance counters of a student come from
+four conditional-aggregation queries (one per table), kept in a versioned
+per-student cache. The version is bumped by signals whenever an enrollment,
+batch enrollment, exam attempt or session attendance of the student changes,
+so the sidebar context processor and the dashboards read the cache instead
+of re-counting on every page.
+"""
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Avg, Count, Q, Sum
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from courses.batch_locks import LOCK_FIELDS
+from courses.models import BatchEnrollment, Enrollment
+from exams.models import ExamAttempt
+from zoom.models import SessionAttendance
+
+CACHE_TIMEOUT = getattr(settings, "STUDENT_STATS_CACHE_TIMEOUT", 300)
+
+VERSION_KEY = "student_stats:version:{student_id}"
+STATS_KEY = "student_stats:{version}:{student_id}"
+
+REQUEST_ATTR = "_student_stats"
+
+COMPLETED_ATTEMPT_STATUSES = ['submitted', 'auto_submitted']
+
+
+def _stats_key(student_id):
+    version = cache.get(VERSION_KEY.format(student_id=student_id), 1)
+    return STATS_KEY.format(version=version, student_id=student_id)
+
+
+def compute_student_stats(student_id):
+    """One aggregate query per table, no caching"""
+    enrollments = Enrollment.objects.filter(student_id=student_id, is_active=True).aggregate(
+        total=Count('id'),
+        active=Count('id', filter=Q(status='enrolled')),
+        completed=Count('id', filter=Q(status='completed')),
+        avg_progress=Avg('progress_percentage'),
+        avg_graded_progress=Avg('progress_percentage', filter=~Q(grade='')),
+        time_spent=Sum('total_time_spent_minutes'),
+    )
+
+    batches = BatchEnrollment.objects.filter(student_id=student_id, is_active=True).aggregate(
+        total=Count('id'),
+        active=Count('id', filter=Q(status='enrolled')),
+    )
+
+    completed_attempt = Q(status__in=COMPLETED_ATTEMPT_STATUSES)
+    attempts = ExamAttempt.objects.filter(student_id=student_id).aggregate(
+        total=Count('id'),
+        completed=Count('id', filter=completed_attempt),
+        passed=Count('id', filter=Q(is_passed=True)),
+        avg_percentage=Avg('percentage', filter=completed_attempt),
+    )
+
+    attendance = SessionAttendance.objects.filter(student_id=student_id).aggregate(
+        assigned=Count('id'),
+        attended=Count('id', filter=Q(is_present=True)),
+    )
+
+    assigned = attendance['assigned']
+    attended = attendance['attended']
+
+    return {
+        'total_enrollments': enrollments['total'],
+        'active_enrollments': enrollments['active'],
+        'completed_enrollments': enrollments['completed'],
+        'avg_progress': float(enrollments['avg_progress'] or 0),
+        'avg_graded_progress': float(enrollments['avg_graded_progress'] or 0),
+        'total_time_spent_minutes': enrollments['time_spent'] or 0,
+
+        'total_batch_enrollments': batches['total'],
+        'active_batch_enrollments': batches['active'],
+
+        'total_exam_attempts': attempts['total'],
+        'completed_exams': attempts['completed'],
+        'passed_exams': attempts['passed'],
+        'avg_percentage': round(float(attempts['avg_percentage'] or 0), 2),
+
+        'total_sessions_assigned': assigned,
+        'total_sessions_attended': attended,
+        'attendance_percentage': round((attended / assigned) * 100, 2) if assigned else 0,
+    }
+
+
+def get_student_stats(student, request=None):
+    """
+    Cached counters of a student (dict, see ``compute_student_stats``).
+
+    Pass ``request`` to memoize on it - the context processor and the view
+    then share one cache read.
+    """
+    if request is not None and getattr(request, REQUEST_ATTR, None) is not None:
+        return getattr(request, REQUEST_ATTR)
+
+    key = _stats_key(student.pk)
+    stats = cache.get(key)
+    if stats is None:
+        stats = compute_student_stats(student.pk)
+        cache.set(key, stats, CACHE_TIMEOUT)
+
+    if request is not None:
+        setattr(request, REQUEST_ATTR, stats)
+    return stats
+
+
+def invalidate_student_stats(*student_ids):
+    """Call after ``QuerySet.update()`` on the tracked tables (no signals)"""
+    for student_id in set(student_ids):
+        key = VERSION_KEY.format(student_id=student_id)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 2, None)
+
+
+# ==================== CACHE INVALIDATION SIGNALS ====================
+
+@receiver(post_save, sender=Enrollment)
+@receiver(post_delete, sender=Enrollment)
+@receiver(post_save, sender=BatchEnrollment)
+@receiver(post_delete, sender=BatchEnrollment)
+@receiver(post_save, sender=ExamAttempt)
+@receiver(post_delete, sender=ExamAttempt)
+@receiver(post_save, sender=SessionAttendance)
+@receiver(post_delete, sender=SessionAttendance)
+def student_record_changed(sender, instance, update_fields=None, **kwargs):
+    # Lock state refreshes (courses.batch_locks) don't touch any counter
+    if update_fields and set(update_fields) <= set(LOCK_FIELDS):
+        return
+    invalidate_student_stats(instance.student_id)
@@ -11,6 +11,7 @@ urlpatterns = [
     
     # Dashboards
     path("admin_dashboard/", views.admin_dashboard, name="admin_dashboard"),
+    path("query-report/", views.query_report, name="query_report"),
     path("instructor_dashboard/", views.instructor_dashboard, name="instructor_dashboard"),
     
     # Student
@@ -115,6 +116,7 @@ path("instructor/student/<int:student_id>/", views.instructor_view_student_profi
     path('email-configuration/', views.email_smtp_settings, name='email_configuration_settings'),
 
     path('export-students/', views.export_students, name='export_students'),
+    path('exports/<int:job_id>/download/', views.download_export_job, name='download_export_job'),
 
 
 ]
\ No newline at end of file
@@ -238,6 +238,35 @@ def admin_dashboard(request):
     }
     return render(request, 'admin_dashboard.html', context)
 
+
+# Query budget report (lms.query_budget)
+@login_required
+def query_report(request):
+    """Per-view query counts / DB time / duplicate queries from the instrumentation buffer"""
+    if request.user.role != 'superadmin':
+        return redirect('user_login')
+
+    from lms import query_budget
+
+    if request.method == 'POST' and request.POST.get('action') == 'clear':
+        query_budget.clear_records()
+        messages.success(request, 'Query report buffer cleared.')
+        return redirect('query_report')
+
+    records = query_budget.get_records()
+    view_stats = query_budget.get_view_stats(records)
+    violations = [r for r in reversed(records) if r['over_budget']][:50]
+
+    context = {
+        'instrumentation_enabled': query_budget.is_enabled(),
+        'buffer_size': query_budget.BUFFER_SIZE,
+        'record_count': len(records),
+        'view_stats': view_stats,
+        'violations': violations,
+        'selected_view': request.GET.get('view', ''),
+    }
+    return render(request, 'admin/query_report.html', context)
+
 # User Management Views
 @login_required
 def manage_users(request):
@@ -802,112 +831,50 @@ def get_instructor_statistics(user):
 
 def get_student_statistics(user):
     """Get comprehensive statistics for student"""
-    
-    # Enrollments
-    total_enrollments = Enrollment.objects.filter(
-        student=user,
-        is_active=True
-    ).count()
-    
-    active_enrollments = Enrollment.objects.filter(
-        student=user,
-        status='enrolled',
-        is_active=True
-    ).count()
-    
-    completed_enrollments = Enrollment.objects.filter(
-        student=user,
-        status='completed',
-        is_active=True
-    ).count()
-    
+    from userss.student_stats import get_student_stats
+    from zoom.models import SessionAttendance
+
+    # Counters - cached, see userss/student_stats.py
+    stats = get_student_stats(user)
+
     # Get enrolled courses
     enrolled_courses = Enrollment.objects.filter(
         student=user,
         is_active=True
     ).select_related('course', 'course__instructor').order_by('-enrolled_at')
     
-    # Batch Enrollments
-    total_batch_enrollments = BatchEnrollment.objects.filter(
-        student=user,
-        is_active=True
-    ).count()
-    
-    active_batch_enrollments = BatchEnrollment.objects.filter(
-        student=user,
-        status='enrolled',
-        is_active=True
-    ).count()
-    
     enrolled_batches = BatchEnrollment.objects.filter(
         student=user,
         is_active=True
     ).select_related('batch', 'batch__course', 'batch__instructor').order_by('-enrolled_at')
     
-    # Exam Attempts
-    total_exam_attempts = ExamAttempt.objects.filter(
-        student=user
-    ).count()
-    
-    completed_exams = ExamAttempt.objects.filter(
-        student=user,
-        status__in=['submitted', 'auto_submitted']
-    ).count()
-    
-    passed_exams = ExamAttempt.objects.filter(
-        student=user,
-        is_passed=True
-    ).count()
-    
-    # Average percentage
-    avg_percentage = ExamAttempt.objects.filter(
-        student=user,
-        status__in=['submitted', 'auto_submitted']
-    ).aggregate(avg=Sum('percentage'))['avg'] or 0
-    
     recent_exam_attempts = ExamAttempt.objects.filter(
         student=user
     ).select_related('exam').order_by('-started_at')[:5]
     
-    # Session Attendance
-    from zoom.models import SessionAttendance
-    
-    total_sessions_attended = SessionAttendance.objects.filter(
-        student=user,
-        is_present=True
-    ).count()
-    
-    total_sessions_assigned = SessionAttendance.objects.filter(
-        student=user
-    ).count()
-    
-    attendance_percentage = 0
-    if total_sessions_assigned > 0:
-        attendance_percentage = round((total_sessions_attended / total_sessions_assigned) * 100, 2)
-    
     recent_attendance = SessionAttendance.objects.filter(
         student=user
     ).select_related('session', 'session__batch').order_by('-created_at')[:5]
     
     return {
-        'total_enrollments': total_enrollments,
-        'active_enrollments': active_enrollments,
-        'completed_enrollments': completed_enrollments,
+        'total_enrollments': stats['total_enrollments'],
+        'active_enrollments': stats['active_enrollments'],
+        'completed_enrollments': stats['completed_enrollments'],
         'enrolled_courses': enrolled_courses,
         
-        'total_batch_enrollments': total_batch_enrollments,
-        'active_batch_enrollments': active_batch_enrollments,
+        'total_batch_enrollments': stats['total_batch_enrollments'],
+        'active_batch_enrollments': stats['active_batch_enrollments'],
         'enrolled_batches': enrolled_batches,
         
-        'total_exam_attempts': total_exam_attempts,
-        'completed_exams': completed_exams,
-        'passed_exams': passed_exams,
-        'avg_percentage': round(avg_percentage, 2) if avg_percentage else 0,
+        'total_exam_attempts': stats['total_exam_attempts'],
+        'completed_exams': stats['completed_exams'],
+        'passed_exams': stats['passed_exams'],
+        'avg_percentage': stats['avg_percentage'],
         'recent_exam_attempts': recent_exam_attempts,
         
-        'total_sessions_attended': total_sessions_attended,
-        'total_sessions_assigned': total_sessions_assigned,
-        'attendance_percentage': attendance_percentage,
+        'total_sessions_attended': stats['total_sessions_attended'],
+        'total_sessions_assigned': stats['total_sessions_assigned'],
+        'attendance_percentage': stats['attendance_percentage'],
         'recent_attendance': recent_attendance,
     }
 
@@ -981,21 +948,15 @@ def student_dashboard(request):
         is_active=True
     ).select_related('course', 'course__instructor')
     
-    # Get batch enrollments
-    batch_enrollments = BatchEnrollment.objects.filter(
-        student=user,
-        is_active=True
-    ).select_related('batch', 'batch__course')
-    
-    # Calculate stats
-    total_courses = active_enrollments.count()
-    total_batches = batch_enrollments.count()
-    completed_courses = active_enrollments.filter(status='completed').count()
+    # Calculate stats (cached counters, shared with the sidebar context processor)
+    from userss.student_stats import get_student_stats
+    stats = get_student_stats(user, request)
+    total_courses = stats['total_enrollments']
+    total_batches = stats['total_batch_enrollments']
+    completed_courses = stats['completed_enrollments']
     
     # Overall progress calculation
-    overall_progress = active_enrollments.aggregate(
-        avg_progress=Avg('progress_percentage')
-    )['avg_progress'] or 0
+    overall_progress = stats['avg_progress']
     
     # Recent activity
     recent_activities = UserActivityLog.objects.filter(
@@ -1006,14 +967,9 @@ def student_dashboard(request):
     active_courses = active_enrollments.order_by('-enrolled_at')[:3]
     
     # Performance data
-    average_grade = active_enrollments.exclude(grade='').aggregate(
-        avg=Avg('progress_percentage')
-    )['avg'] or 0
+    average_grade = stats['avg_graded_progress']
     
-    total_hours = active_enrollments.aggregate(
-        total=Sum('total_time_spent_minutes')
-    )['total'] or 0
-    total_hours = round(total_hours / 60, 1)  # Convert to hours
+    total_hours = round(stats['total_time_spent_minutes'] / 60, 1)  # Convert to hours
     
     completion_rate = (completed_courses / total_courses * 100) if total_courses > 0 else 0
     
@@ -1463,24 +1419,23 @@ def check_course_lock_status(request, course_id):
 
 @login_required
 def student_batches(request):
-    """Student's batch enrollments - DEBUG VERSION"""
+    """Student's batch enrollments (lock state read from BatchEnrollment)"""
     
     if request.user.role != 'student':
         return redirect('user_login')
     
     from fees.models import StudentFeeAssignment
+    from courses.batch_locks import refresh_stale_batch_locks
     from django.db.models import Q
     
+    # Rows not evaluated today (daily run pending, new enrollment) - one bulk pass
+    refresh_stale_batch_locks(request.user)
+    
     # Get ALL enrollments
     batch_enrollments = BatchEnrollment.objects.filter(
         student=request.user
     ).select_related('batch', 'batch__course', 'batch__instructor')
     
-    print("\n" + "="*60)
-    print(f"DEBUGGING FOR USER: {request.user.username}")
-    print(f"Total enrollments found: {batch_enrollments.count()}")
-    print("="*60)
-    
     # Filters
     search = request.GET.get('search', '')
     status_filter = request.GET.get('status', '')
@@ -1496,6 +1451,12 @@ def student_batches(request):
     if sort:
         batch_enrollments = batch_enrollments.order_by(sort)
     
+    # Fee assignments of all courses in one query
+    fee_assignments = {
+        assignment.course_id: assignment
+        for assignment in StudentFeeAssignment.objects.filter(student=request.user)
+    }
+    
     # Stats
     active_batches_count = 0
     locked_batches_count = 0
@@ -1505,71 +1466,34 @@ def student_batches(request):
     filtered_enrollments = []
     
     for enrollment in batch_enrollments:
-        print(f"\n--- Enrollment ID: {enrollment.id} ---")
-        print(f"Batch: {enrollment.batch.name}")
-        print(f"Batch Status: {enrollment.batch.status}")
-        print(f"Enrollment is_active: {enrollment.is_active}")
-        
-        # Fee assignment
-        try:
-            enrollment.fee_assignment = StudentFeeAssignment.objects.get(
-                student=request.user,
-                course=enrollment.batch.course
-            )
-            print(f"Fee Assignment found: {enrollment.fee_assignment}")
-            print(f"Fee is_course_locked: {enrollment.fee_assignment.is_course_locked}")
-        except StudentFeeAssignment.DoesNotExist:
-            enrollment.fee_assignment = None
-            print(f"Fee Assignment: None")
-        
-        # Check locked status
-        print(f"enrollment.is_locked property: {enrollment.is_locked}")
-        print(f"enrollment.get_lock_reason(): {enrollment.get_lock_reason()}")
+        enrollment.fee_assignment = fee_assignments.get(enrollment.batch.course_id)
         
         batch_status = enrollment.batch.status
-        
-        # Determine if locked
         is_enrollment_locked = enrollment.is_locked
         
-        print(f"Final determination - is_enrollment_locked: {is_enrollment_locked}")
-        
         if batch_status == 'completed':
             completed_batches_count += 1
-            print(f"Categorized as: COMPLETED")
             if status_filter == '' or status_filter == 'completed':
                 filtered_enrollments.append(enrollment)
                 
         elif batch_status == 'draft':
             upcoming_batches_count += 1
-            print(f"Categorized as: UPCOMING")
             if status_filter == '' or status_filter == 'upcoming':
                 filtered_enrollments.append(enrollment)
                 
         elif batch_status == 'active':
             if is_enrollment_locked:
                 locked_batches_count += 1
-                print(f"Categorized as: LOCKED ✓")
                 if status_filter == '' or status_filter == 'locked':
                     filtered_enrollments.append(enrollment)
             else:
                 active_batches_count += 1
-                print(f"Categorized as: ACTIVE ✓")
                 if status_filter == '' or status_filter == 'active':
                     filtered_enrollments.append(enrollment)
         else:
-            print(f"Categorized as: OTHER")
             if status_filter == '':
                 filtered_enrollments.append(enrollment)
     
-    print("\n" + "="*60)
-    print("FINAL COUNTS:")
-    print(f"Active: {active_batches_count}")
-    print(f"Locked: {locked_batches_count}")
-    print(f"Completed: {completed_batches_count}")
-    print(f"Upcoming: {upcoming_batches_count}")
-    print(f"Filtered enrollments: {len(filtered_enrollments)}")
-    print("="*60 + "\n")
-    
     context = {
         'batch_enrollments': filtered_enrollments,
         'active_batches_count': active_batches_count,
@@ -2048,6 +1972,7 @@ from django.shortcuts import render, redirect
 from django.contrib import messages
 from django.core.mail import send_mail
 from django.conf import settings
+from .email_queue import build_email, queue_emails, get_remaining_quota
 import logging
 
 logger = logging.getLogger(__name__)
@@ -2143,88 +2068,38 @@ def bulk_email(request):
             except EmailTemplate.DoesNotExist:
                 pass
         
-        successful_count = 0
-        failed_count = 0
-        failed_emails = []
-        
-        for user in recipients:
-            if check_daily_email_limit():
-                messages.warning(request, f'Daily email limit reached! Only {successful_count} emails were sent.')
-                break
-            
-            try:
-                if template:
-                    subject = template.subject
-                    message = template.email_body
-                else:
-                    subject = custom_subject
-                    message = custom_message
-                
-                # MAIN MAGIC: Template se automatically variables detect aur replace
-                subject = replace_template_variables(subject, user)
-                message = replace_template_variables(message, user)
-                
-                send_mail(
-                    subject=subject,
-                    message=message,
-                    from_email=settings.DEFAULT_FROM_EMAIL,
-                    recipient_list=[user.email],
-                    fail_silently=False
-                )
-                
-                successful_count += 1
-                
-                EmailLog.objects.create(
-                    recipient_email=user.email,
-                    recipient_user=user,
-                    template_used=template,
-                    subject=subject,
-                    email_body=message,
-                    is_sent_successfully=True,
-                    sent_by=request.user
-                )
-                
-            except Exception as e:
-                failed_count += 1
-                failed_emails.append(f"{user.email}: {str(e)}")
-                
-                EmailLog.objects.create(
-                    recipient_email=user.email,
-                    recipient_user=user,
-                    template_used=template,
-                    subject=custom_subject,
-                    email_body=custom_message,
-                    is_sent_successfully=False,
-                    error_message=str(e),
-                    sent_by=request.user
-                )
-        
-        try:
-            today = date.today()
-            email_limit = 50
-            if EmailLimitSet.objects.filter(is_active=True).exists():
-                email_limit = EmailLimitSet.objects.filter(is_active=True).first().email_limit_per_day
-            
-            daily_summary, created = DailyEmailSummary.objects.get_or_create(
-                date=today,
-                defaults={'daily_limit': email_limit}
+        if template:
+            subject_template = template.subject
+            message_template = template.email_body
+        else:
+            subject_template = custom_subject
+            message_template = custom_message
+        
+        # Queue emails - the process_email_queue worker sends them (one SMTP
+        # connection per batch) and writes EmailLog / DailyEmailSummary
+        outbound = []
+        for user in recipients.only('id', 'username', 'email', 'first_name', 'last_name'):
+            # MAIN MAGIC: Template se automatically variables detect aur replace
+            outbound.append(build_email(
+                user.email,
+                replace_template_variables(subject_template, user),
+                replace_template_variables(message_template, user),
+                recipient_user=user,
+                template_used=template,
+                template_type_used=template.template_type if template else None,
+                sent_by=request.user,
+                source='bulk_email',
+            ))
+        queued_count = queue_emails(outbound)
+        
+        remaining = get_remaining_quota()
+        if remaining is not None and queued_count > remaining:
+            messages.warning(
+                request,
+                f'Only {remaining} emails fit in today\'s limit - the rest will be sent when the limit resets.'
             )
-            daily_summary.total_emails_sent += (successful_count + failed_count)
-            daily_summary.successful_emails += successful_count
-            daily_summary.failed_emails += failed_count
-            daily_summary.save()
-        except Exception as e:
-            logger.error(f'Error updating daily summary: {e}')
-        
-        if successful_count > 0:
-            messages.success(request, f'Bulk email sent successfully to {successful_count} recipients!')
-        
-        if failed_count > 0:
-            messages.warning(request, f'{failed_count} emails failed to send. Check email logs for details.')
-            logger.warning(f'Failed emails: {failed_emails}')
         
-        if successful_count == 0 and failed_count == 0:
-            messages.error(request, 'No emails were sent!')
+        messages.success(request, f'Bulk email queued for {queued_count} recipients!')
         
         return redirect('email_dashboard')
     
@@ -3094,6 +2969,7 @@ from django.db.models import Q
 from django.http import JsonResponse
 from .models import CustomUser, InstructorPermission, InstructorPermissionAssignment, InstructorProfile
 from .decorators import superadmin_required
+from .permissions import invalidate_instructor_permissions
 
 @superadmin_required
 def manage_instructor_permissions(request):
@@ -3202,6 +3078,8 @@ def update_instructor_permissions(request, instructor_id):
     InstructorPermissionAssignment.objects.filter(
         instructor=instructor_profile
     ).update(is_active=False)
+    # update() sends no signals - drop the cached permission snapshot
+    invalidate_instructor_permissions(instructor.id)
     
     # Add new permissions
     assigned_count = 0
@@ -3278,6 +3156,8 @@ def bulk_permission_update(request):
                     permission=permission
                 ).update(is_active=False)
         
+        # update() sends no signals - drop the cached permission snapshot
+        invalidate_instructor_permissions(instructor.id)
         updated_count += 1
     
     action_text = 'assigned' if action == 'add' else 'removed'
@@ -4032,109 +3912,59 @@ def instructor_send_batch_email(request):
             messages.error(request, 'No valid recipients found in the selected batch.')
             return redirect('instructor_email_management')
         
-        # Send emails
-        successful_count = 0
-        failed_count = 0
-        failed_emails = []
+        # Use template or custom content
+        if template:
+            subject_template = template.subject
+            message_template = template.email_body
+        else:
+            subject_template = custom_subject
+            message_template = custom_message
+        
+        instructor_name = request.user.get_full_name() or request.user.username
         
+        # Queue emails - sent in batches by the process_email_queue worker
+        outbound = []
         for student in recipients:
-            # Check individual email limit before each send
-            if check_daily_email_limit():
-                messages.warning(request, f'Daily email limit reached! Only {successful_count} emails were sent.')
-                break
+            subject = subject_template
+            message = message_template
             
-            try:
-                # Use template or custom content
-                if template:
-                    subject = template.subject
-                    message = template.email_body
-                else:
-                    subject = custom_subject
-                    message = custom_message
-                
-                # Replace template variables
-                context_vars = {
-                    '{{username}}': student.username or student.email.split('@')[0],
-                    '{{email}}': student.email or '',
-                    '{{first_name}}': student.first_name or student.username or student.email.split('@')[0],
-                    '{{last_name}}': student.last_name or '',
-                    '{{batch_name}}': batch.name,
-                    '{{course_name}}': batch.course.title,
-                    '{{instructor_name}}': request.user.get_full_name() or request.user.username,
-                }
-                
-                # Replace variables in subject and message
-                for var, value in context_vars.items():
-                    subject = subject.replace(var, str(value))
-                    message = message.replace(var, str(value))
-                
-                # Send email
-                send_mail(
-                    subject=subject,
-                    message=message,
-                    from_email=settings.DEFAULT_FROM_EMAIL,
-                    recipient_list=[student.email],
-                    fail_silently=False
-                )
-                
-                successful_count += 1
-                
-                # Log successful email
-                EmailLog.objects.create(
-                    recipient_email=student.email,
-                    recipient_user=student,
-                    template_used=template,
-                    template_type_used=template.template_type if template else None,
-                    subject=subject,
-                    email_body=message,
-                    is_sent_successfully=True,
-                    sent_by=request.user
-                )
-                
-            except Exception as e:
-                failed_count += 1
-                failed_emails.append(f"{student.email}: {str(e)}")
-                
-                # Log failed email
-                EmailLog.objects.create(
-                    recipient_email=student.email,
-                    recipient_user=student,
-                    template_used=template,
-                    template_type_used=template.template_type if template else None,
-                    subject=custom_subject if not template else template.subject,
-                    email_body=custom_message if not template else template.email_body,
-                    is_sent_successfully=False,
-                    error_message=str(e),
-                    sent_by=request.user
-                )
-        
-        # Update daily summary
-        try:
-            today = date.today()
-            email_limit = 50  # Default
-            if EmailLimitSet.objects.filter(is_active=True).exists():
-                email_limit = EmailLimitSet.objects.filter(is_active=True).first().email_limit_per_day
+            # Replace template variables
+            context_vars = {
+                '{{username}}': student.username or student.email.split('@')[0],
+                '{{email}}': student.email or '',
+                '{{first_name}}': student.first_name or student.username or student.email.split('@')[0],
+                '{{last_name}}': student.last_name or '',
+                '{{batch_name}}': batch.name,
+                '{{course_name}}': batch.course.title,
+                '{{instructor_name}}': instructor_name,
+            }
             
-            daily_summary, created = DailyEmailSummary.objects.get_or_create(
-                date=today,
-                defaults={'daily_limit': email_limit}
-            )
-            daily_summary.total_emails_sent += (successful_count + failed_count)
-            daily_summary.successful_emails += successful_count
-            daily_summary.failed_emails += failed_count
-            daily_summary.save()
-        except Exception as e:
-            pass  # Don't break the flow for logging errors
+            # Replace variables in subject and message
+            for var, value in context_vars.items():
+                subject = subject.replace(var, str(value))
+                message = message.replace(var, str(value))
+            
+            outbound.append(build_email(
+                student.email,
+                subject,
+                message,
+                recipient_user=student,
+                template_used=template,
+                template_type_used=template.template_type if template else None,
+                sent_by=request.user,
+                source='batch_email',
+            ))
+        queued_count = queue_emails(outbound)
         
         # Show results
-        if successful_count > 0:
-            messages.success(request, f'Email sent successfully to {successful_count} students in {batch.name}!')
-        
-        if failed_count > 0:
-            messages.warning(request, f'{failed_count} emails failed to send.')
+        remaining = get_remaining_quota()
+        if remaining is not None and queued_count > remaining:
+            messages.warning(
+                request,
+                f'Only {remaining} emails fit in today\'s limit - the rest will be sent when the limit resets.'
+            )
         
-        if successful_count == 0 and failed_count == 0:
-            messages.error(request, 'No emails were sent!')
+        messages.success(request, f'Email queued for {queued_count} students in {batch.name}!')
         
         return redirect('instructor_email_management')
     
@@ -4520,178 +4350,59 @@ def send_email_to_user(request, user_id):
     return render(request, 'send_email_to_user.html', {'user': user})
 
 from django.http import HttpResponse
-import csv
-from openpyxl import Workbook
 from django.contrib.auth.decorators import login_required
 from django.shortcuts import redirect
+from django.urls import reverse
+from .export_engine import export_response, redirect_back
+from .exports import batch_name, student_enrollments
 
 @login_required
 def export_students(request):
-    """Export student data based on filters"""
+    """Export student data based on filters (CSV / Excel streamed, PDF in memory)"""
     if request.user.role != 'instructor':
         return redirect('user_login')
     
     # Get filter parameters
     export_format = request.GET.get('format', 'csv')
-    course_id = request.GET.get('course')
-    status = request.GET.get('status')
-    fields = request.GET.getlist('fields')
-    
-    # FIXED: Remove 'batch' from select_related - it doesn't exist on Enrollment
-    enrollments = Enrollment.objects.filter(
-        course__instructor=request.user
-    ).select_related('student', 'course')
-    
-    # Apply filters
-    if course_id:
-        enrollments = enrollments.filter(course_id=course_id)
-    if status:
-        enrollments = enrollments.filter(status=status)
+    params = {
+        'instructor_id': request.user.id,
+        'course': request.GET.get('course', ''),
+        'status': request.GET.get('status', ''),
+        'fields': request.GET.getlist('fields'),
+    }
     
     # Generate export based on format
-    if export_format == 'csv':
-        return export_to_csv(enrollments, fields)
-    elif export_format == 'excel':
-        return export_to_excel(enrollments, fields)
+    if export_format in ('csv', 'excel'):
+        return export_response(
+            request, 'userss.students', params,
+            file_format='xlsx' if export_format == 'excel' else 'csv',
+            fallback_url=reverse('instructor_student_management'),
+        )
     elif export_format == 'pdf':
-        return export_to_pdf(enrollments, fields)
+        return export_to_pdf(student_enrollments(params), params['fields'])
     
     return HttpResponse("Invalid format", status=400)
 
 
-def export_to_csv(enrollments, fields):
-    """Export to CSV format"""
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = 'attachment; filename="students_export.csv"'
-    
-    writer = csv.writer(response)
-    
-    # Write header
-    header = ['Student ID', 'Full Name', 'Email']
-    if 'contact' in fields:
-        header.extend(['Phone Number'])
-    if 'enrollment' in fields:
-        header.extend(['Course', 'Batch', 'Enrolled Date', 'Status'])
-    if 'progress' in fields:
-        header.extend(['Progress %'])
-    
-    writer.writerow(header)
-    
-    # Write data
-    for enrollment in enrollments:
-        row = [
-            enrollment.student.id,
-            enrollment.student.get_full_name(),
-            enrollment.student.email
-        ]
-        
-        if 'contact' in fields:
-            row.append(enrollment.student.phone_number or 'N/A')
-        
-        if 'enrollment' in fields:
-            # FIXED: Get batch through BatchEnrollment
-            try:
-                batch_enrollment = enrollment.student.batch_enrollments.filter(
-                    batch__course=enrollment.course,
-                    is_active=True
-                ).first()
-                batch_name = batch_enrollment.batch.name if batch_enrollment else 'Direct Enrollment'
-            except:
-                batch_name = 'Direct Enrollment'
-            
-            row.extend([
-                f"{enrollment.course.course_code}",
-                batch_name,
-                enrollment.enrolled_at.strftime('%Y-%m-%d'),
-                enrollment.get_status_display()
-            ])
-        
-        if 'progress' in fields:
-            row.append(f"{enrollment.progress_percentage}%")
-        
-        writer.writerow(row)
-    
-    return response
+@login_required
+def download_export_job(request, job_id):
+    """Download a finished background export (owner or superadmin only)"""
+    from django.http import FileResponse, Http404
+    from .models import ExportJob
 
+    job = get_object_or_404(ExportJob, pk=job_id)
+    if job.created_by_id != request.user.id and request.user.role != 'superadmin':
+        raise Http404
 
-def export_to_excel(enrollments, fields):
-    """Export to Excel format"""
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Students Data"
-    
-    # Write header
-    header = ['Student ID', 'Full Name', 'Email']
-    if 'contact' in fields:
-        header.extend(['Phone Number'])
-    if 'enrollment' in fields:
-        header.extend(['Course', 'Batch', 'Enrolled Date', 'Status'])
-    if 'progress' in fields:
-        header.extend(['Progress %'])
-    
-    ws.append(header)
-    
-    # Style header
-    from openpyxl.styles import Font, PatternFill
-    for cell in ws[1]:
-        cell.font = Font(bold=True, color="FFFFFF")
-        cell.fill = PatternFill(start_color="6366F1", end_color="6366F1", fill_type="solid")
-    
-    # Write data
-    for enrollment in enrollments:
-        row = [
-            enrollment.student.id,
-            enrollment.student.get_full_name(),
-            enrollment.student.email
-        ]
-        
-        if 'contact' in fields:
-            row.append(enrollment.student.phone_number or 'N/A')
-        
-        if 'enrollment' in fields:
-            # FIXED: Get batch through BatchEnrollment
-            try:
-                batch_enrollment = enrollment.student.batch_enrollments.filter(
-                    batch__course=enrollment.course,
-                    is_active=True
-                ).first()
-                batch_name = batch_enrollment.batch.name if batch_enrollment else 'Direct Enrollment'
-            except:
-                batch_name = 'Direct Enrollment'
-            
-            row.extend([
-                f"{enrollment.course.course_code}",
-                batch_name,
-                enrollment.enrolled_at.strftime('%Y-%m-%d'),
-                enrollment.get_status_display()
-            ])
-        
-        if 'progress' in fields:
-            row.append(enrollment.progress_percentage)
-        
-        ws.append(row)
-    
-    # Auto-adjust column widths
-    for column in ws.columns:
-        max_length = 0
-        column_letter = column[0].column_letter
-        for cell in column:
-            try:
-                if len(str(cell.value)) > max_length:
-                    max_length = len(cell.value)
-            except:
-                pass
-        adjusted_width = min(max_length + 2, 50)
-        ws.column_dimensions[column_letter].width = adjusted_width
-    
-    # Create response
-    response = HttpResponse(
-        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-    )
-    response['Content-Disposition'] = 'attachment; filename="students_export.xlsx"'
-    wb.save(response)
-    
-    return response
+    if job.status != 'completed' or not job.file:
+        messages.info(request, f"Export #{job.pk} is {job.get_status_display().lower()} - no file to download.")
+        return redirect_back(request)
+
+    try:
+        fileobj = job.file.open('rb')
+    except FileNotFoundError:
+        raise Http404
+    return FileResponse(fileobj, as_attachment=True, filename=job.file.name.split('/')[-1])
 
 
 def export_to_pdf(enrollments, fields):
@@ -4718,23 +4429,13 @@ def export_to_pdf(enrollments, fields):
     # Prepare data
     data = [['ID', 'Name', 'Email', 'Course', 'Batch', 'Status', 'Progress']]
     
-    for enrollment in enrollments:
-        # FIXED: Get batch through BatchEnrollment
-        try:
-            batch_enrollment = enrollment.student.batch_enrollments.filter(
-                batch__course=enrollment.course,
-                is_active=True
-            ).first()
-            batch_name = batch_enrollment.batch.name if batch_enrollment else 'Direct'
-        except:
-            batch_name = 'Direct'
-        
+    for enrollment in enrollments.iterator(chunk_size=2000):
         data.append([
             str(enrollment.student.id),
             enrollment.student.get_full_name()[:25],
             enrollment.student.email[:30],
             enrollment.course.course_code,
-            batch_name[:15],
+            batch_name(enrollment, 'Direct')[:15],
             enrollment.get_status_display(),
             f"{enrollment.progress_percentage}%"
         ])
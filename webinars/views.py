@@ -957,21 +957,36 @@ def admin_bulk_send_reminders(request):
             if request.user.role == 'instructor':
                 registrations = registrations.filter(webinar__instructor=request.user)
             
-            # Send reminders
-            sent_count = 0
-            for registration in registrations:
+            # Queue reminders - sent in batches by the process_email_queue worker
+            from django.conf import settings
+            from userss.email_queue import build_email, queue_emails
+            
+            outbound = []
+            queued_ids = []
+            for registration in registrations.select_related('webinar__instructor'):
                 try:
-                    send_webinar_reminder_email(registration)
-                    registration.reminder_sent = True
-                    registration.reminder_sent_at = timezone.now()
-                    registration.save(update_fields=['reminder_sent', 'reminder_sent_at'])
-                    sent_count += 1
+                    subject, message = build_webinar_reminder_email(registration)
+                    outbound.append(build_email(
+                        registration.email,
+                        subject,
+                        message,
+                        from_email=settings.EMAIL_HOST_USER,
+                        sent_by=request.user,
+                        source='webinar_reminder',
+                    ))
+                    queued_ids.append(registration.id)
                 except Exception as e:
-                    print(f"Failed to send reminder to {registration.email}: {e}")
+                    print(f"Failed to build reminder for {registration.email}: {e}")
+            
+            sent_count = queue_emails(outbound)
+            WebinarRegistration.objects.filter(id__in=queued_ids).update(
+                reminder_sent=True,
+                reminder_sent_at=timezone.now()
+            )
             
             return JsonResponse({
                 'success': True,
-                'message': f'Reminders sent to {sent_count} participants',
+                'message': f'Reminders queued for {sent_count} participants',
                 'count': sent_count
             })
             
@@ -981,11 +996,8 @@ def admin_bulk_send_reminders(request):
     return JsonResponse({'success': False, 'message': 'Invalid request method'})
 
 
-def send_webinar_reminder_email(registration):
-    """Send webinar reminder email"""
-    from django.core.mail import send_mail
-    from django.conf import settings
-    
+def build_webinar_reminder_email(registration):
+    """Build (subject, message) of the webinar reminder email"""
     webinar = registration.webinar
     
     subject = f"Reminder: {webinar.title} - Tomorrow!"
@@ -1013,6 +1025,15 @@ We're excited to see you there!
 Best regards,
 LMS Team
 """
+    return subject, message
+
+
+def send_webinar_reminder_email(registration):
+    """Send webinar reminder email"""
+    from django.core.mail import send_mail
+    from django.conf import settings
+    
+    subject, message = build_webinar_reminder_email(registration)
     
     send_mail(
         subject,
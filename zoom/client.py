@@ -0,0 +1,289 @@
+# zoom/client.py - Shared Zoom API client
+"""
+One HTTP client for every Zoom call (``ZoomAPIService``, utils, admin
+actions, views):
+
+- the Server-to-Server OAuth token is cached process-wide in the Django
+  cache (per account / client id) and refreshed ``ZOOM_TOKEN_REFRESH_MARGIN``
+  seconds before it expires - not fetched again for every call
+- calls share one pooled ``requests.Session`` (keep-alive, ``ZOOM_POOL_SIZE``)
+- 429 is retried after ``Retry-After`` (Zoom's rate-limit header) or an
+  exponential backoff; 5xx / connection errors are retried the same way for
+  idempotent methods only (a retried POST could create a second meeting)
+- a 401 drops the cached token and retries once with a fresh one
+- every call is timed into an in-process ring buffer (``call_summary()``)
+  and logged on the "zoom" logger
+
+Base URLs come from ``ZOOM_API_BASE_URL`` / ``ZOOM_OAUTH_TOKEN_URL`` (or the
+constructor), so the client can be pointed at a local stub server.
+"""
+
+import base64
+import hashlib
+import logging
+import random
+import re
+import threading
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
+
+import requests
+from django.conf import settings
+from django.core.cache import cache
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+API_BASE_URL = getattr(settings, "ZOOM_API_BASE_URL", "https://api.zoom.us/v2")
+OAUTH_TOKEN_URL = getattr(settings, "ZOOM_OAUTH_TOKEN_URL", "https://zoom.us/oauth/token")
+TIMEOUT = getattr(settings, "ZOOM_API_TIMEOUT", 30)
+POOL_SIZE = getattr(settings, "ZOOM_POOL_SIZE", 10)
+MAX_RETRIES = getattr(settings, "ZOOM_MAX_RETRIES", 3)
+BACKOFF_BASE = getattr(settings, "ZOOM_BACKOFF_BASE_SECONDS", 1)
+MAX_RETRY_WAIT = getattr(settings, "ZOOM_MAX_RETRY_WAIT_SECONDS", 30)
+TOKEN_REFRESH_MARGIN = getattr(settings, "ZOOM_TOKEN_REFRESH_MARGIN", 5 * 60)
+METRICS_BUFFER_SIZE = getattr(settings, "ZOOM_METRICS_BUFFER_SIZE", 500)
+
+TOKEN_KEY = "zoom:token:{fingerprint}"
+
+IDEMPOTENT_METHODS = {'GET', 'HEAD', 'PUT', 'PATCH', 'DELETE'}
+RETRY_STATUSES = {500, 502, 503, 504}
+
+_ID_RE = re.compile(r"/(?:\d+|[A-Za-z0-9_\-]{20,}={0,2})(?=/|$)")
+
+_session = None
+_session_lock = threading.Lock()
+_token_lock = threading.Lock()
+
+_calls = deque(maxlen=METRICS_BUFFER_SIZE)
+_calls_lock = threading.Lock()
+
+
+class ZoomAPIError(Exception):
+    """Token / transport failure - ``status`` is the HTTP status if there was a response"""
+
+    def __init__(self, message, status=None):
+        super().__init__(message)
+        self.status = status
+
+
+def get_http_session():
+    """Process-wide pooled ``requests.Session``"""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=2, pool_maxsize=POOL_SIZE)
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                _session = session
+    return _session
+
+
+def endpoint_name(method, path):
+    """``GET /meetings/{id}/recordings`` - ids collapsed so calls group in the metrics"""
+    return f"{method} {_ID_RE.sub('/{id}', path.split('?')[0])}"
+
+
+def record_call(endpoint, status, elapsed, retries):
+    with _calls_lock:
+        _calls.append({
+            'endpoint': endpoint,
+            'status': status,
+            'ms': round(elapsed * 1000, 1),
+            'retries': retries,
+            'at': time.time(),
+        })
+
+
+def recent_calls():
+    with _calls_lock:
+        return list(_calls)
+
+
+def call_summary():
+    """Per-endpoint count / errors / retries / avg, p95 and max latency (ms) of recent calls"""
+    grouped = {}
+    for call in recent_calls():
+        grouped.setdefault(call['endpoint'], []).append(call)
+
+    summary = []
+    for endpoint, calls in grouped.items():
+        timings = sorted(call['ms'] for call in calls)
+        summary.append({
+            'endpoint': endpoint,
+            'count': len(calls),
+            'errors': sum(1 for call in calls if not call['status'] or call['status'] >= 400),
+            'retries': sum(call['retries'] for call in calls),
+            'avg_ms': round(sum(timings) / len(timings), 1),
+            'p95_ms': timings[min(len(timings) - 1, int(len(timings) * 0.95))],
+            'max_ms': timings[-1],
+        })
+    return sorted(summary, key=lambda row: -row['count'])
+
+
+def retry_after_seconds(response):
+    """Wait asked for by Zoom: ``Retry-After`` (seconds or HTTP date) - None if absent"""
+    value = response.headers.get('Retry-After')
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class ZoomClient:
+    """Thin Zoom REST client for one ``ZoomConfiguration``"""
+
+    def __init__(self, config, api_base_url=None, oauth_token_url=None, sleep=time.sleep):
+        self.config = config
+        self.api_base_url = (api_base_url or API_BASE_URL).rstrip('/')
+        self.oauth_token_url = oauth_token_url or OAUTH_TOKEN_URL
+        self.sleep = sleep
+        self.http = get_http_session()
+
+    # ==================== TOKEN ====================
+
+    @property
+    def token_key(self):
+        # Credentials in the key - editing the configuration starts a new token
+        raw = f"{self.config.account_id}:{self.config.client_id}:{self.config.client_secret}"
+        return TOKEN_KEY.format(fingerprint=hashlib.sha256(raw.encode()).hexdigest()[:32])
+
+    def get_access_token(self, force_refresh=False):
+        """Cached token - fetched only when missing or about to expire"""
+        if not force_refresh:
+            token = self._cached_token()
+            if token:
+                return token
+
+        with _token_lock:
+            # Another thread may have refreshed it while we waited
+            if not force_refresh:
+                token = self._cached_token()
+                if token:
+                    return token
+            return self._fetch_token()
+
+    def _cached_token(self):
+        cached = cache.get(self.token_key)
+        if cached and cached['expires_at'] - TOKEN_REFRESH_MARGIN > time.time():
+            return cached['access_token']
+        return None
+
+    def _fetch_token(self):
+        credentials = f"{self.config.client_id}:{self.config.client_secret}"
+        headers = {
+            'Authorization': f'Basic {base64.b64encode(credentials.encode()).decode()}',
+            'Content-Type': 'application/x-www-form-urlencoded',
+        }
+        data = {'grant_type': 'account_credentials', 'account_id': self.config.account_id}
+
+        response = self._send('POST', self.oauth_token_url, 'POST /oauth/token', headers=headers, data=data)
+        if response.status_code != 200:
+            raise ZoomAPIError(f"Token request failed: {response.status_code} - {response.text}", response.status_code)
+
+        token_data = response.json()
+        access_token = token_data.get('access_token')
+        if not access_token:
+            raise ZoomAPIError("No access token in response", response.status_code)
+
+        expires_in = int(token_data.get('expires_in') or 3600)
+        cache.set(
+            self.token_key,
+            {'access_token': access_token, 'expires_at': time.time() + expires_in},
+            max(1, expires_in - TOKEN_REFRESH_MARGIN),
+        )
+        return access_token
+
+    def invalidate_token(self):
+        cache.delete(self.token_key)
+
+    # ==================== REQUESTS ====================
+
+    def request(self, method, path, **kwargs):
+        """
+        Authenticated call to ``api_base_url + path``. Returns the final
+        ``requests.Response`` (any status); raises ``ZoomAPIError`` when no
+        response could be obtained.
+        """
+        method = method.upper()
+        url = f"{self.api_base_url}/{path.lstrip('/')}"
+        endpoint = endpoint_name(method, '/' + path.lstrip('/'))
+
+        headers = {'Content-Type': 'application/json', **kwargs.pop('headers', {})}
+        headers['Authorization'] = f'Bearer {self.get_access_token()}'
+        response = self._send(method, url, endpoint, headers=headers, **kwargs)
+
+        if response.status_code == 401:
+            # Revoked / expired early - one retry with a fresh token
+            headers['Authorization'] = f'Bearer {self.get_access_token(force_refresh=True)}'
+            response = self._send(method, url, endpoint, headers=headers, **kwargs)
+        return response
+
+    def get(self, path, **kwargs):
+        return self.request('GET', path, **kwargs)
+
+    def post(self, path, **kwargs):
+        return self.request('POST', path, **kwargs)
+
+    def patch(self, path, **kwargs):
+        return self.request('PATCH', path, **kwargs)
+
+    def delete(self, path, **kwargs):
+        return self.request('DELETE', path, **kwargs)
+
+    def _send(self, method, url, endpoint, **kwargs):
+        """One logical call with retries - timed as a whole into the metrics"""
+        kwargs.setdefault('timeout', TIMEOUT)
+        retryable = method in IDEMPOTENT_METHODS
+        started = time.perf_counter()
+        attempt = 0
+        response = None
+
+        while True:
+            wait = None
+            try:
+                response = self.http.request(method, url, **kwargs)
+            except requests.RequestException as exc:
+                if not retryable or attempt >= MAX_RETRIES:
+                    record_call(endpoint, None, time.perf_counter() - started, attempt)
+                    logger.warning("Zoom %s failed after %s retries: %s", endpoint, attempt, exc)
+                    raise ZoomAPIError(f"Zoom request failed: {exc}")
+                wait = self._backoff(attempt)
+            else:
+                status = response.status_code
+                if status == 429 or (retryable and status in RETRY_STATUSES):
+                    if attempt < MAX_RETRIES:
+                        wait = retry_after_seconds(response)
+                        if wait is None:
+                            wait = self._backoff(attempt)
+                        elif wait > MAX_RETRY_WAIT:
+                            # Daily quota etc. - waiting here would block the request
+                            logger.warning(
+                                "Zoom %s rate limited (%s), retry after %.0fs - giving up",
+                                endpoint, response.headers.get('X-RateLimit-Type', 'unknown'), wait,
+                            )
+                            wait = None
+
+            if wait is None:
+                break
+            attempt += 1
+            logger.info("Zoom %s: retry %s in %.2fs", endpoint, attempt, wait)
+            self.sleep(wait)
+
+        elapsed = time.perf_counter() - started
+        record_call(endpoint, response.status_code, elapsed, attempt)
+        logger.debug("Zoom %s -> %s in %.0fms (%s retries)", endpoint, response.status_code, elapsed * 1000, attempt)
+        return response
+
+    @staticmethod
+    def _backoff(attempt):
+        return min(MAX_RETRY_WAIT, BACKOFF_BASE * (2 ** attempt)) * random.uniform(0.5, 1.0)
@@ -4,6 +4,7 @@ import requests
 from django.conf import settings
 from django.utils import timezone
 from .models import ZoomConfiguration, BatchSession, ZoomRecording
+from .client import call_summary
 from .services import ZoomAPIService
 
 def check_zoom_configuration():
@@ -315,10 +316,7 @@ def get_zoom_api_usage():
     try:
         service = ZoomAPIService()
         
-        # This would need to be implemented in ZoomAPIService
-        # success, usage_data = service.get_api_usage()
-        
-        # For now, return basic stats from our database
+        # Zoom has no usage endpoint for S2S apps - DB stats + this process's API call metrics
         total_meetings = BatchSession.objects.filter(
             zoom_meeting_id__isnull=False
         ).count()
@@ -337,7 +335,8 @@ def get_zoom_api_usage():
             'total_meetings_created': total_meetings,
             'active_meetings': active_meetings,
             'completed_meetings': completed_meetings,
-            'recordings_available': ZoomRecording.objects.count()
+            'recordings_available': ZoomRecording.objects.count(),
+            'api_calls': call_summary(),
         }
         
         return True, usage_stats
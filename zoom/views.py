@@ -85,167 +85,6 @@ def check_zoom_configuration():
         return False, f"Configuration check failed: {str(e)}"
 
 
-class ZoomAPIService:
-    """Enhanced Zoom API Service with better error handling"""
-    
-    def __init__(self):
-        self.config = None
-        self.access_token = None
-        self._initialize_config()
-    
-    def _initialize_config(self):
-        """Initialize Zoom configuration"""
-        try:
-            from .models import ZoomConfiguration
-            self.config = ZoomConfiguration.objects.filter(is_active=True).first()
-            
-            if not self.config:
-                raise ValueError("No active Zoom configuration found")
-                
-        except Exception as e:
-            raise ValueError(f"Failed to initialize Zoom config: {str(e)}")
-    
-    def _get_access_token(self):
-        """Get or refresh access token"""
-        if not self.config:
-            raise ValueError("Zoom configuration not initialized")
-            
-        try:
-            import requests
-            import base64
-            
-            # Prepare credentials
-            credentials = f"{self.config.client_id}:{self.config.client_secret}"
-            encoded_credentials = base64.b64encode(credentials.encode()).decode()
-            
-            headers = {
-                'Authorization': f'Basic {encoded_credentials}',
-                'Content-Type': 'application/x-www-form-urlencoded'
-            }
-            
-            data = {
-                'grant_type': 'account_credentials',
-                'account_id': self.config.account_id
-            }
-            
-            response = requests.post(
-                'https://zoom.us/oauth/token',
-                headers=headers,
-                data=data,
-                timeout=10
-            )
-            
-            if response.status_code == 200:
-                token_data = response.json()
-                self.access_token = token_data.get('access_token')
-                return self.access_token
-            else:
-                error_detail = response.json() if response.content else {}
-                raise ValueError(f"Token request failed: {response.status_code} - {error_detail}")
-                
-        except requests.exceptions.Timeout:
-            raise ValueError("Zoom API request timed out")
-        except requests.exceptions.ConnectionError:
-            raise ValueError("Failed to connect to Zoom API")
-        except Exception as e:
-            raise ValueError(f"Token generation failed: {str(e)}")
-    
-    def create_meeting(self, session):
-        """Create Zoom meeting for session"""
-        try:
-            if not self.access_token:
-                self._get_access_token()
-
-            import requests
-            from datetime import datetime, timezone
-
-            # Combine date + start_time for Zoom
-            meeting_start = datetime.combine(session.scheduled_date, session.start_time)
-
-            meeting_data = {
-                'topic': session.title,
-                'type': 2,  # Scheduled meeting
-                'start_time': meeting_start.strftime('%Y-%m-%dT%H:%M:%S'),
-                'duration': session.duration_minutes,
-                'timezone': 'Asia/Kolkata',
-                'agenda': session.description or f'Session for {session.batch.name}',
-                'settings': {
-                    'host_video': True,
-                    'participant_video': True,
-                    'join_before_host': False,
-                    'mute_upon_entry': True,
-                    'waiting_room': True,
-                    'audio': 'both',
-                    'auto_recording': 'cloud' if session.is_recorded else 'none',
-                    'alternative_hosts': '',
-                }
-            }
-
-            user_identifier = self.config.admin_email or "me"
-
-            headers = {
-                'Authorization': f'Bearer {self.access_token}',
-                'Content-Type': 'application/json'
-            }
-
-            response = requests.post(
-                f'https://api.zoom.us/v2/users/{user_identifier}/meetings',
-                json=meeting_data,
-                headers=headers,
-                timeout=30
-            )
-
-            if response.status_code == 201:
-                meeting_info = response.json()
-
-                # Save Zoom details into session
-                session.zoom_meeting_id = str(meeting_info['id'])
-                session.zoom_join_url = meeting_info['join_url']
-                session.zoom_start_url = meeting_info['start_url']
-                session.zoom_meeting_password = meeting_info.get('password', '')
-                session.save()
-
-                return True, meeting_info
-            else:
-                error_detail = response.json() if response.content else {}
-                return False, f"Zoom meeting creation failed: {response.status_code} - {error_detail}"
-
-        except Exception as e:
-            import logging
-            logger = logging.getLogger('zoom')
-            logger.exception(f'Exception in create_meeting: {str(e)}')
-            return False, f"Meeting creation failed: {str(e)}"
-
-    def test_connection(self):
-        """Test Zoom API connection"""
-        try:
-            if not self.access_token:
-                self._get_access_token()
-            
-            import requests
-            
-            headers = {
-                'Authorization': f'Bearer {self.access_token}',
-                'Content-Type': 'application/json'
-            }
-            
-            response = requests.get(
-                'https://api.zoom.us/v2/users/me',
-                headers=headers,
-                timeout=10
-            )
-            
-            if response.status_code == 200:
-                user_data = response.json()
-                return True, f"Connected successfully as {user_data.get('email', 'Unknown')}"
-            else:
-                error_detail = response.json() if response.content else {}
-                return False, f"Connection test failed: {response.status_code} - {error_detail}"
-                
-        except Exception as e:
-            return False, f"Connection test error: {str(e)}"
-
-
 # Update your session_detail view to handle missing CSS
 # zoom/views.py - Complete Session Views
 